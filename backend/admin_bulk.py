@@ -0,0 +1,142 @@
+"""
+Admin field updates for one or many reports in a single store transaction
+(POST /admin/reports/bulk, POST /admin/report/<id>/update).
+
+Reports are found through the id -> position index in report_index.py,
+instead of a linear scan per id. Ids are accepted as stored, zero-padded
+('0042') or with the dashboard's 'RPT-' prefix.
+"""
+
+from report_events import in_bbox, parse_bbox
+from report_index import ReportIndex
+from snapshot import worst_severity
+
+# request field -> stored report field
+ADMIN_FIELDS = {
+    'status': 'admin_status',
+    'progress': 'admin_progress',
+    'notes': 'admin_notes',
+    'assignee': 'admin_assignee',
+}
+SEVERITIES = ('Minor', 'Moderate', 'Major')
+
+
+def parse_changes(data):
+    """Validated {stored field: value} from a request body. Raises ValueError."""
+    changes = {}
+    for key, field in ADMIN_FIELDS.items():
+        if key not in data:
+            continue
+        value = data[key]
+        if key == 'progress':
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+                raise ValueError('progress must be a number between 0 and 100')
+        elif value is not None and not isinstance(value, str):
+            raise ValueError(f'{key} must be a string')
+        changes[field] = value
+    return changes
+
+
+def apply_changes(report, changes):
+    """Set changed fields on report; True if anything actually changed."""
+    changed = False
+    for field, value in changes.items():
+        if report.get(field) != value:
+            report[field] = value
+            changed = True
+    return changed
+
+
+def _names(value, key):
+    """A filter value given as one string or a list of strings, as a list. Raises ValueError."""
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f'{key} must be a string or a list of strings')
+    return value
+
+
+def parse_filter(query):
+    """
+    Report predicate from a filter object: severity (worst severity, one
+    name or a list), bbox ('min_lon,min_lat,max_lon,max_lat' or 4 numbers),
+    status (current admin status, one or a list). Raises ValueError.
+    """
+    if not isinstance(query, dict) or not query:
+        raise ValueError('filter must be a non-empty object')
+    unknown = set(query) - {'severity', 'bbox', 'status'}
+    if unknown:
+        raise ValueError(f"unknown filter keys: {', '.join(sorted(unknown))}")
+
+    severities = query.get('severity')
+    if severities is not None:
+        severities = _names(severities, 'severity')
+    if severities is not None and not set(severities) <= set(SEVERITIES):
+        raise ValueError(f"severity must be one of {', '.join(SEVERITIES)}")
+
+    bbox = query.get('bbox')
+    if isinstance(bbox, (list, tuple)):
+        if len(bbox) != 4 or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in bbox):
+            raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+        bbox = tuple(float(v) for v in bbox)
+    elif bbox is None or isinstance(bbox, str):
+        bbox = parse_bbox(bbox)
+    else:
+        raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+
+    statuses = query.get('status')
+    if statuses is not None:
+        statuses = _names(statuses, 'status')
+
+    def match(report):
+        if severities is not None and worst_severity(report.get('severity_breakdown')) not in severities:
+            return False
+        if bbox is not None and not in_bbox(report, bbox):
+            return False
+        if statuses is not None and report.get('admin_status') not in statuses:
+            return False
+        return True
+
+    return match
+
+
+def bulk_update(reports, changes, ids=None, match=None, index=None):
+    """
+    Apply changes to the reports named by ids and/or matching match, in place.
+    ids are resolved through index (a ReportIndex over reports; built if not given).
+
+    Returns (results, changed_reports): one {'id', 'result'} per requested id,
+    in request order, then one per matched report not already listed. result
+    is 'updated', 'unchanged', 'not_found', or 'duplicate' for an id naming a
+    report an earlier id already did (the change is applied once).
+    """
+    results = []
+    changed = []
+    seen = set()
+
+    def update(pos, rid):
+        seen.add(pos)
+        r = reports[pos]
+        if apply_changes(r, changes):
+            changed.append(r)
+            results.append({'id': rid, 'result': 'updated'})
+        else:
+            results.append({'id': rid, 'result': 'unchanged'})
+
+    if ids:
+        if index is None:
+            index = ReportIndex()
+            index.load(reports)
+        for report_id in ids:
+            pos = index.find(report_id)
+            if pos is None:
+                results.append({'id': str(report_id), 'result': 'not_found'})
+            elif pos in seen:
+                results.append({'id': str(reports[pos].get('id', '')), 'result': 'duplicate'})
+            else:
+                update(pos, str(reports[pos].get('id', '')))
+    if match is not None:
+        for pos, r in enumerate(reports):
+            if match(r) and pos not in seen:
+                update(pos, str(r.get('id', '')))
+    return results, changed
@@ -0,0 +1,139 @@
+"""
+Admission control for expensive endpoints (/upload).
+
+Both checks run before the request body is read, so a rejection costs
+almost nothing:
+
+- RateLimiter: a token bucket per client (steady rate plus a burst).
+  Over-limit requests are answered with 429.
+- AdmissionController: a global limit on concurrently processed requests
+  with priority classes. Waiters are served admin first, then public, then
+  bulk, in arrival order within a class. A request whose expected queue
+  wait exceeds its class's target is turned away at once with 503, instead
+  of joining a queue it would time out in. The estimate uses recent service
+  times.
+
+Both report how long to back off, for a Retry-After header.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PRIORITIES = {'admin': 0, 'public': 1, 'bulk': 2}
+
+
+class Rejected(Exception):
+    """Request not admitted: HTTP status, message and seconds to wait before retrying."""
+
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimiter:
+    """
+    Token bucket per client key, bounded to the max_clients most recently seen.
+
+    Args:
+        rate_per_minute: Sustained requests per minute (0 = unlimited)
+        burst: Requests allowed back to back after a quiet period
+    """
+
+    def __init__(self, rate_per_minute, burst, max_clients=10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()  # client -> [tokens, updated], least recently seen first
+        self.lock = threading.Lock()
+
+    def check(self, client, now=None):
+        """0 if client may proceed (a token is taken), else seconds until it may."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            tokens, updated = self.buckets.pop(client, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self.buckets[client] = (tokens, now)
+            while len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionController:
+    """
+    At most `slots` requests at once, queued by priority class.
+
+    Args:
+        slots: Requests processed concurrently
+        max_wait: {class: seconds} longest queue wait each class accepts
+        service_s: Assumed seconds per request until real ones have been timed
+    """
+
+    def __init__(self, slots, max_wait, service_s=2.0):
+        self.slots = max(1, slots)
+        self.max_wait = dict(max_wait)
+        self.service_s = service_s  # moving average of how long a slot is held
+        self.active = 0
+        self.waiting = []  # heap of (priority, arrival)
+        self._arrivals = itertools.count()
+        self._cond = threading.Condition()
+
+    def _expected_wait(self, priority):
+        ahead = sum(1 for p, _ in self.waiting if p <= priority)
+        free = self.slots - self.active
+        if free > ahead:
+            return 0.0
+        return (ahead - free + 1) * self.service_s / self.slots
+
+    def expected_wait(self, cls):
+        """Seconds a new request of class cls would queue right now."""
+        with self._cond:
+            return self._expected_wait(PRIORITIES[cls])
+
+    @contextmanager
+    def admit(self, cls):
+        """Hold a slot for the block; raises Rejected (503) if cls's wait target can't be met."""
+        priority = PRIORITIES[cls]
+        limit = self.max_wait[cls]
+        start = time.monotonic()
+        with self._cond:
+            expected = self._expected_wait(priority)
+            if expected > limit:
+                raise Rejected(503, 'Server busy, try again later', expected)
+            ticket = (priority, next(self._arrivals))
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while self.active >= self.slots or self.waiting[0] != ticket:
+                    remaining = start + limit - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected(503, 'Server busy, try again later', self._expected_wait(priority))
+                    self._cond.wait(remaining)
+            except BaseException:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self.waiting)
+            self.active += 1
+            self._cond.notify_all()  # the next waiter may fit in another free slot
+        admitted = time.monotonic()
+        try:
+            yield admitted - start
+        finally:
+            with self._cond:
+                self.active -= 1
+                self.service_s = 0.8 * self.service_s + 0.2 * (time.monotonic() - admitted)
+                self._cond.notify_all()
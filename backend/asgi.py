@@ -0,0 +1,35 @@
+"""
+Single ASGI entry point for both backends.
+
+FastAPI routes from main.py (/detect/image, /detect/video, /health, ...) are
+served natively; everything else falls through to the Flask app in server.py
+(/upload, /reports, /admin/*, /metrics, ...) mounted as WSGI. Both share the
+model and bounded inference executor in inference.py, so a slow upload never
+blocks the event loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Flask requests run on a fixed thread pool (WSGI_THREADS with a2wsgi). Each
+/reports/stream client holds one of those threads while it is open, so the
+SSE client cap is fitted to the pool and the other routes keep threads to
+run on.
+"""
+
+import os
+
+from main import app
+import server
+
+try:
+    from a2wsgi import WSGIMiddleware
+    WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 40))
+    flask_app = WSGIMiddleware(server.app, workers=WSGI_THREADS)
+except ImportError:
+    from starlette.middleware.wsgi import WSGIMiddleware
+    WSGI_THREADS = 40  # anyio's default thread limiter, which starlette runs WSGI calls on
+    flask_app = WSGIMiddleware(server.app)
+
+server.fit_sse_clients(WSGI_THREADS)
+
+# Inference inside Flask requests still goes through the shared executor.
+app.mount('/', flask_app)
@@ -0,0 +1,7 @@
+"""
+Offline benchmark suite for the detection and persistence hot paths.
+
+Run from the backend directory:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick --compare bench.json
+"""
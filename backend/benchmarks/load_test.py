@@ -0,0 +1,207 @@
+"""
+HTTP load test: the serving path before the shared inference executor vs
+the Flask dev server (python server.py) and the unified ASGI app (asgi.py).
+
+Stacks:
+- direct: Flask with every request thread calling the model itself, one
+  inference per request and no executor or upload queue (the old path)
+- flask: Flask with model calls on the shared executor
+- asgi: asgi.py (FastAPI, with the Flask app mounted), same executor
+
+Each stack is started in a subprocess with StubModel in place of YOLO
+(release_gil=True, like torch), then hammered by concurrent clients posting
+images while a probe client times a cheap GET. Reported per stack: upload
+throughput and latency, errors, and probe latency under load (how responsive
+the server stays while inference is busy). --concurrency sets
+INFERENCE_CONCURRENCY for the executor stacks; --concurrency 1 gives the
+executor's own single-slot baseline.
+
+    python -m benchmarks.load_test --clients 16 --requests 10 --latency-ms 150
+    python -m benchmarks.load_test --stacks direct,flask --concurrency 1
+    python -m benchmarks.load_test --stacks asgi --endpoint /detect/image
+"""
+
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.run import percentile  # noqa: E402
+
+
+def serve(stack, port, latency_ms, datadir):
+    """Run one stack in this process with the stub model (blocks)."""
+    os.environ['SMARTROAD_DATA_DIR'] = datadir
+    os.environ.setdefault('UPLOAD_RATE_PER_MIN', '0')  # every request comes from one client
+    if stack == 'direct':
+        os.environ['UPLOAD_CONCURRENCY'] = '1000000'  # no upload queue either
+    import inference
+    from benchmarks.stub_model import StubModel
+    # A loader rather than a model instance: each inference thread past the first loads its own
+    inference.configure(loader=functools.partial(StubModel, latency_ms=latency_ms, release_gil=True))
+
+    if stack in ('flask', 'direct'):
+        import server
+        if stack == 'direct':
+            server.run_inference_sync = lambda fn, *args, **kwargs: inference._call(fn, args, kwargs)
+        server.app.run(host='127.0.0.1', port=port, debug=False)
+    else:
+        import uvicorn
+        import asgi
+        uvicorn.run(asgi.app, host='127.0.0.1', port=port, log_level='warning')
+
+
+def _multipart(path, field='file'):
+    boundary = uuid.uuid4().hex
+    with open(path, 'rb') as f:
+        data = f.read()
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; '
+            f'filename="{os.path.basename(path)}"\r\nContent-Type: image/jpeg\r\n\r\n').encode() + data
+    body += (f'\r\n--{boundary}\r\nContent-Disposition: form-data; name="lat"\r\n\r\n25.26'
+             f'\r\n--{boundary}--\r\n').encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def _request(url, body=None, content_type=None, timeout=120):
+    req = urllib.request.Request(url, data=body, method='POST' if body is not None else 'GET')
+    if content_type:
+        req.add_header('Content-Type', content_type)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            ok = resp.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def _wait_ready(base, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('server exited during startup')
+        ok, _ = _request(base + '/reports', timeout=2)
+        if ok:
+            return
+        time.sleep(0.2)
+    raise RuntimeError('server did not become ready')
+
+
+def load(base, endpoint, image, clients, requests_per_client, probe_path, probe_interval=0.05):
+    body, content_type = _multipart(image)
+    latencies, errors = [], [0]
+    probes = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def client():
+        for _ in range(requests_per_client):
+            ok, elapsed = _request(base + endpoint, body, content_type)
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    def probe():
+        while not done.is_set():
+            ok, elapsed = _request(base + probe_path, timeout=30)
+            if ok:
+                probes.append(elapsed)
+            done.wait(probe_interval)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    workers = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    wall = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'wall_s': round(wall, 3),
+        'requests_per_s': round(len(latencies) / wall, 2) if wall else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'probe_p50_ms': round(percentile(probes, 50) * 1000, 1),
+        'probe_p95_ms': round(percentile(probes, 95) * 1000, 1),
+        'probe_max_ms': round(max(probes) * 1000, 1) if probes else 0.0,
+    }
+
+
+def run_stack(stack, args, workdir):
+    datadir = os.path.join(workdir, stack)
+    os.makedirs(datadir, exist_ok=True)
+    env = dict(os.environ, INFERENCE_CONCURRENCY=str(args.concurrency), METRICS_ENABLED='1')
+    proc = subprocess.Popen([sys.executable, '-m', 'benchmarks.load_test', '--serve', stack,
+                             '--port', str(args.port), '--latency-ms', str(args.latency_ms),
+                             '--datadir', datadir], cwd=BACKEND_DIR, env=env)
+    base = f'http://127.0.0.1:{args.port}'
+    try:
+        _wait_ready(base, proc)
+        image = synthetic.write_image(os.path.join(workdir, 'load.jpg'), 1280, 720)
+        endpoint = args.endpoint if stack == 'asgi' else '/upload'
+        return load(base, endpoint, image, args.clients, args.requests, args.probe)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent HTTP load test (stub model)')
+    parser.add_argument('--stacks', default='direct,flask,asgi', help='Comma-separated: direct, flask, asgi')
+    parser.add_argument('--endpoint', default='/upload', help='/upload (both stacks) or /detect/image (asgi only)')
+    parser.add_argument('--probe', default='/reports', help='Cheap GET timed while under load')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=5, help='Requests per client')
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='Simulated model latency per image')
+    parser.add_argument('--concurrency', type=int, default=2, help='INFERENCE_CONCURRENCY for flask/asgi')
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--serve', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--datadir', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.port, args.latency_ms, args.datadir)
+        return 0
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='smartroad_load_') as workdir:
+        for stack in args.stacks.split(','):
+            results[stack] = run_stack(stack, args, workdir)
+            r = results[stack]
+            print(f"{stack:6s} {r['requests_per_s']:>8.2f} req/s  p50 {r['p50_ms']:>8.1f} ms  "
+                  f"p95 {r['p95_ms']:>8.1f} ms  errors {r['errors']}  "
+                  f"probe p95 {r['probe_p95_ms']:.1f} ms (max {r['probe_max_ms']:.1f})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
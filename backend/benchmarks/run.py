@@ -0,0 +1,384 @@
+"""
+Benchmark runner: detection functions, /upload end to end and the report endpoints.
+
+Everything runs offline against synthetic inputs and StubModel, so numbers
+measure the pipeline around the model (decode, resize, tiling, tracking,
+encoding, JSON persistence), not the network weights. Results are written as
+JSON; pass --compare to flag regressions against an earlier run. The startup
+group times importing each app entry point (import-time regressions show up
+there); run benchmarks.startup directly for the per-package breakdown.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick --compare bench.json --threshold 0.15
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import metrics  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.stub_model import StubModel  # noqa: E402
+
+
+class PeakRss:
+    """Sample process RSS in a background thread; .peak is the max seen inside the block."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, metrics.process_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = metrics.process_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, metrics.process_rss_bytes())
+        return False
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(latencies, units_per_run=1, unit='items', peak_rss=0, **extra):
+    """Latency percentiles (ms), throughput in units/s and peak RSS for one benchmark case."""
+    total = sum(latencies)
+    result = {
+        'runs': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'mean_ms': round(total / len(latencies) * 1000, 3) if latencies else 0.0,
+        f'{unit}_per_s': round(units_per_run * len(latencies) / total, 2) if total else 0.0,
+        'peak_rss_mb': round(peak_rss / (1024 * 1024), 1),
+    }
+    result.update(extra)
+    return result
+
+
+def timed_runs(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    with PeakRss() as rss:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+    return latencies, rss.peak
+
+
+def alloc_profile(fn):
+    """Traced allocation peak (MB) and garbage collections during one call of fn."""
+    import gc
+    import tracemalloc
+
+    before = sum(gen['collections'] for gen in gc.get_stats())
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'traced_peak_mb': round(peak / (1024 * 1024), 2),
+        'gc_collections': sum(gen['collections'] for gen in gc.get_stats()) - before,
+    }
+
+
+def bench_detect_image(workdir, model, repeat):
+    from detect_pothole import detect_image, detect_image_sliced
+
+    results = {}
+    for name, (w, h) in {'1024x768': (1024, 768), '4000x3000': (4000, 3000)}.items():
+        path = synthetic.write_image(os.path.join(workdir, f'img_{name}.jpg'), w, h)
+        latencies, rss = timed_runs(lambda: detect_image(path, model), repeat)
+        results[f'detect_image/{name}'] = summarize(latencies, 1, 'images', rss)
+
+    path = os.path.join(workdir, 'img_4000x3000.jpg')
+    latencies, rss = timed_runs(lambda: detect_image_sliced(path, model, tile_size=640), max(1, repeat // 2))
+    results['detect_image_sliced/4000x3000'] = summarize(latencies, 1, 'images', rss)
+    results.update(bench_decode(path, repeat))
+    return results
+
+
+def bench_decode(path, repeat, max_dim=1024):
+    """Full decode then resize (the old detect_image path) vs reduced JPEG decode from memory."""
+    import cv2
+    from image_decode import decode_image
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    def full():
+        img = cv2.imread(path)
+        h, w = img.shape[:2]
+        scale = max_dim / max(h, w)
+        return cv2.resize(img, (int(w * scale), int(h * scale)))
+
+    results = {}
+    for case, fn in (('full', full), ('reduced', lambda: decode_image(data, max_dim=max_dim))):
+        latencies, rss = timed_runs(fn, repeat)
+        results[f'decode/4000x3000/{case}'] = summarize(latencies, 1, 'images', rss)
+    return results
+
+
+def bench_detect_video(workdir, model, seconds, repeat):
+    from detect_pothole import detect_video
+    from video_stream import detect_video_stream
+
+    path = synthetic.write_video(os.path.join(workdir, 'clip.mp4'), seconds=seconds)
+    cases = {
+        'detect_video/legacy': lambda: detect_video(path, model, motion_gate=False),
+        'detect_video/legacy_gated': lambda: detect_video(path, model),
+        'detect_video_stream/ungated': lambda: detect_video_stream(path, model, motion_gate=False),
+        'detect_video_stream/gated': lambda: detect_video_stream(path, model),
+    }
+    results = {}
+    for name, fn in cases.items():
+        stats = fn()[4]
+        latencies, rss = timed_runs(fn, repeat, warmup=0)
+        results[name] = summarize(latencies, stats['frames_read'], 'frames', rss,
+                                  frames_inferred=stats['frames_inferred'],
+                                  frames_gated=stats.get('frames_gated', 0), **alloc_profile(fn))
+    return results
+
+
+def _load_server(datadir, model):
+    os.environ['SMARTROAD_DATA_DIR'] = datadir
+    os.environ.setdefault('UPLOAD_RATE_PER_MIN', '0')  # every request comes from one client
+    import inference
+    import server
+    inference.model = model
+    return server
+
+
+def bench_upload(workdir, datadir, model, repeat):
+    server = _load_server(datadir, model)
+    client = server.app.test_client()
+    image = synthetic.write_image(os.path.join(workdir, 'upload.jpg'), 1920, 1080)
+    video = synthetic.write_video(os.path.join(workdir, 'upload.mp4'), seconds=4)
+
+    def post(path, name):
+        # Start from an empty store each time so persistence cost doesn't grow across runs
+        if os.path.exists(server.REPORTS_PATH):
+            os.remove(server.REPORTS_PATH)
+        with open(path, 'rb') as f:
+            resp = client.post('/upload', data={'file': (f, name), 'lat': '25.26', 'lon': '87.01'})
+        assert resp.status_code == 200, resp.get_data(as_text=True)[:200]
+        return resp
+
+    results = {}
+    latencies, rss = timed_runs(lambda: post(image, 'pot.jpg'), repeat)
+    results['upload/image_1920x1080'] = summarize(latencies, 1, 'requests', rss,
+                                                  response_bytes=len(post(image, 'pot.jpg').get_data()))
+    latencies, rss = timed_runs(lambda: post(video, 'clip.mp4'), max(1, repeat // 4))
+    results['upload/video_4s'] = summarize(latencies, 1, 'requests', rss)
+    return results
+
+
+def bench_report_endpoints(datadir, model, counts, repeat):
+    server = _load_server(datadir, model)
+    client = server.app.test_client()
+    results = {}
+    for count in counts:
+        size = synthetic.write_reports(server.REPORTS_PATH, count)
+        target = synthetic.make_reports(count)[count // 2]['id']
+        updates = itertools.count()
+
+        def update():
+            # Alternate by parity so every call changes the report and rewrites the store
+            odd = next(updates) % 2
+            return client.post(f'/admin/report/{target}/update',
+                               json={'status': 'Completed' if odd else 'In Progress', 'progress': 100 if odd else 50})
+
+        cases = {
+            'GET /reports': lambda: client.get('/reports'),
+            'GET /admin/stats': lambda: client.get('/admin/stats'),
+            'GET /admin/reports': lambda: client.get('/admin/reports'),
+            'GET /admin/report/<id>/artifacts': lambda: client.get(f'/admin/report/{target}/artifacts'),
+            'POST /admin/report/<id>/update': update,
+        }
+        runs = repeat if count <= 10000 else max(2, repeat // 5)
+        for name, fn in cases.items():
+            latencies, rss = timed_runs(fn, runs)
+            results[f'{name} @{count}'] = summarize(latencies, 1, 'requests', rss,
+                                                    store_bytes=size, response_bytes=len(fn().get_data()))
+    return results
+
+
+def bench_encodings(workdir, datadir, model, count, repeat):
+    """Response bytes and latency per endpoint for each format / Content-Encoding a client can ask for."""
+    server = _load_server(datadir, model)
+    client = server.app.test_client()
+    synthetic.write_reports(server.REPORTS_PATH, count)
+    image = synthetic.write_image(os.path.join(workdir, 'enc.jpg'), 1280, 720)
+
+    def upload(headers):
+        with open(image, 'rb') as f:
+            return client.post('/upload', data={'file': (f, 'pot.jpg'), 'lat': '25.26', 'lon': '87.01'},
+                               headers=headers)
+
+    endpoints = {
+        'GET /reports': lambda h: client.get('/reports', headers=h),
+        'GET /admin/stats': lambda h: client.get('/admin/stats', headers=h),
+        'GET /admin/reports': lambda h: client.get('/admin/reports', headers=h),
+        'POST /upload': upload,
+    }
+    variants = {
+        'json': {},
+        'json+gzip': {'Accept-Encoding': 'gzip'},
+        'json+br': {'Accept-Encoding': 'br, gzip'},
+        'msgpack+br': {'Accept': 'application/msgpack', 'Accept-Encoding': 'br, gzip'},
+    }
+    results = {}
+    for name, fn in endpoints.items():
+        for variant, headers in variants.items():
+            resp = fn(headers)
+            latencies, rss = timed_runs(lambda: fn(headers), max(2, repeat // 2))
+            results[f'{name} [{variant}] @{count}'] = summarize(
+                latencies, 1, 'requests', rss, response_bytes=len(resp.get_data()),
+                content_type=resp.mimetype, content_encoding=resp.headers.get('Content-Encoding', 'identity'))
+    return results
+
+
+def bench_startup(repeat, modules=('server', 'main', 'asgi')):
+    """Import time of each entry point in a fresh interpreter (see startup.py)."""
+    from benchmarks.startup import profile_import
+
+    results = {}
+    for module in modules:
+        runs = [profile_import(module) for _ in range(repeat)]
+        extra = {'heavy_imports': sorted({m for r in runs for m in r['heavy']})}
+        if 'health_s' in runs[0]:
+            extra['health_ms'] = round(sorted(r['health_s'] for r in runs)[len(runs) // 2] * 1000, 3)
+        results[f'startup/import {module}'] = summarize([r['import_ms'] / 1000 for r in runs], 1, 'imports',
+                                                        **extra)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=False).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Regressions where latency grew or throughput dropped by more than threshold (fraction)."""
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key, value in result.items():
+            old = base.get(key)
+            if not isinstance(old, (int, float)) or not old:
+                continue
+            if key.endswith('_ms') and value > old * (1 + threshold):
+                regressions.append(f'{name}: {key} {old} -> {value} (+{(value / old - 1) * 100:.0f}%)')
+            elif key.endswith('_per_s') and value < old * (1 - threshold):
+                regressions.append(f'{name}: {key} {old} -> {value} ({(value / old - 1) * 100:.0f}%)')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SmartRoad backend benchmarks (offline, stub model)')
+    parser.add_argument('--output', default=None, help='Write results JSON here')
+    parser.add_argument('--compare', default=None, help='Baseline results JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Regression threshold (fraction)')
+    parser.add_argument('--quick', action='store_true', help='Fewer runs and smaller stores')
+    parser.add_argument('--repeat', type=int, default=None)
+    parser.add_argument('--report-counts', default=None, help='Comma-separated store sizes (default 1000,10000,100000)')
+    parser.add_argument('--video-seconds', type=float, default=None)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated model latency per image')
+    parser.add_argument('--only', default=None, help='Comma-separated groups: startup,image,video,upload,reports,encodings')
+    parser.add_argument('--no-metrics', action='store_true', help='Disable /metrics instrumentation')
+    args = parser.parse_args(argv)
+
+    repeat = args.repeat or (3 if args.quick else 10)
+    counts = [int(c) for c in (args.report_counts or ('1000,10000' if args.quick else '1000,10000,100000')).split(',')]
+    video_seconds = args.video_seconds or (4 if args.quick else 20)
+    groups = set((args.only or 'startup,image,video,upload,reports,encodings').split(','))
+    metrics.set_enabled(not args.no_metrics)
+
+    model = StubModel(latency_ms=args.latency_ms)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='smartroad_bench_') as workdir:
+        datadir = os.path.join(workdir, 'data')
+        os.makedirs(datadir)
+        if 'startup' in groups:
+            results.update(bench_startup(repeat))
+        if 'image' in groups:
+            results.update(bench_detect_image(workdir, model, repeat))
+        if 'video' in groups:
+            results.update(bench_detect_video(workdir, model, video_seconds, max(1, repeat // 3)))
+        if 'upload' in groups:
+            results.update(bench_upload(workdir, datadir, model, repeat))
+        if 'reports' in groups:
+            results.update(bench_report_endpoints(datadir, model, counts, repeat))
+        if 'encodings' in groups:
+            results.update(bench_encodings(workdir, datadir, model, counts[-1], repeat))
+
+    report = {
+        'meta': {
+            'timestamp': int(time.time()),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'stub_latency_ms': args.latency_ms,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+    for name, result in results.items():
+        rate = next((f'{v} {k[:-6]}/s' for k, v in result.items() if k.endswith('_per_s')), '')
+        print(f"{name:45s} p50 {result['p50_ms']:>10.2f} ms  p95 {result['p95_ms']:>10.2f} ms  "
+              f"{rate:>20s}  rss {result['peak_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.output}')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print('REGRESSION', line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
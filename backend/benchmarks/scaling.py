@@ -0,0 +1,154 @@
+"""
+Inference scaling benchmark: throughput against worker count.
+
+Runs the same batch of image detections through inference.py with the
+in-process thread executor (workers=0) and with 1..N worker processes, using
+StubModel spinning for a fixed amount of CPU time per image while holding
+the GIL, like a single-threaded CPU model. Reports images/s, speedup over one
+worker and parallel efficiency.
+
+With --video SECONDS it times one synthetic dashcam clip instead: the
+sequential detect_video_stream against detect_video_segmented with one
+segment per worker, and checks the stitched detections match.
+
+    python -m benchmarks.scaling --workers 0,1,2,4,8 --images 64 --latency-ms 80
+    python -m benchmarks.scaling --threads 2 --no-affinity --output scaling.json
+    python -m benchmarks.scaling --video 120 --workers 1,2,4
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import inference  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.stub_model import StubModel  # noqa: E402
+from detect_pothole import detect_pothole  # noqa: E402
+from video_segments import detect_video_segmented  # noqa: E402
+from video_stream import detect_video_stream  # noqa: E402
+
+
+def run_layout(workers, image, images, latency_ms, threads, affinity):
+    """images/s for one layout; pool start-up and model loads are excluded."""
+    inference.configure(workers=workers, threads=threads, affinity=affinity,
+                        loader=functools.partial(StubModel, latency_ms=latency_ms, cpu_time=True))
+    try:
+        # Warm-up: start every worker and load its model
+        slots = workers or inference.INFERENCE_CONCURRENCY
+        wait([inference.submit(detect_pothole, image, inference.MODEL, imgsz=inference.INFER_SIZE)
+              for _ in range(slots * 2)])
+
+        start = time.perf_counter()
+        futures = [inference.submit(detect_pothole, image, inference.MODEL, imgsz=inference.INFER_SIZE)
+                   for _ in range(images)]
+        for f in futures:
+            f.result()
+        wall = time.perf_counter() - start
+    finally:
+        inference.shutdown()
+    return {
+        'workers': workers,
+        'threads_per_worker': inference.worker_threads(workers, threads or inference.INFERENCE_THREADS),
+        'images': images,
+        'wall_s': round(wall, 3),
+        'images_per_s': round(images / wall, 2),
+    }
+
+
+def run_video_layout(workers, video, latency_ms, threads, affinity, reference=None):
+    """frames/s for the clip: sequential on one worker (reference None) or segmented across workers."""
+    inference.configure(workers=workers, threads=threads, affinity=affinity,
+                        loader=functools.partial(StubModel, latency_ms=latency_ms, cpu_time=True))
+    try:
+        inference.warm_up()
+        start = time.perf_counter()
+        if reference is None:
+            result = inference.run_inference_sync(detect_video_stream, video, inference.MODEL, motion_gate=False)
+        else:
+            result = detect_video_segmented(video, segments=max(1, workers), motion_gate=False, min_seconds=1.0)
+            result = result or inference.run_inference_sync(detect_video_stream, video, inference.MODEL,
+                                                            motion_gate=False)
+        wall = time.perf_counter() - start
+    finally:
+        inference.shutdown()
+    detections, stats = result[1], result[4]
+    return {
+        'workers': workers,
+        'mode': stats['mode'],
+        'segments': len(stats.get('segments', [])) or 1,
+        'frames': stats['frames_read'],
+        'wall_s': round(wall, 3),
+        'images_per_s': round(stats['frames_read'] / wall, 2),
+        'tracks': len(detections),
+        'matches_sequential': None if reference is None else detections == reference,
+    }, detections
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inference throughput vs worker processes (stub model)')
+    parser.add_argument('--workers', default=None,
+                        help='Comma-separated worker counts; 0 = thread executor (default: 0,1,2,4..CPUs)')
+    parser.add_argument('--images', type=int, default=48, help='Detections per layout')
+    parser.add_argument('--latency-ms', type=float, default=60.0, help='Simulated model cost per image (holds the GIL)')
+    parser.add_argument('--threads', type=int, default=None, help='Threads per worker (default: derived)')
+    parser.add_argument('--no-affinity', action='store_true', help='Do not pin workers to cores')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--video', type=float, default=None, help='Benchmark a clip of this many seconds instead')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(',')]
+    else:
+        counts = [0, 1]
+        while counts[-1] * 2 <= inference.CPU_COUNT:
+            counts.append(counts[-1] * 2)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='smartroad_scaling_') as workdir:
+        if args.video:
+            video = synthetic.write_video(os.path.join(workdir, 'drive.mp4'), seconds=args.video,
+                                          size=(args.width, args.height))
+            print(f'{inference.CPU_COUNT} CPUs, {args.video} s clip, {args.latency_ms} ms model latency')
+            sequential, reference = run_video_layout(1, video, args.latency_ms, args.threads, not args.no_affinity)
+            results.append(sequential)
+            for workers in [n for n in counts if n]:
+                results.append(run_video_layout(workers, video, args.latency_ms, args.threads,
+                                                not args.no_affinity, reference)[0])
+        else:
+            image = synthetic.write_image(os.path.join(workdir, 'road.jpg'), args.width, args.height)
+            print(f'{inference.CPU_COUNT} CPUs, {args.images} images, {args.latency_ms} ms model latency')
+            for workers in counts:
+                results.append(run_layout(workers, image, args.images, args.latency_ms, args.threads,
+                                          not args.no_affinity))
+
+    base = next((r['images_per_s'] for r in results if r['workers'] == 1), results[0]['images_per_s'])
+    unit = 'frames/s' if args.video else 'img/s'
+    for r in results:
+        r['speedup'] = round(r['images_per_s'] / base, 2) if base else 0.0
+        r['efficiency'] = round(r['speedup'] / r['workers'], 2) if r['workers'] else None
+        label = f"{r['workers']} proc" if r['workers'] else f'{inference.INFERENCE_CONCURRENCY} threads'
+        if args.video:
+            label = f"{label} {r['mode'][:3]}"
+        extra = f"  matches {r['matches_sequential']}" if r.get('matches_sequential') is not None else ''
+        print(f"{label:>14s}  {r['images_per_s']:>8.2f} {unit}  x{r['speedup']:<5}  "
+              f"efficiency {r['efficiency'] if r['efficiency'] is not None else '-'}{extra}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'cpus': inference.CPU_COUNT, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
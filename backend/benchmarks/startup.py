@@ -0,0 +1,134 @@
+"""
+Startup benchmark: what importing each app entry point costs.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter per
+run, takes the import subtree of the entry point from the report and sums
+it per top-level package. The web layer should import without the
+detection stack (cv2, torch, ultralytics), which is loaded on first use, so
+the process answers health checks as soon as it boots; any of those showing
+up at import time is reported as a failure with --check.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --modules server,asgi --repeat 5 --check
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('cv2', 'torch', 'ultralytics')
+
+# Timed first request per entry point, run right after the import
+HEALTH_PROBES = {
+    'server': "server.app.test_client().get('/').status_code",
+}
+
+
+def parse_importtime(stderr, module):
+    """
+    [(package, self_ms)] for the import subtree of module, costliest first,
+    and its cumulative import time in ms; (None, None) if it wasn't imported.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+
+    end = next((i for i, e in enumerate(entries) if e[2] == 0 and e[3] == module), None)
+    if end is None:
+        return None, None
+    # Children are listed before their parent, so the subtree starts after the previous top-level entry
+    start = next((i + 1 for i in range(end - 1, -1, -1) if entries[i][2] == 0), 0)
+    packages = {}
+    for self_us, _, _, name in entries[start:end + 1]:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us / 1000
+    ranked = sorted(((p, round(ms, 1)) for p, ms in packages.items()), key=lambda p: -p[1])
+    return ranked, entries[end][1] / 1000
+
+
+def profile_import(module, python=None):
+    """Import module in a fresh interpreter; import time, wall time, package breakdown and heavy modules loaded."""
+    probe = HEALTH_PROBES.get(module)
+    code = ['import json, sys, time', 'start = time.perf_counter()', f'import {module}',
+            'imported = time.perf_counter()']
+    if probe:
+        code += [f'status = {probe}', 'probed = time.perf_counter()']
+    code.append("print(json.dumps({'import_s': imported - start, "
+                + ("'health_s': probed - imported, 'health_status': status, " if probe else '')
+                + f"'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))")
+
+    with tempfile.TemporaryDirectory(prefix='smartroad_startup_') as datadir:
+        env = dict(os.environ, SMARTROAD_DATA_DIR=datadir, WARM_UP='0',
+                   PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get('PYTHONPATH')])))
+        proc = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', '\n'.join(code)],
+                              cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    packages, import_ms = parse_importtime(proc.stderr, module)
+    result.update(import_ms=import_ms, packages=packages)
+    return result
+
+
+def profile_startup(modules, repeat=3, python=None):
+    """{module: {import_ms, wall_ms, health_ms?, heavy, top_packages}} over repeat runs (median)."""
+    report = {}
+    for module in modules:
+        runs = sorted((profile_import(module, python) for _ in range(repeat)), key=lambda r: r['import_s'])
+        median = runs[len(runs) // 2]
+        entry = {
+            'import_ms': round(median['import_ms'], 1),
+            'wall_ms': round(median['import_s'] * 1000, 1),
+            'heavy': sorted({m for r in runs for m in r['heavy']}),
+            'top_packages': median['packages'][:10],
+        }
+        if 'health_s' in median:
+            entry['health_ms'] = round(median['health_s'] * 1000, 1)
+            entry['health_status'] = median['health_status']
+        report[module] = entry
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SmartRoad backend import-time profile')
+    parser.add_argument('--modules', default='server,main,asgi', help='Comma-separated entry points')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail if an import takes longer')
+    parser.add_argument('--check', action='store_true', help=f"Fail if {', '.join(HEAVY_MODULES)} load at import")
+    parser.add_argument('--output', default=None, help='Write results JSON here')
+    args = parser.parse_args(argv)
+
+    report = profile_startup(args.modules.split(','), args.repeat)
+    failures = []
+    for module, entry in report.items():
+        health = f"  first / {entry['health_ms']:.1f} ms" if 'health_ms' in entry else ''
+        print(f"import {module:10s} {entry['import_ms']:>8.1f} ms (wall {entry['wall_ms']:.1f} ms){health}")
+        for package, ms in entry['top_packages']:
+            print(f'    {package:30s} {ms:>8.1f} ms')
+        if args.check and entry['heavy']:
+            failures.append(f"import {module} loads {', '.join(entry['heavy'])}")
+        if args.max_ms is not None and entry['import_ms'] > args.max_ms:
+            failures.append(f"import {module} took {entry['import_ms']} ms (budget {args.max_ms} ms)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.output}')
+
+    for line in failures:
+        print('REGRESSION', line)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Deterministic stand-in for the YOLO model, so benchmarks run without weights or a GPU.
+
+It finds dark blobs (the synthetic potholes drawn by synthetic.py) with a
+threshold + contour pass and returns them in the same shape as ultralytics
+results (r.boxes[i].xyxy[0], r.boxes[i].conf[0], r.speed). An optional fixed
+latency can be added to mimic real inference cost, either as a busy-wait or,
+with release_gil=True, as a sleep (torch releases the GIL inside its kernels).
+With cpu_time=True the busy-wait runs until the thread has used latency_ms
+of CPU, so concurrent calls on the same cores really compete for them.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class _Tensor:
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float32)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+
+class _Box:
+    def __init__(self, xyxy, conf):
+        self.xyxy = _Tensor([xyxy])
+        self.conf = _Tensor([conf])
+
+
+class _Result:
+    def __init__(self, boxes, speed):
+        self.boxes = boxes
+        self.speed = speed
+
+
+class StubModel:
+    """
+    Args:
+        latency_ms: Extra busy-wait per image, to mimic model cost
+        min_area: Smallest blob (px) reported as a detection
+        release_gil: Sleep for the latency instead of spinning
+        cpu_time: Spin for latency_ms of thread CPU time rather than wall time
+    """
+
+    def __init__(self, latency_ms=0.0, min_area=16, release_gil=False, cpu_time=False):
+        self.latency_ms = latency_ms
+        self.min_area = min_area
+        self.release_gil = release_gil
+        self.cpu_time = cpu_time
+        self.calls = 0
+        self.images = 0
+
+    def _predict(self, img):
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        _, mask = cv2.threshold(gray, 40, 255, cv2.THRESH_BINARY_INV)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = []
+        for c in contours:
+            x, y, w, h = cv2.boundingRect(c)
+            if w * h >= self.min_area:
+                boxes.append(_Box([x, y, x + w, y + h], 0.5 + min(0.49, w * h / 1e5)))
+        # Busy-wait by default so CPU-time measurements see the cost
+        deadline = start + self.latency_ms / 1000.0
+        if self.release_gil:
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+        elif self.cpu_time:
+            while time.thread_time() < cpu_start + self.latency_ms / 1000.0:
+                pass
+        while time.perf_counter() < deadline:
+            pass
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return _Result(boxes, {'preprocess': 0.0, 'inference': elapsed_ms, 'postprocess': 0.0})
+
+    def __call__(self, source, imgsz=640, verbose=False, **kwargs):
+        self.calls += 1
+        if isinstance(source, str):
+            source = cv2.imread(source)
+        images = source if isinstance(source, list) else [source]
+        self.images += len(images)
+        return [self._predict(img) for img in images]
@@ -0,0 +1,76 @@
+"""
+Synthetic benchmark inputs: road-like images, dashcam-like videos and report stores.
+Everything is seeded, so repeated runs see identical data.
+"""
+
+import base64
+import json
+import os
+
+import cv2
+import numpy as np
+
+
+def road_image(width, height, potholes=6, seed=0):
+    """Gray textured 'asphalt' with dark elliptical potholes of mixed sizes."""
+    rng = np.random.default_rng(seed)
+    img = rng.integers(110, 200, (height, width, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(img, (7, 7), 0)
+    for _ in range(potholes):
+        cx, cy = int(rng.integers(0, width)), int(rng.integers(0, height))
+        axes = (int(rng.integers(8, max(9, width // 12))), int(rng.integers(6, max(7, height // 14))))
+        cv2.ellipse(img, (cx, cy), axes, float(rng.integers(0, 180)), 0, 360, (15, 15, 15), -1)
+    return img
+
+
+def write_image(path, width, height, seed=0, quality=90):
+    cv2.imwrite(path, road_image(width, height, seed=seed), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return path
+
+
+def write_video(path, seconds=10, fps=30, size=(1280, 720), stopped=(0.3, 0.5), seed=0):
+    """
+    Dashcam-like clip: a long road texture scrolls past with potholes, and the
+    vehicle is stopped for the `stopped` fraction of the clip (motion gate case).
+    """
+    w, h = size
+    road = road_image(w * 6, h, potholes=60, seed=seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    frames = int(seconds * fps)
+    offset = 0
+    for i in range(frames):
+        if not (stopped[0] * frames <= i < stopped[1] * frames):
+            offset = (offset + 12) % (road.shape[1] - w)
+        writer.write(np.ascontiguousarray(road[:, offset:offset + w]))
+    writer.release()
+    return path
+
+
+def make_reports(count, annot_bytes=256, seed=0):
+    """count report entries shaped like server.py writes them (small inline annotation)."""
+    rng = np.random.default_rng(seed)
+    fake_png = 'data:image/png;base64,' + base64.b64encode(bytes(annot_bytes)).decode('ascii')
+    reports = []
+    for i in range(count):
+        sev = ['Minor', 'Moderate', 'Major'][int(rng.integers(0, 3))]
+        uid = f'{1771500000000 + i}_{i:08x}'
+        reports.append({
+            'id': uid,
+            'timestamp': 1771500000 + i,
+            'original_file': f'reports/{uid}_orig_pot.jpg',
+            'annotated_file': f'reports/{uid}_annot.png',
+            'annotated_base64': fake_png,
+            'lat': round(float(rng.uniform(8.0, 30.0)), 6),
+            'lon': round(float(rng.uniform(70.0, 90.0)), 6),
+            'description': 'Pothole',
+            'total_detections': 1,
+            'severity_breakdown': {k: int(k == sev) for k in ('Minor', 'Moderate', 'Major')},
+            'detections': [{'bbox': [21, 27, 174, 123], 'confidence': 0.88, 'area': 14688, 'severity': sev}],
+        })
+    return reports
+
+
+def write_reports(path, count, annot_bytes=256):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(make_reports(count, annot_bytes), f, indent=2)
+    return os.path.getsize(path)
@@ -0,0 +1,15 @@
+"""
+Content hashes of stored and uploaded files (checkpoint names in server.py,
+the ingest manifest in smartroad.py).
+"""
+
+import hashlib
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
@@ -5,17 +5,14 @@ Handles deduplication of detections across video frames using IoU overlap.
 
 import cv2
 import os
-from ultralytics import YOLO
-
-
-def classify_severity(area):
-    """Classify pothole severity based on bbox area."""
-    if area < 5000:
-        return 'Minor'
-    elif area < 20000:
-        return 'Moderate'
-    else:
-        return 'Major'
+import time
+import numpy as np
+from severity import classify_severity, area_ratio, VIDEO_FRAME_SIZE
+from image_decode import decode_image
+from frame_buffers import FrameRing
+from evidence import EvidenceBuffer
+from motion_gate import MotionGate
+from metrics import timed
 
 
 def calculate_iou(box1, box2):
@@ -48,70 +45,256 @@ def calculate_iou(box1, box2):
     return inter_area / union_area
 
 
-def detect_image(image_path, model, imgsz=416):
-    """
-    Detect potholes in a single image.
-    Returns: (img_with_boxes, detections_list, total, severity_breakdown, annotated_base64)
-    """
-    img = cv2.imread(image_path)
-    if img is None:
-        return None, [], 0, {'Minor': 0, 'Moderate': 0, 'Major': 0}, None
-
-    # Resize large images to save memory (keep aspect ratio for annotation)
-    h, w = img.shape[:2]
-    max_dim = 1024
-    if max(h, w) > max_dim:
-        scale = max_dim / max(h, w)
-        img = cv2.resize(img, (int(w * scale), int(h * scale)))
-
-    # Run detection with smaller inference size
-    results = model(img, imgsz=imgsz, verbose=False)
-
+@timed('annotate')
+def draw_detections(img, detections, scale=1.0):
+    """Draw severity-coloured boxes and labels onto img in place (bboxes multiplied by scale)."""
+    for d in detections:
+        x1, y1, x2, y2 = [int(v * scale) for v in d['bbox']]
+        conf = d['confidence']
+        sev = d['severity']
+        color = (0, 255, 0) if sev == 'Minor' else (0, 200, 255) if sev == 'Moderate' else (0, 0, 255)
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
+        label = f"{sev} ({conf:.2f})"
+        cv2.putText(img, label, (x1, max(10, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return img
+
+
+def parse_boxes(result):
+    """Extract [(x1, y1, x2, y2, conf), ...] as floats from one YOLO result."""
+    parsed = []
+    for box in getattr(result, 'boxes', []):
+        try:
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
+            conf = float(box.conf[0])
+        except Exception:
+            coords = box.xyxy[0]
+            x1, y1, x2, y2 = int(coords[0]), int(coords[1]), int(coords[2]), int(coords[3])
+            conf = float(box.conf[0]) if hasattr(box, 'conf') else 0.0
+        parsed.append((float(x1), float(y1), float(x2), float(y2), conf))
+    return parsed
+
+
+def build_detections(results, frame_size, source):
+    """Detection dicts (int bbox, confidence, area, area_ratio, severity) from YOLO results."""
     detections = []
-    total = 0
-    severity_breakdown = {'Minor': 0, 'Moderate': 0, 'Major': 0}
-
     for r in results:
-        boxes = getattr(r, 'boxes', [])
-        for box in boxes:
-            try:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                conf = float(box.conf[0])
-            except Exception:
-                coords = box.xyxy[0]
-                x1, y1, x2, y2 = int(coords[0]), int(coords[1]), int(coords[2]), int(coords[3])
-                conf = float(box.conf[0]) if hasattr(box, 'conf') else 0.0
-
+        for x1, y1, x2, y2, conf in parse_boxes(r):
             x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
             width = x2 - x1
             height = y2 - y1
             area = width * height
-            severity = classify_severity(area)
-
             detections.append({
                 'bbox': [x1, y1, x2, y2],
                 'confidence': round(conf, 3),
                 'area': area,
-                'severity': severity,
+                'area_ratio': round(area_ratio(area, frame_size), 6),
+                'severity': classify_severity(area, frame_size, source),
             })
+    return detections
 
-            total += 1
-            severity_breakdown[severity] = severity_breakdown.get(severity, 0) + 1
 
-    # Draw bounding boxes
+def _overlap(box, boxes, metric='iou'):
+    """Overlap of one [x1, y1, x2, y2] box against an (N, 4) array, as IoU or intersection-over-smaller."""
+    iw = np.maximum(0, np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]))
+    ih = np.maximum(0, np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]))
+    inter = iw * ih
+    area = max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+    areas = np.maximum(0, boxes[:, 2] - boxes[:, 0]) * np.maximum(0, boxes[:, 3] - boxes[:, 1])
+    denom = np.minimum(area, areas) if metric == 'ios' else area + areas - inter
+    return np.where(denom > 0, inter / np.maximum(denom, 1e-9), 0.0)
+
+
+def merge_tile_boxes(boxes, scores, threshold=0.5):
+    """
+    Greedy non-maximum merging for sliced inference.
+
+    Tile borders cut potholes into partial boxes that barely overlap in IoU
+    terms but sit almost entirely inside each other, so boxes are matched on
+    intersection-over-smaller and each group is replaced by its union box
+    (keeping the best score). Returns (merged_boxes, merged_scores).
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    order = np.argsort(-scores, kind='stable')
+
+    merged_boxes, merged_scores = [], []
+    while order.size > 0:
+        box = boxes[order[0]].copy()
+        score = float(scores[order[0]])
+        rest = order[1:]
+        # Grow the union until no remaining box matches it
+        while rest.size > 0:
+            matched = _overlap(box, boxes[rest], metric='ios') >= threshold
+            if not matched.any():
+                break
+            group = boxes[rest[matched]]
+            box = np.array([min(box[0], group[:, 0].min()), min(box[1], group[:, 1].min()),
+                            max(box[2], group[:, 2].max()), max(box[3], group[:, 3].max())], dtype=np.float32)
+            rest = rest[~matched]
+        merged_boxes.append(box.tolist())
+        merged_scores.append(score)
+        order = rest
+
+    return merged_boxes, merged_scores
+
+
+def detect_image(image, model, imgsz=416, max_dim=1024):
+    """
+    Detect potholes in a single image (file path or encoded bytes).
+    Large images are decoded straight down to max_dim (see image_decode.py).
+    Returns: (img_with_boxes, detections_list, total, severity_breakdown, stats)
+    """
+    img = decode_image(image, max_dim=max_dim)
+    if img is None:
+        return None, [], 0, {'Minor': 0, 'Moderate': 0, 'Major': 0}, None
+
+    frame_size = (img.shape[1], img.shape[0])
+
+    # Run detection with smaller inference size
+    with timed('inference'):
+        results = model(img, imgsz=imgsz, verbose=False)
+
+    detections = build_detections(results, frame_size, 'image')
+    total = len(detections)
+    severity_breakdown = {'Minor': 0, 'Moderate': 0, 'Major': 0}
     for d in detections:
-        x1, y1, x2, y2 = d['bbox']
-        conf = d['confidence']
-        sev = d['severity']
-        color = (0, 255, 0) if sev == 'Minor' else (0, 200, 255) if sev == 'Moderate' else (0, 0, 255)
-        cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
-        label = f"{sev} ({conf:.2f})"
-        cv2.putText(img, label, (x1, max(10, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        severity_breakdown[d['severity']] += 1
+
+    # Draw bounding boxes
+    draw_detections(img, detections)
+
+    stats = {'mode': 'image', 'source': 'image', 'frame_size': list(frame_size)}
+
+    return img, detections, total, severity_breakdown, stats
+
 
-    return img, detections, total, severity_breakdown, None
+def _tile_origins(length, tile_size, stride):
+    """Start offsets of tiles along one axis; the last tile is flush with the edge."""
+    if length <= tile_size:
+        return [0]
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
 
 
-def detect_video(video_path, model, iou_threshold=0.5, frame_skip=5, imgsz=416, max_frames=60):
+def detect_image_sliced(image, model, tile_size=640, overlap=0.2, batch_size=None,
+                        imgsz=None, merge_threshold=0.5, full_frame=True, max_dim=1024):
+    """
+    Detect potholes in a high-resolution image using overlapping tiles.
+
+    The image is decoded at full resolution and cut into tile_size x tile_size
+    tiles overlapping by `overlap` (fraction of a tile). All tiles (plus an
+    optional downscaled full-frame pass for potholes larger than a tile) are
+    sent through the model as one batch, or in chunks of batch_size, and the
+    per-tile boxes are merged in full-image coordinates with vectorized
+    non-maximum merging (see merge_tile_boxes).
+
+    Args:
+        image: Path to image file, or its encoded bytes
+        model: YOLO model
+        tile_size: Tile edge in pixels of the original image
+        overlap: Fractional overlap between neighbouring tiles (0 <= overlap < 1)
+        batch_size: Tiles per model call (None = all tiles in one call)
+        imgsz: Inference size per tile (defaults to tile_size, i.e. no downscaling)
+        merge_threshold: Intersection-over-smaller threshold for merging boxes across tiles
+        full_frame: Also run the whole image at imgsz to catch very large potholes
+        max_dim: Max dimension of the returned annotated image
+
+    Returns:
+        (annotated_image, detections, total, severity_breakdown, stats)
+        detections bboxes are in full-image coordinates; stats holds tile
+        layout and per-tile timings.
+    """
+    img = decode_image(image)
+    if img is None:
+        return None, [], 0, {'Minor': 0, 'Moderate': 0, 'Major': 0}, None
+
+    start = time.perf_counter()
+    h, w = img.shape[:2]
+    imgsz = imgsz or tile_size
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    # Tiles are numpy views into img, so cutting them allocates nothing
+    tiles = []
+    for y in _tile_origins(h, tile_size, stride):
+        for x in _tile_origins(w, tile_size, stride):
+            tw, th = min(tile_size, w - x), min(tile_size, h - y)
+            tiles.append(((x, y, tw, th), img[y:y + th, x:x + tw], False))
+    if full_frame and len(tiles) > 1:
+        tiles.append(((0, 0, w, h), img, True))
+
+    batch_size = batch_size or len(tiles)
+    boxes, scores, tile_timings = [], [], []
+    for i in range(0, len(tiles), batch_size):
+        batch = tiles[i:i + batch_size]
+        t0 = time.perf_counter()
+        with timed('inference'):
+            results = model([t[1] for t in batch], imgsz=imgsz, verbose=False)
+        batch_ms = (time.perf_counter() - t0) * 1000
+
+        for ((x, y, tw, th), _, is_full), r in zip(batch, results):
+            parsed = parse_boxes(r)
+            for x1, y1, x2, y2, conf in parsed:
+                boxes.append([x1 + x, y1 + y, x2 + x, y2 + y])
+                scores.append(conf)
+
+            # Ultralytics reports per-image preprocess/inference/postprocess ms
+            speed = getattr(r, 'speed', None) or {}
+            tile_ms = sum(v for v in speed.values() if v is not None) if speed else batch_ms / len(batch)
+            tile_timings.append({
+                'tile': [x, y, tw, th],
+                'full_frame': is_full,
+                'detections': len(parsed),
+                'ms': round(tile_ms, 2),
+            })
+
+    raw_count = len(boxes)
+    with timed('merge'):
+        boxes, scores = merge_tile_boxes(boxes, scores, merge_threshold)
+
+    # Annotated output uses the same <= max_dim scale as detect_image
+    scale = min(1.0, max_dim / max(h, w))
+
+    detections = []
+    severity_breakdown = {'Minor': 0, 'Moderate': 0, 'Major': 0}
+    for box, conf in zip(boxes, scores):
+        x1, y1, x2, y2 = [int(v) for v in box]
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        area = (x2 - x1) * (y2 - y1)
+        severity = classify_severity(area, (w, h), 'image')
+
+        detections.append({
+            'bbox': [x1, y1, x2, y2],
+            'confidence': round(conf, 3),
+            'area': area,
+            'area_ratio': round(area_ratio(area, (w, h)), 6),
+            'severity': severity,
+        })
+        severity_breakdown[severity] = severity_breakdown.get(severity, 0) + 1
+
+    if scale < 1.0:
+        with timed('resize'):
+            img = cv2.resize(img, (int(w * scale), int(h * scale)))
+    draw_detections(img, detections, scale=scale)
+
+    stats = {
+        'mode': 'sliced',
+        'source': 'image',
+        'frame_size': [w, h],
+        'tile_size': tile_size,
+        'overlap': overlap,
+        'batch_size': batch_size,
+        'tiles': len(tile_timings),
+        'raw_detections': raw_count,
+        'tile_timings': tile_timings,
+        'total_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+    return img, detections, len(detections), severity_breakdown, stats
+
+
+def detect_video(video_path, model, iou_threshold=0.5, frame_skip=5, imgsz=416, max_frames=60,
+                 motion_gate=True, detection_budget=None, evidence_top_k=8):
     """
     Detect potholes in video, deduplicate across frames using IoU.
     
@@ -122,9 +305,17 @@ def detect_video(video_path, model, iou_threshold=0.5, frame_skip=5, imgsz=416,
         frame_skip: Skip frames for speed (default 5 to save memory)
         imgsz: Inference image size
         max_frames: Max frames to process (limit memory usage)
+        motion_gate: Skip inference on frames nearly identical to the last
+            inferred one (MotionGate instance, True for defaults, or False)
+        detection_budget: Stop early once this many unique potholes are found
+        evidence_top_k: Max evidence crops kept (best one per unique pothole)
     
     Returns:
-        (last_frame_with_boxes, unique_detections_list, unique_total, severity_breakdown, None)
+        (best_frame_with_boxes, unique_detections_list, unique_total, severity_breakdown, stats)
+        The annotated frame is the one holding the most confident detection
+        (the last inferred frame if there were none), with that frame's own
+        boxes. Unique detections carry a track_id; stats['evidence'] holds the
+        JPEG-encoded best crop per track (see evidence.py).
     """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -133,9 +324,22 @@ def detect_video(video_path, model, iou_threshold=0.5, frame_skip=5, imgsz=416,
     unique_detections = []  # List of unique detections across all frames
     frame_count = 0
     processed_frame = None
+    processed_dets = []
+    best_conf = -1.0
+    frame = None
+    ring = FrameRing(VIDEO_FRAME_SIZE)
+    evidence = EvidenceBuffer(evidence_top_k)
+
+    gate = MotionGate() if motion_gate is True else (motion_gate or None)
+    sampled = 0
+    inferred = 0
+    infer_cpu = 0.0
+    early_exit = False
+    start = time.perf_counter()
 
     while True:
-        ret, frame = cap.read()
+        with timed('decode'):
+            ret, frame = cap.read(frame)  # decodes into the previous frame's array
         if not ret:
             break
 
@@ -149,36 +353,30 @@ def detect_video(video_path, model, iou_threshold=0.5, frame_skip=5, imgsz=416,
         if frame_count // frame_skip > max_frames:
             break
 
-        # Resize frame to speed up detection and save memory
-        frame_resized = cv2.resize(frame, (480, 360))
+        # Early exit once the per-clip detection budget is met
+        if detection_budget and len(unique_detections) >= detection_budget:
+            early_exit = True
+            break
+
+        sampled += 1
+
+        # Skip inference when the scene hasn't changed (e.g. stopped at a light)
+        if gate is not None and not gate.should_infer(frame):
+            continue
+
+        # Resize frame to speed up detection and save memory (into a reused buffer)
+        with timed('resize'):
+            frame_resized = ring.resize(frame)
 
         # Run detection with smaller inference size
-        results = model(frame_resized, imgsz=imgsz, verbose=False)
-
-        frame_detections = []
-        for r in results:
-            boxes = getattr(r, 'boxes', [])
-            for box in boxes:
-                try:
-                    x1, y1, x2, y2 = box.xyxy[0].tolist()
-                    conf = float(box.conf[0])
-                except Exception:
-                    coords = box.xyxy[0]
-                    x1, y1, x2, y2 = int(coords[0]), int(coords[1]), int(coords[2]), int(coords[3])
-                    conf = float(box.conf[0]) if hasattr(box, 'conf') else 0.0
-
-                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                width = x2 - x1
-                height = y2 - y1
-                area = width * height
-                severity = classify_severity(area)
-
-                frame_detections.append({
-                    'bbox': [x1, y1, x2, y2],
-                    'confidence': round(conf, 3),
-                    'area': area,
-                    'severity': severity,
-                })
+        cpu_start = time.process_time()
+        with timed('inference'):
+            results = model(frame_resized, imgsz=imgsz, verbose=False)
+        infer_cpu += time.process_time() - cpu_start
+        inferred += 1
+
+        frame_detections = build_detections(results, VIDEO_FRAME_SIZE, 'video')
+        timestamp_ms = round(cap.get(cv2.CAP_PROP_POS_MSEC))
 
         # Deduplicate: only add if IoU < threshold with existing detections
         for det in frame_detections:
@@ -187,15 +385,24 @@ def detect_video(video_path, model, iou_threshold=0.5, frame_skip=5, imgsz=416,
                 iou = calculate_iou(det['bbox'], existing['bbox'])
                 if iou >= iou_threshold:
                     is_duplicate = True
+                    track_id = existing['track_id']
                     # Update confidence if this detection is higher
                     if det['confidence'] > existing['confidence']:
                         existing['confidence'] = det['confidence']
                     break
 
             if not is_duplicate:
-                unique_detections.append(det)
-
-        processed_frame = frame_resized.copy()
+                track_id = len(unique_detections) + 1
+                unique_detections.append(dict(det, track_id=track_id))
+            # Crop now (JPEG-encoded) so no frame is held for evidence
+            evidence.offer(frame_resized, det, track_id, timestamp_ms)
+
+        # Pin the frame to annotate instead of copying every frame
+        frame_best = max((d['confidence'] for d in frame_detections), default=-1.0)
+        if frame_best > best_conf or best_conf < 0:
+            best_conf = max(best_conf, frame_best)
+            processed_frame = ring.keep()
+            processed_dets = frame_detections
 
     cap.release()
 
@@ -205,21 +412,37 @@ def detect_video(video_path, model, iou_threshold=0.5, frame_skip=5, imgsz=416,
     for d in unique_detections:
         severity_breakdown[d['severity']] += 1
 
-    # Draw on last processed frame (or any frame for annotation)
+    # Draw only the boxes actually visible in the kept frame
     if processed_frame is not None:
-        for d in unique_detections:
-            x1, y1, x2, y2 = d['bbox']
-            conf = d['confidence']
-            sev = d['severity']
-            color = (0, 255, 0) if sev == 'Minor' else (0, 200, 255) if sev == 'Moderate' else (0, 0, 255)
-            cv2.rectangle(processed_frame, (x1, y1), (x2, y2), color, 2)
-            label = f"{sev} ({conf:.2f})"
-            cv2.putText(processed_frame, label, (x1, max(10, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-    return processed_frame, unique_detections, total, severity_breakdown, None
-
-
-def detect_pothole(file_path, model, is_video=None, imgsz=416):
+        draw_detections(processed_frame, processed_dets)
+
+    # Gated frames would have cost about one average inference each
+    gated = gate.gated if gate is not None else 0
+    avg_infer_ms = infer_cpu * 1000 / inferred if inferred else 0.0
+    stats = {
+        'mode': 'video',
+        'source': 'video',
+        'frame_size': list(VIDEO_FRAME_SIZE),
+        'frames_read': frame_count,
+        'frames_sampled': sampled,
+        'frames_inferred': inferred,
+        'frames_gated': gated,
+        'gate_ms': round(gate.gate_time * 1000, 2) if gate is not None else 0.0,
+        'avg_inference_cpu_ms': round(avg_infer_ms, 2),
+        'cpu_saved_ms': round(max(0.0, gated * avg_infer_ms - (gate.gate_time * 1000 if gate else 0.0)), 2),
+        'early_exit': early_exit,
+        'detection_budget': detection_budget,
+        'total_ms': round((time.perf_counter() - start) * 1000, 2),
+        'evidence': evidence.ranked(),
+    }
+
+    return processed_frame, unique_detections, total, severity_breakdown, stats
+
+
+def detect_pothole(file_path, model, is_video=None, imgsz=416, sliced=False,
+                   tile_size=640, tile_overlap=0.2, tile_batch_size=None,
+                   motion_gate=True, detection_budget=None, stream=False, frame_skip=5,
+                   evidence_top_k=8, checkpoint_path=None, image_bytes=None):
     """
     Main entry point: detect potholes in image or video.
     
@@ -228,21 +451,37 @@ def detect_pothole(file_path, model, is_video=None, imgsz=416):
         model: Loaded YOLO model
         is_video: If None, auto-detect; if True/False, force type
         imgsz: Inference image size (smaller = less memory)
+        sliced: Use tiled inference for images (see detect_image_sliced)
+        tile_size, tile_overlap, tile_batch_size: Sliced inference settings
+        motion_gate, detection_budget: Video frame gating settings (see detect_video)
+        stream: Use the uncapped, bounded-memory video mode (see video_stream.py)
+        frame_skip, checkpoint_path: Streaming video settings
+        evidence_top_k: Max evidence crops kept per video
+        image_bytes: Encoded image already in memory (e.g. an upload); decoded
+            instead of reading file_path again
     
     Returns:
-        (annotated_image, detections, total, severity_breakdown)
+        (annotated_image, detections, total, severity_breakdown, stats)
+        stats is a dict of processing details (mode, severity source, frame_size
+        the bboxes are expressed in, ...), or None if the file could not be read.
     """
-    import gc
     if is_video is None:
         # Auto-detect based on file extension
         video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv'}
         ext = os.path.splitext(file_path)[1].lower()
         is_video = ext in video_extensions
 
-    if is_video:
-        result = detect_video(file_path, model, imgsz=imgsz)
+    if is_video and stream:
+        from video_stream import detect_video_stream
+        result = detect_video_stream(file_path, model, frame_skip=frame_skip, imgsz=imgsz,
+                                     motion_gate=motion_gate, detection_budget=detection_budget,
+                                     top_k=evidence_top_k, checkpoint_path=checkpoint_path)
+    elif is_video:
+        result = detect_video(file_path, model, imgsz=imgsz, motion_gate=motion_gate,
+                              detection_budget=detection_budget, evidence_top_k=evidence_top_k)
+    elif sliced:
+        result = detect_image_sliced(file_path if image_bytes is None else image_bytes, model,
+                                     tile_size=tile_size, overlap=tile_overlap, batch_size=tile_batch_size)
     else:
-        result = detect_image(file_path, model, imgsz=imgsz)
-    
-    gc.collect()
+        result = detect_image(file_path if image_bytes is None else image_bytes, model, imgsz=imgsz)
     return result
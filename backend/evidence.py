@@ -0,0 +1,113 @@
+"""
+Evidence keyframes for video detections.
+
+EvidenceBuffer keeps the best crop per tracked pothole, bounded to the top_k
+highest confidences and held JPEG-encoded, so a clip of any length never
+holds more than a few small images. contact_sheet() lays those crops out on
+one captioned JPEG for reviewers.
+"""
+
+import base64
+
+import cv2
+import numpy as np
+
+
+def encode_jpeg(img, quality=85):
+    ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes() if ok else None
+
+
+def decode_jpeg(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class EvidenceBuffer:
+    """
+    Best crop per tracked pothole, bounded to the top_k highest confidences.
+    Crops are held JPEG-encoded, so memory stays at roughly top_k small images.
+    """
+
+    def __init__(self, top_k=8, pad=0.25):
+        self.top_k = top_k
+        self.pad = pad
+        self.items = {}  # track_id -> evidence dict
+
+    def offer(self, frame, det, track_id, timestamp_ms):
+        """Keep a crop of det if it is the track's best so far and ranks in the top_k."""
+        conf = det['confidence']
+        current = self.items.get(track_id)
+        if current is not None and current['confidence'] >= conf:
+            return False
+        if current is None and len(self.items) >= self.top_k:
+            weakest = min(self.items.values(), key=lambda e: e['confidence'])
+            if weakest['confidence'] >= conf:
+                return False
+            del self.items[weakest['track_id']]
+
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = det['bbox']
+        px, py = int((x2 - x1) * self.pad), int((y2 - y1) * self.pad)
+        crop = frame[max(0, y1 - py):min(h, y2 + py), max(0, x1 - px):min(w, x2 + px)]
+        if crop.size == 0:
+            return False
+
+        self.items[track_id] = {
+            'track_id': track_id,
+            'confidence': conf,
+            'severity': det['severity'],
+            'timestamp_ms': timestamp_ms,
+            'bbox': det['bbox'],
+            'jpeg': encode_jpeg(crop),
+        }
+        return True
+
+    def ranked(self):
+        """Evidence dicts, highest confidence first."""
+        return sorted(self.items.values(), key=lambda e: -e['confidence'])
+
+    def state(self):
+        return [dict(e, jpeg=base64.b64encode(e['jpeg']).decode('ascii')) for e in self.items.values()]
+
+    def load_state(self, items):
+        self.items = {e['track_id']: dict(e, jpeg=base64.b64decode(e['jpeg'])) for e in items}
+
+
+SEVERITY_COLORS = {'Minor': (0, 255, 0), 'Moderate': (0, 200, 255), 'Major': (0, 0, 255)}
+
+
+def _caption(ev):
+    parts = [f"#{ev['track_id']}", ev['severity'], f"{ev['confidence']:.2f}"]
+    if ev.get('timestamp_ms') is not None:
+        parts.append(f"{ev['timestamp_ms'] / 1000:.1f}s")
+    return ' '.join(parts)
+
+
+def contact_sheet(evidence, columns=4, cell=160, quality=85):
+    """
+    One JPEG (bytes) with each evidence crop fitted into a cell x cell tile
+    and captioned with track id, severity, confidence and time; None if
+    there is no evidence. Crops are decoded one at a time.
+    """
+    if not evidence:
+        return None
+    columns = max(1, min(columns, len(evidence)))
+    rows = -(-len(evidence) // columns)
+    caption_h = 18
+    sheet = np.full((rows * (cell + caption_h), columns * cell, 3), 24, np.uint8)
+
+    for n, ev in enumerate(evidence):
+        crop = decode_jpeg(ev['jpeg'])
+        if crop is None:
+            continue
+        x0, y0 = (n % columns) * cell, (n // columns) * (cell + caption_h)
+        h, w = crop.shape[:2]
+        scale = min(cell / w, cell / h)
+        tw, th = max(1, int(w * scale)), max(1, int(h * scale))
+        ox, oy = x0 + (cell - tw) // 2, y0 + (cell - th) // 2
+        sheet[oy:oy + th, ox:ox + tw] = cv2.resize(crop, (tw, th), interpolation=cv2.INTER_AREA)
+        color = SEVERITY_COLORS.get(ev.get('severity'), (255, 255, 255))
+        cv2.rectangle(sheet, (x0, y0), (x0 + cell - 1, y0 + cell - 1), color, 1)
+        cv2.putText(sheet, _caption(ev), (x0 + 4, y0 + cell + caption_h - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1, cv2.LINE_AA)
+    return encode_jpeg(sheet, quality)
@@ -0,0 +1,106 @@
+"""
+Byte-range and conditional serving for report evidence files.
+
+Evidence files are written once under a unique name, so they get strong
+ETags and long cache lifetimes. Range requests (what video players send
+while scrubbing) are answered with 206 and only the requested bytes:
+whole-file and open-ended ranges are handed to the server's
+wsgi.file_wrapper (gunicorn turns this into sendfile), bounded ranges are
+streamed in chunks. If-None-Match / If-Modified-Since give 304, and
+If-Range falls back to the full file when the validator is stale.
+"""
+
+import mimetypes
+import os
+
+from flask import Response, request
+from werkzeug.http import http_date, parse_date
+from werkzeug.security import safe_join
+
+CHUNK_SIZE = 256 * 1024
+CACHE_MAX_AGE = int(os.environ.get('EVIDENCE_CACHE_MAX_AGE', 86400))
+
+
+def _etag(st):
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _not_modified(etag, mtime):
+    inm = request.headers.get('If-None-Match')
+    if inm is not None:
+        return etag in [t.strip() for t in inm.split(',')] or inm.strip() == '*'
+    ims = parse_date(request.headers.get('If-Modified-Since'))
+    return ims is not None and int(mtime) <= ims.timestamp()
+
+
+def _range_applies(etag, mtime):
+    """If-Range: only honour Range when the client's validator still matches."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    since = parse_date(if_range)
+    return since is not None and int(mtime) <= since.timestamp()
+
+
+def _read_range(f, start, length):
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def send_evidence_file(directory, filepath):
+    """Response for directory/filepath honouring Range and conditional headers; None if missing."""
+    path = safe_join(directory, filepath)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    st = os.stat(path)
+    size = st.st_size
+    etag = _etag(st)
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': etag,
+        'Last-Modified': http_date(st.st_mtime),
+        'Cache-Control': f'public, max-age={CACHE_MAX_AGE}',
+    }
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if _not_modified(etag, st.st_mtime):
+        return Response(status=304, headers=headers)
+
+    start, end = 0, size  # end exclusive
+    status = 200
+    byte_range = request.range if request.method in ('GET', 'HEAD') else None
+    if byte_range is not None and _range_applies(etag, st.st_mtime):
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        start, end = bounds
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+
+    length = end - start
+    headers['Content-Length'] = str(length)
+    f = open(path, 'rb')
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None and end == size:
+        # Serves from the current offset to EOF, so zero-copy is safe for open-ended ranges
+        f.seek(start)
+        body = file_wrapper(f, CHUNK_SIZE)
+    else:
+        body = _read_range(f, start, length)
+
+    response = Response(body, status=status, mimetype=mimetype, headers=headers, direct_passthrough=True)
+    response.call_on_close(f.close)  # HEAD requests never iterate the body
+    return response
@@ -0,0 +1,53 @@
+"""
+Preallocated frame buffers for video loops.
+
+Resizing every sampled frame with cv2.resize allocates a new array per
+frame, and keeping one for annotation used to mean another copy. FrameRing
+resizes into a small ring of buffers allocated once (cv2.resize with dst=),
+and keep() pins the current buffer so it survives later frames without
+being copied.
+"""
+
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """
+    Ring of resize targets of one size.
+
+    Args:
+        size: (width, height) every frame is resized to
+        slots: Buffers in the ring; 2 is enough for one kept frame
+    """
+
+    def __init__(self, size, slots=2):
+        self.size = tuple(size)
+        self.slots = max(1, slots)
+        self.buffers = [None] * self.slots
+        self.allocations = 0
+        self._current = None
+        self._kept = None
+        self._next = 0
+
+    def resize(self, frame):
+        """frame resized into the next free buffer (never the kept one); valid until the ring wraps."""
+        i = self._next
+        if i == self._kept and self.slots > 1:
+            i = (i + 1) % self.slots
+        shape = (self.size[1], self.size[0]) + frame.shape[2:]
+        buf = self.buffers[i]
+        if buf is None or buf.shape != shape or buf.dtype != frame.dtype:
+            buf = self.buffers[i] = np.empty(shape, frame.dtype)
+            self.allocations += 1
+            if i == self._kept:
+                self._kept = None
+        cv2.resize(frame, self.size, dst=buf)
+        self._current = i
+        self._next = (i + 1) % self.slots
+        return buf
+
+    def keep(self):
+        """Pin the buffer last returned by resize() until the next keep(); returns it."""
+        self._kept = self._current
+        return self.buffers[self._current]
@@ -0,0 +1,274 @@
+"""
+GPS tracks for geotagged dashcam video.
+
+Parses GPX, CSV and NMEA (raw logs or NMEA sentences inside SRT subtitles)
+into a GpsTrack whose times are seconds from the start of the video, and
+interpolates a coordinate for any video timestamp. Lookups binary-search a
+sorted time array, so they stay cheap for hours-long tracks. exif_gps()
+reads the single fix embedded in a photo.
+"""
+
+import csv
+import io
+import os
+import re
+import shutil
+import subprocess
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+class GpsTrack:
+    """
+    Time-sorted GPS fixes.
+
+    Args:
+        times: Seconds relative to video start (any order; sorted on init)
+        lats, lons: Coordinates matching times
+    """
+
+    def __init__(self, times, lats, lons):
+        order = np.argsort(np.asarray(times, dtype=np.float64), kind='stable')
+        self.times = np.asarray(times, dtype=np.float64)[order]
+        self.lats = np.asarray(lats, dtype=np.float64)[order]
+        self.lons = np.asarray(lons, dtype=np.float64)[order]
+
+    def __len__(self):
+        return len(self.times)
+
+    def positions(self, timestamps_ms, offset_s=0.0):
+        """
+        Interpolated (lat, lon) for each video timestamp in milliseconds.
+        offset_s shifts the video clock against the track clock. Timestamps
+        outside the track are clamped to its first/last fix.
+        """
+        t = np.asarray(timestamps_ms, dtype=np.float64) / 1000.0 + offset_s
+        if len(self.times) == 0:
+            return [(None, None)] * len(t)
+        if len(self.times) == 1:
+            return [(float(self.lats[0]), float(self.lons[0]))] * len(t)
+
+        # Index of the fix at or after each timestamp, then blend with the one before
+        idx = np.clip(np.searchsorted(self.times, t, side='left'), 1, len(self.times) - 1)
+        t0, t1 = self.times[idx - 1], self.times[idx]
+        span = np.where(t1 > t0, t1 - t0, 1.0)
+        frac = np.clip((t - t0) / span, 0.0, 1.0)
+        lats = self.lats[idx - 1] + (self.lats[idx] - self.lats[idx - 1]) * frac
+        lons = self.lons[idx - 1] + (self.lons[idx] - self.lons[idx - 1]) * frac
+        return [(float(a), float(b)) for a, b in zip(lats, lons)]
+
+    def position(self, timestamp_ms, offset_s=0.0):
+        """Interpolated (lat, lon) for a single video timestamp in milliseconds."""
+        return self.positions([timestamp_ms], offset_s)[0]
+
+
+def _parse_time(value):
+    """Seconds from a numeric string (s, or ms if huge) or an ISO 8601 timestamp."""
+    value = value.strip()
+    try:
+        number = float(value)
+        return number / 1000.0 if number > 1e11 else number
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _relative(times):
+    start = min(times) if times else 0.0
+    return [t - start for t in times]
+
+
+def parse_gpx(text):
+    """GpsTrack from GPX (trkpt/rtept/wpt with <time>); times relative to the first fix."""
+    root = ET.fromstring(text)
+    times, lats, lons = [], [], []
+    for el in root.iter():
+        tag = el.tag.rsplit('}', 1)[-1]
+        if tag not in ('trkpt', 'rtept', 'wpt'):
+            continue
+        time_el = next((c for c in el if c.tag.rsplit('}', 1)[-1] == 'time'), None)
+        if time_el is None or not time_el.text:
+            continue
+        times.append(_parse_time(time_el.text))
+        lats.append(float(el.get('lat')))
+        lons.append(float(el.get('lon')))
+    return GpsTrack(_relative(times), lats, lons)
+
+
+def parse_csv(text):
+    """
+    GpsTrack from CSV with a header row. Recognised columns: time/timestamp/t/
+    seconds/ms, lat/latitude, lon/lng/longitude. Times are made relative to the
+    first row unless the column is already video-relative (seconds or ms).
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    fields = {f.strip().lower(): f for f in (reader.fieldnames or [])}
+
+    def column(*names):
+        return next((fields[n] for n in names if n in fields), None)
+
+    time_col = column('time', 'timestamp', 't', 'seconds', 'ms', 'time_ms')
+    lat_col = column('lat', 'latitude')
+    lon_col = column('lon', 'lng', 'longitude')
+    if not (time_col and lat_col and lon_col):
+        raise ValueError('CSV GPS track needs time, lat and lon columns')
+
+    name = time_col.strip().lower()
+    is_ms = name in ('ms', 'time_ms')
+    times, lats, lons = [], [], []
+    for row in reader:
+        try:
+            t = float(row[time_col]) / 1000.0 if is_ms else _parse_time(row[time_col])
+            times.append(t)
+            lats.append(float(row[lat_col]))
+            lons.append(float(row[lon_col]))
+        except (ValueError, TypeError):
+            continue
+    # t/seconds/ms already count from video start; only absolute times are rebased
+    if name in ('time', 'timestamp'):
+        times = _relative(times)
+    return GpsTrack(times, lats, lons)
+
+
+def _nmea_coord(value, hemisphere):
+    """ddmm.mmmm / dddmm.mmmm + N/S/E/W -> signed decimal degrees."""
+    if not value:
+        return None
+    dot = value.index('.') if '.' in value else len(value)
+    degrees = float(value[:dot - 2])
+    minutes = float(value[dot - 2:])
+    coord = degrees + minutes / 60.0
+    return -coord if hemisphere in ('S', 'W') else coord
+
+
+def _nmea_fix(sentence):
+    """(utc_seconds_of_day, lat, lon) from an RMC or GGA sentence, or None."""
+    body = sentence.strip().lstrip('$').split('*', 1)[0]
+    parts = body.split(',')
+    kind = parts[0][-3:]
+    try:
+        if kind == 'RMC' and len(parts) > 6 and parts[2] == 'A':
+            hhmmss, lat, lat_h, lon, lon_h = parts[1], parts[3], parts[4], parts[5], parts[6]
+        elif kind == 'GGA' and len(parts) > 6 and parts[6] not in ('', '0'):
+            hhmmss, lat, lat_h, lon, lon_h = parts[1], parts[2], parts[3], parts[4], parts[5]
+        else:
+            return None
+        seconds = int(hhmmss[0:2]) * 3600 + int(hhmmss[2:4]) * 60 + float(hhmmss[4:])
+        return seconds, _nmea_coord(lat, lat_h), _nmea_coord(lon, lon_h)
+    except (ValueError, IndexError):
+        return None
+
+
+def parse_nmea(text):
+    """GpsTrack from a raw NMEA log (RMC/GGA sentences); times relative to the first fix."""
+    times, lats, lons = [], [], []
+    last_t = None
+    day_offset = 0.0
+    for line in text.splitlines():
+        start = line.find('$')
+        if start < 0:
+            continue
+        fix = _nmea_fix(line[start:])
+        if not fix or fix[1] is None:
+            continue
+        t = fix[0] + day_offset
+        if last_t is not None and t < last_t - 43200:
+            # Rolled over midnight UTC
+            day_offset += 86400
+            t += 86400
+        if last_t is not None and t == last_t:
+            continue  # RMC and GGA for the same fix
+        last_t = t
+        times.append(t)
+        lats.append(fix[1])
+        lons.append(fix[2])
+    return GpsTrack(_relative(times), lats, lons)
+
+
+_SRT_TIME = re.compile(r'(\d+):(\d+):(\d+)[,.](\d+)\s*-->')
+
+
+def parse_srt(text):
+    """
+    GpsTrack from SRT subtitles carrying NMEA sentences. The subtitle cue start
+    time is used as the video time, so no clock alignment is needed.
+    """
+    times, lats, lons = [], [], []
+    cue_start = None
+    for line in text.splitlines():
+        m = _SRT_TIME.search(line)
+        if m:
+            h, mnt, sec, frac = m.groups()
+            cue_start = int(h) * 3600 + int(mnt) * 60 + int(sec) + int(frac) / (10 ** len(frac))
+            continue
+        start = line.find('$')
+        if cue_start is None or start < 0:
+            continue
+        fix = _nmea_fix(line[start:])
+        if fix and fix[1] is not None:
+            times.append(cue_start)
+            lats.append(fix[1])
+            lons.append(fix[2])
+    return GpsTrack(times, lats, lons)
+
+
+def extract_subtitle_track(video_path, timeout=60):
+    """SRT text of the video's first embedded subtitle stream (needs ffmpeg on PATH), or None."""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return None
+    try:
+        out = subprocess.run([ffmpeg, '-v', 'error', '-i', video_path, '-map', '0:s:0', '-f', 'srt', '-'],
+                             capture_output=True, timeout=timeout, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    text = out.stdout.decode('utf-8', errors='replace')
+    return text if out.returncode == 0 and '$' in text else None
+
+
+def load_track(path):
+    """GpsTrack from a GPX/CSV/NMEA/SRT sidecar file (format chosen by extension, then content)."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.gpx' or text.lstrip().startswith('<'):
+        return parse_gpx(text)
+    if ext == '.srt' or _SRT_TIME.search(text):
+        return parse_srt(text)
+    if ext in ('.nmea', '.log', '.txt') or text.lstrip().startswith('$'):
+        return parse_nmea(text)
+    return parse_csv(text)
+
+
+def geotag_detections(detections, track, offset_s=0.0):
+    """Set lat/lon on each detection from its timestamp_ms (in place). Returns detections."""
+    timed = [d for d in detections if d.get('timestamp_ms') is not None]
+    for d, (lat, lon) in zip(timed, track.positions([d['timestamp_ms'] for d in timed], offset_s)):
+        d['lat'] = lat
+        d['lon'] = lon
+    return detections
+
+
+def _dms_degrees(dms, ref):
+    degrees = sum(float(v) / div for v, div in zip(dms, (1, 60, 3600)))
+    return -degrees if ref in ('S', 'W', b'S', b'W') else degrees
+
+
+def exif_gps(path):
+    """(lat, lon) from a photo's EXIF GPS block (needs Pillow), or None."""
+    try:
+        from PIL import Image
+        with Image.open(path) as im:
+            gps = im.getexif().get_ifd(0x8825)  # GPSInfo
+        lat = _dms_degrees(gps[2], gps.get(1, 'N'))
+        lon = _dms_degrees(gps[4], gps.get(3, 'E'))
+    except (ImportError, OSError, KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None
+    return lat, lon
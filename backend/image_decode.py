@@ -0,0 +1,142 @@
+"""
+Image decoding straight to the size detection needs.
+
+decode_image() takes a path or the encoded bytes of an upload and decodes
+in memory. For JPEGs it reads the frame size and EXIF orientation from the
+headers, then lets libjpeg decode at 1/2, 1/4 or 1/8 scale (DCT scaling via
+IMREAD_REDUCED_COLOR_*) so the image lands just above max_dim instead of
+being decoded at full resolution and shrunk afterwards. EXIF orientation is
+applied explicitly, so the result is upright whichever decode path was used.
+"""
+
+import cv2
+import numpy as np
+
+from metrics import timed
+
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                  (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# Start-of-frame markers carrying the image size (not DHT/JPG/DAC, which share the range)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _exif_orientation(tiff):
+    """Orientation tag (1-8) from the TIFF block of an APP1 Exif segment; 1 if absent."""
+    if len(tiff) < 8 or tiff[:2] not in (b'II', b'MM'):
+        return 1
+    order = 'little' if tiff[:2] == b'II' else 'big'
+    offset = int.from_bytes(tiff[4:8], order)
+    if offset + 2 > len(tiff):
+        return 1
+    for n in range(int.from_bytes(tiff[offset:offset + 2], order)):
+        entry = offset + 2 + 12 * n
+        if entry + 12 > len(tiff):
+            break
+        if int.from_bytes(tiff[entry:entry + 2], order) == 0x0112:
+            value = int.from_bytes(tiff[entry + 8:entry + 10], order)
+            return value if 1 <= value <= 8 else 1
+    return 1
+
+
+def jpeg_info(data):
+    """(width, height, orientation) from a JPEG's headers, or None if data is not a JPEG."""
+    if data[:2] != b'\xff\xd8':
+        return None
+    orientation = 1
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # standalone markers
+            i += 2
+            continue
+        length = int.from_bytes(data[i + 2:i + 4], 'big')
+        if marker == 0xE1 and data[i + 4:i + 10] == b'Exif\x00\x00':
+            orientation = _exif_orientation(data[i + 10:i + 2 + length])
+        elif marker in _SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], 'big')
+            width = int.from_bytes(data[i + 7:i + 9], 'big')
+            return width, height, orientation
+        elif marker == 0xDA:  # scan data before any frame header
+            return None
+        i += 2 + length
+    return None
+
+
+def reduction_factor(width, height, max_dim):
+    """Largest JPEG decode scale (8, 4, 2 or 1) that keeps the long side at least max_dim."""
+    for factor, _ in _REDUCED_FLAGS:
+        if max(width, height) // factor >= max_dim:
+            return factor
+    return 1
+
+
+def apply_orientation(img, orientation):
+    """Rotate/flip a decoded image to display orientation (EXIF values 1-8)."""
+    if orientation == 2:
+        return cv2.flip(img, 1)
+    if orientation == 3:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(img, 0)
+    if orientation == 5:
+        return cv2.transpose(img)
+    if orientation == 6:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.flip(cv2.transpose(img), -1)
+    if orientation == 8:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+def decode_image(source, max_dim=None, exact=True):
+    """
+    Upright BGR image from a file path or encoded bytes, or None if it can't be decoded.
+
+    With max_dim the long side is scaled down to max_dim (aspect ratio kept,
+    never upscaled); JPEGs are decoded at reduced resolution to get there.
+    exact=False skips the final resize, leaving the long side anywhere from
+    max_dim up to twice that for JPEGs (callers that shrink further anyway).
+    """
+    if isinstance(source, str):
+        try:
+            with open(source, 'rb') as f:
+                source = f.read()
+        except OSError:
+            return None
+    data = bytes(source) if not isinstance(source, bytes) else source
+    if not data:
+        return None
+
+    info = jpeg_info(data)
+    flags = cv2.IMREAD_COLOR
+    orientation = 1
+    if info:
+        width, height, orientation = info
+        flags = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+        if max_dim and width and height:
+            factor = reduction_factor(width, height, max_dim)
+            if factor > 1:
+                flags = dict(_REDUCED_FLAGS)[factor] | cv2.IMREAD_IGNORE_ORIENTATION
+
+    with timed('decode'):
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    if img is None:
+        return None
+    img = apply_orientation(img, orientation)
+
+    h, w = img.shape[:2]
+    if exact and max_dim and max(h, w) > max_dim:
+        # Scale from the original size so reduced decodes give the same output size as full ones
+        full_w, full_h = (w, h) if not info else (
+            (info[1], info[0]) if orientation >= 5 else (info[0], info[1]))
+        scale = max_dim / max(full_w, full_h)
+        with timed('resize'):
+            img = cv2.resize(img, (int(full_w * scale), int(full_h * scale)))
+    return img
@@ -0,0 +1,305 @@
+"""
+Shared inference core for the Flask (server.py) and FastAPI (main.py) apps.
+
+One bounded executor per process. Every model call goes through it, so
+detections are capped whichever app received the request, and async
+endpoints await the result instead of blocking the event loop.
+
+    detections = await run_inference(fn, *args)          # async endpoints
+    detections = run_inference_sync(fn, *args)           # WSGI / worker threads
+    result = run_inference_sync(detect_pothole, path, MODEL, ...)
+
+Pass MODEL where fn expects the model; it is replaced by the model of
+whichever worker runs the call. Two layouts:
+
+- INFERENCE_WORKERS=0 (default): INFERENCE_CONCURRENCY threads (default 1)
+  in this process, INFERENCE_THREADS (default 1) torch threads each. The
+  first uses the lazily loaded shared model; ultralytics models are not
+  thread-safe, so every further thread loads its own copy.
+- INFERENCE_WORKERS=N: requests are sharded across N spawned worker
+  processes, each loading its own model with INFERENCE_THREADS torch threads
+  (default: available cores / N) and, with INFERENCE_AFFINITY=1 on Linux,
+  pinned to its own cores. Arguments and results are pickled, so pass file
+  paths or arrays; stage metrics recorded inside workers stay in the workers.
+"""
+
+import asyncio
+import gc
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+
+CPU_COUNT = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+
+INFERENCE_WORKERS = max(0, int(os.environ.get('INFERENCE_WORKERS', 0)))
+INFERENCE_THREADS = max(0, int(os.environ.get('INFERENCE_THREADS', 0)))  # 0 = derive from the layout
+INFERENCE_AFFINITY = os.environ.get('INFERENCE_AFFINITY', '1') == '1'
+
+# Concurrent model calls per process (thread layout). Each thread beyond the first holds
+# its own model copy, so memory grows with this; prefer INFERENCE_WORKERS for parallelism.
+INFERENCE_CONCURRENCY = max(1, int(os.environ.get('INFERENCE_CONCURRENCY', 1)))
+
+
+def worker_threads(workers=INFERENCE_WORKERS, threads=INFERENCE_THREADS):
+    """torch/BLAS threads per model: explicit, else cores split across worker processes, else 1."""
+    if threads:
+        return threads
+    return max(1, CPU_COUNT // workers) if workers else 1
+
+
+def set_thread_env(threads):
+    """Thread count for OpenMP / MKL / OpenBLAS; only effective before torch is imported."""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+
+
+# Memory optimization: limit threads BEFORE importing torch/ultralytics
+# (the parent of a process pool never runs the model, so it keeps one thread)
+set_thread_env(1 if INFERENCE_WORKERS else worker_threads())
+
+# Path to model in repo
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pothole.pt')
+
+# Inference image size (smaller = less RAM)
+INFER_SIZE = 416
+
+MODEL_LOAD_SECONDS = metrics.gauge('smartroad_model_load_seconds', 'Time taken to load the YOLO model')
+INFERENCE_QUEUE = metrics.gauge('smartroad_inference_queue_depth', 'Inference jobs waiting or running')
+
+# Lazy model loading — don't block server startup
+model = None
+model_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+_workers = INFERENCE_WORKERS
+_threads = worker_threads()
+_affinity = INFERENCE_AFFINITY
+_loader = None
+_pool_ready = False
+_local = threading.local()  # executor threads after the first keep their own model here
+# Per submitting thread: job_hook.wrap(submit, fn, args, kwargs), if set, submits jobs in its
+# place (profiling.py times and profiles the jobs of a profiled request this way)
+job_hook = threading.local()
+
+
+class _ModelRef:
+    """Placeholder argument, replaced by the executing worker's model."""
+
+    def __reduce__(self):
+        return _model_ref, ()
+
+    def __repr__(self):
+        return 'MODEL'
+
+
+MODEL = _ModelRef()
+
+
+def _model_ref():
+    return MODEL
+
+
+def _load_model():
+    if _loader is not None:
+        return _loader()
+    from ultralytics import YOLO
+    return YOLO(MODEL_PATH)
+
+
+def get_model():
+    """Load model on first use instead of at startup (prevents Render port timeout)."""
+    global model
+    if getattr(_local, 'private', False):
+        return _thread_model()
+    metrics.record_cache('model', model is not None)
+    if model is None:
+        with model_lock:
+            if model is None:  # double-check inside lock
+                print('Loading YOLO model...')
+                start = time.perf_counter()
+                try:
+                    model = _load_model()
+                except Exception as e:
+                    print('Model load error:', e)
+                    return None
+                gc.collect()
+                MODEL_LOAD_SECONDS.set(round(time.perf_counter() - start, 4))
+                print(f'Model loaded (imgsz={INFER_SIZE})')
+    return model
+
+
+def _thread_model():
+    """This executor thread's own model (loaded on first use)."""
+    metrics.record_cache('model', getattr(_local, 'model', None) is not None)
+    if getattr(_local, 'model', None) is None:
+        print(f'Loading YOLO model for {threading.current_thread().name}...')
+        try:
+            _local.model = _load_model()
+        except Exception as e:
+            print('Model load error:', e)
+            return None
+    return _local.model
+
+
+def _init_thread(thread_ids):
+    """Thread-pool initializer: every thread but the first gets a private model."""
+    _local.private = next(thread_ids) > 0
+
+
+def _model_loaded():
+    return get_model() is not None
+
+
+def worker_count():
+    """Model calls that can run at once with the current layout."""
+    return _workers or INFERENCE_CONCURRENCY
+
+
+def model_ready():
+    """True if model calls can run: loads the in-process model, or asks a pool worker (once) whether it has one."""
+    global _pool_ready
+    if not _workers:
+        return get_model() is not None
+    if not _pool_ready:
+        _pool_ready = run_inference_sync(_model_loaded)
+    return _pool_ready
+
+
+def core_sets(workers, threads):
+    """Disjoint CPU sets of `threads` cores per worker (wrapping around when oversubscribed)."""
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(CPU_COUNT))
+    return [sorted({cores[(w * threads + t) % len(cores)] for t in range(threads)}) for w in range(workers)]
+
+
+def _init_worker(cores_queue, threads, loader):
+    """Process-pool initializer: pin cores and threads, then load this worker's model."""
+    global _loader
+    cores = cores_queue.get() if cores_queue is not None else None
+    if cores and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            print('Affinity error:', e)
+    set_thread_env(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _loader = loader
+    get_model()
+
+
+def _call(fn, args, kwargs):
+    """Run fn with MODEL placeholders swapped for this process's model."""
+    if any(a is MODEL for a in args) or any(v is MODEL for v in kwargs.values()):
+        loaded = get_model()
+        if loaded is None:
+            raise RuntimeError('Model not loaded')
+        args = tuple(loaded if a is MODEL else a for a in args)
+        kwargs = {k: loaded if v is MODEL else v for k, v in kwargs.items()}
+    return fn(*args, **kwargs)
+
+
+def _tracked(fn, args, kwargs):
+    try:
+        return _call(fn, args, kwargs)
+    finally:
+        INFERENCE_QUEUE.dec()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if _workers:
+                    import multiprocessing
+                    # spawn: each worker starts clean instead of forking torch/OpenCV thread state
+                    ctx = multiprocessing.get_context('spawn')
+                    cores_queue = None
+                    if _affinity and hasattr(os, 'sched_setaffinity'):
+                        cores_queue = ctx.Queue()
+                        for cores in core_sets(_workers, _threads):
+                            cores_queue.put(cores)
+                    _executor = ProcessPoolExecutor(max_workers=_workers, mp_context=ctx,
+                                                    initializer=_init_worker,
+                                                    initargs=(cores_queue, _threads, _loader))
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=INFERENCE_CONCURRENCY,
+                                                   thread_name_prefix='inference',
+                                                   initializer=_init_thread,
+                                                   initargs=(itertools.count(),))
+    return _executor
+
+
+def configure(workers=None, threads=None, affinity=None, loader=None):
+    """
+    Change the worker layout (benchmarks, CLI tools); shuts down the current
+    executor. loader is a picklable callable returning a model, used instead
+    of loading pothole.pt.
+    """
+    global _workers, _threads, _affinity, _loader, _pool_ready, model
+    shutdown()
+    _pool_ready = False
+    if workers is not None:
+        _workers = max(0, workers)
+    _threads = worker_threads(_workers, threads if threads is not None else INFERENCE_THREADS)
+    if affinity is not None:
+        _affinity = affinity
+    _loader = loader
+    if loader is not None:
+        model = None
+    if not _workers:
+        set_thread_env(_threads)
+        try:
+            import torch
+            torch.set_num_threads(_threads)
+        except ImportError:
+            pass
+
+
+def submit(fn, *args, **kwargs):
+    """Queue fn(*args, **kwargs) on the inference executor; returns a Future."""
+    wrap = getattr(job_hook, 'wrap', None)
+    if wrap is not None:
+        return wrap(_submit, fn, args, kwargs)
+    return _submit(fn, args, kwargs)
+
+
+def _submit(fn, args, kwargs):
+    executor = _get_executor()
+    INFERENCE_QUEUE.inc()
+    if _workers:
+        future = executor.submit(_call, fn, args, kwargs)
+        future.add_done_callback(lambda _: INFERENCE_QUEUE.dec())
+        return future
+    return executor.submit(_tracked, fn, args, kwargs)
+
+
+def warm_up():
+    """Start the executor and load the model in every worker now rather than on first use."""
+    return all(f.result() for f in [submit(_model_loaded) for _ in range(worker_count())])
+
+
+def run_inference_sync(fn, *args, **kwargs):
+    """Run fn on the inference executor and wait for the result (for sync callers)."""
+    return submit(fn, *args, **kwargs).result()
+
+
+async def run_inference(fn, *args, **kwargs):
+    """Run fn on the inference executor without blocking the event loop."""
+    return await asyncio.wrap_future(submit(fn, *args, **kwargs))
+
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
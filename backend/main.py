@@ -1,13 +1,15 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from ultralytics import YOLO
-import cv2
-import numpy as np
 import os
 from datetime import datetime
 import base64
 import tempfile
+import inference
+from inference import get_model, run_inference, INFER_SIZE
+
+# cv2 and the detection modules are imported inside the functions that use them,
+# so the app starts (and /health answers) without loading them
 
 # Initialize the app
 app = FastAPI(title="SmartRoad API", version="1.0.0")
@@ -21,85 +23,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load YOLO model
-try:
-    model = YOLO("pothole.pt")
-except:
-    print("Warning: pothole.pt not found, loading failed")
-    model = None
+# Helper function to detect potholes in frame/image
+def detect_potholes(image_array, source="image"):
+    """Run YOLO detection on image and return results (blocking; call via run_inference)"""
+    from detect_pothole import build_detections
+    frame_size = (image_array.shape[1], image_array.shape[0])
+    model = get_model()
+    if model is None:
+        raise RuntimeError("Model not loaded")
+    results = model(image_array, imgsz=INFER_SIZE, verbose=False)
+    detections = build_detections(results, frame_size, source)
+    for d in detections:
+        x1, y1, x2, y2 = d["bbox"]
+        d["width"] = x2 - x1
+        d["height"] = y2 - y1
+    return detections
 
-# Helper function to classify severity based on area
-def classify_severity(area):
-    if area < 5000:
-        return "Minor"
-    elif area < 20000:
-        return "Moderate"
-    else:
-        return "Major"
+def detect_image_array(image):
+    """Detect and annotate one decoded image"""
+    from detect_pothole import draw_detections
+    detections = detect_potholes(image)
+    return detections, draw_detections(image.copy(), detections)
 
-# Helper function to get color based on severity
-def get_severity_color(severity):
-    colors = {
-        "Minor": (0, 255, 0),      # Green
-        "Moderate": (0, 255, 255),  # Yellow
-        "Major": (0, 0, 255)        # Red
-    }
-    return colors.get(severity, (0, 255, 0))
+def detect_video_file(path):
+    """Detect potholes on every 2nd frame of a video file"""
+    import cv2
+    from frame_buffers import FrameRing
 
-# Helper function to detect potholes in frame/image
-def detect_potholes(image_array):
-    """Run YOLO detection on image and return results"""
-    results = model(image_array)
-    detections = []
-    
-    for r in results:
-        for box in r.boxes:
-            x1, y1, x2, y2 = box.xyxy[0]
-            conf = float(box.conf[0])
-            
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-            
-            # Calculate area
-            width = x2 - x1
-            height = y2 - y1
-            area = width * height
-            
-            severity = classify_severity(area)
-            
-            detections.append({
-                "bbox": [x1, y1, x2, y2],
-                "confidence": round(conf, 2),
-                "area": area,
-                "severity": severity,
-                "width": width,
-                "height": height
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_count = 0
+    processed_frames = 0
+    all_detections = []
+    frame_results = []
+    frame = None
+    ring = FrameRing((640, 480), slots=1)
+
+    while True:
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+
+        frame_count += 1
+
+        # Process every 2nd frame for performance
+        if frame_count % 2 != 0:
+            continue
+
+        processed_frames += 1
+
+        # Resize frame for faster processing (into one reused buffer)
+        resized = ring.resize(frame)
+
+        # Detect potholes
+        detections = detect_potholes(resized, source="video")
+
+        if detections:
+            all_detections.extend(detections)
+            frame_results.append({
+                "frame_number": frame_count,
+                "detections": detections,
+                "detection_count": len(detections)
             })
-    
-    return detections
 
-# Helper function to draw detections on image
-def draw_detections(image, detections):
-    """Draw bounding boxes and labels on image"""
-    for detection in detections:
-        x1, y1, x2, y2 = detection["bbox"]
-        severity = detection["severity"]
-        conf = detection["confidence"]
-        
-        color = get_severity_color(severity)
-        
-        # Draw bounding box
-        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
-        
-        # Put label
-        label = f"{severity} ({conf:.2f})"
-        cv2.putText(image, label, (x1, y1 - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-    
-    return image
+    cap.release()
+    return {
+        "fps": fps,
+        "total_frames": total_frames,
+        "processed_frames": processed_frames,
+        "all_detections": all_detections,
+        "frame_results": frame_results,
+    }
 
 # Helper function to convert image to base64
 def image_to_base64(image_array):
     """Convert numpy array to base64 string"""
+    import cv2
     _, buffer = cv2.imencode('.jpg', image_array)
     return base64.b64encode(buffer).decode('utf-8')
 
@@ -140,7 +143,7 @@ def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": inference.model is not None,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -157,20 +160,18 @@ async def detect_image(file: UploadFile = File(...)):
     - statistics: Summary of detections
     """
     
+    from image_decode import decode_image
+
     try:
         # Read uploaded file
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = decode_image(contents)
         
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid image file")
         
-        # Detect potholes
-        detections = detect_potholes(image)
-        
-        # Draw detections on image
-        image_with_detections = draw_detections(image.copy(), detections)
+        # Detect potholes and draw them (off the event loop)
+        detections, image_with_detections = await run_inference(detect_image_array, image)
         
         # Convert to base64
         image_base64 = image_to_base64(image_with_detections)
@@ -219,51 +220,17 @@ async def detect_video(file: UploadFile = File(...)):
             tmp_file.write(contents)
             tmp_path = tmp_file.name
         
-        # Open video
-        cap = cv2.VideoCapture(tmp_path)
-        
-        if not cap.isOpened():
+        try:
+            result = await run_inference(detect_video_file, tmp_path)
+        finally:
+            # Clean up temporary file
+            os.unlink(tmp_path)
+
+        if result is None:
             raise HTTPException(status_code=400, detail="Invalid video file")
-        
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        frame_count = 0
-        processed_frames = 0
-        all_detections = []
-        frame_results = []
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # Process every 2nd frame for performance
-            if frame_count % 2 != 0:
-                continue
-            
-            processed_frames += 1
-            
-            # Resize frame for faster processing
-            frame = cv2.resize(frame, (640, 480))
-            
-            # Detect potholes
-            detections = detect_potholes(frame)
-            
-            if detections:
-                all_detections.extend(detections)
-                frame_results.append({
-                    "frame_number": frame_count,
-                    "detections": detections,
-                    "detection_count": len(detections)
-                })
-        
-        cap.release()
-        
-        # Clean up temporary file
-        os.unlink(tmp_path)
+
+        all_detections = result["all_detections"]
+        frame_results = result["frame_results"]
         
         # Calculate statistics
         severity_count = {
@@ -276,9 +243,9 @@ async def detect_video(file: UploadFile = File(...)):
             "success": True,
             "message": "Video detection completed",
             "video_info": {
-                "total_frames": total_frames,
-                "processed_frames": processed_frames,
-                "fps": fps
+                "total_frames": result["total_frames"],
+                "processed_frames": result["processed_frames"],
+                "fps": result["fps"]
             },
             "frame_detections": frame_results,
             "statistics": {
@@ -0,0 +1,206 @@
+"""
+Minimal Prometheus-style metrics (no external dependency).
+
+    with timed('inference'):
+        results = model(img)
+
+    @timed('annotate')
+    def draw(...): ...
+
+Stage timings go to the smartroad_stage_seconds histogram, labelled by stage.
+render() produces the Prometheus text exposition format served at /metrics.
+With METRICS_ENABLED=0 timers skip the clock reads and decorators return the
+function unchanged, so instrumentation costs next to nothing.
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_START_TIME = time.time()
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def set_enabled(enabled):
+    """Turn metric collection on/off at runtime (e.g. for benchmarks)."""
+    global ENABLED
+    ENABLED = bool(enabled)
+
+
+def _fmt_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_fmt_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, *label_values):
+        with self.lock:
+            self.values[label_values] = value
+
+    def dec(self, amount=1, *label_values):
+        self.inc(-amount, *label_values)
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *label_values):
+        """(sum, count) for one label set."""
+        series = self.series.get(label_values)
+        return (series[1], series[2]) if series else (0.0, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        names = self.labels + ('le',)
+        for key, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float('inf'),), counts):
+                cumulative += c
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_fmt_labels(names, key + (le,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_fmt_labels(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{_fmt_labels(self.labels, key)} {count}')
+        return lines
+
+
+def _get_or_create(cls, name, help_text, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help_text, **kwargs)
+        return metric
+
+
+def counter(name, help_text, labels=()):
+    return _get_or_create(Counter, name, help_text, labels=labels)
+
+
+def gauge(name, help_text, labels=()):
+    return _get_or_create(Gauge, name, help_text, labels=labels)
+
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, help_text, labels=labels, buckets=buckets)
+
+
+STAGE_SECONDS = histogram('smartroad_stage_seconds', 'Time spent per processing stage', labels=('stage',))
+REQUEST_SECONDS = histogram('smartroad_request_seconds', 'HTTP request latency by endpoint',
+                            labels=('endpoint', 'method', 'status'))
+CACHE_REQUESTS = counter('smartroad_cache_requests_total', 'Cache lookups by cache and result',
+                         labels=('cache', 'result'))
+
+
+class timed:
+    """Context manager / decorator that records elapsed seconds for a stage."""
+
+    __slots__ = ('stage', 'histogram', 'start')
+
+    def __init__(self, stage, histogram=None):
+        self.stage = stage
+        self.histogram = histogram
+        self.start = None
+
+    def __enter__(self):
+        if ENABLED:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            (self.histogram or STAGE_SECONDS).observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+    def __call__(self, func):
+        if not ENABLED:
+            return func
+        stage, hist = self.stage, self.histogram
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage, hist):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def record_cache(cache, hit):
+    """Count a cache hit or miss; hit rate = hits / (hits + misses)."""
+    if ENABLED:
+        CACHE_REQUESTS.inc(1, cache, 'hit' if hit else 'miss')
+
+
+def process_rss_bytes():
+    """Current resident set size (Linux /proc), falling back to peak RSS."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except Exception:
+        return 0
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    lines = [
+        '# HELP process_resident_memory_bytes Resident memory size in bytes.',
+        '# TYPE process_resident_memory_bytes gauge',
+        f'process_resident_memory_bytes {process_rss_bytes()}',
+        '# HELP process_start_time_seconds Start time of the process since unix epoch in seconds.',
+        '# TYPE process_start_time_seconds gauge',
+        f'process_start_time_seconds {_START_TIME}',
+    ]
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
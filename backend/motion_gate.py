@@ -0,0 +1,76 @@
+"""
+Cheap motion gate for video frames.
+
+Before running the model on a sampled frame, compare a tiny grayscale copy of
+it against the last frame that was actually inferred. When the vehicle is
+stopped (or crawling) consecutive frames are nearly identical, so inference can
+be skipped. Two signals are combined: mean absolute pixel difference and the
+Hamming distance between difference hashes (dHash).
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+
+
+def dhash(gray, hash_size=8):
+    """Difference hash (hash_size * hash_size bits) of a grayscale image, as a Python int."""
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    """Number of differing bits between two integer hashes."""
+    return (a ^ b).bit_count()
+
+
+class MotionGate:
+    """
+    Decide whether a frame changed enough since the last inferred frame.
+
+    Args:
+        diff_threshold: Mean absolute difference (0-255) on the downscaled
+            grayscale frame below which the scene counts as unchanged
+        hash_threshold: Max dHash Hamming distance for the scene to count as unchanged
+        size: Downscaled (w, h) used for the comparison
+    """
+
+    def __init__(self, diff_threshold=4.0, hash_threshold=4, size=(64, 48)):
+        self.diff_threshold = diff_threshold
+        self.hash_threshold = hash_threshold
+        self.size = size
+        self.reference = None
+        self.reference_hash = None
+        self.checked = 0
+        self.gated = 0
+        self.gate_time = 0.0
+
+    def should_infer(self, frame):
+        """Return True if frame should go through the model (and becomes the new reference)."""
+        start = time.perf_counter()
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        frame_hash = dhash(gray)
+
+        changed = True
+        if self.reference is not None:
+            diff = float(cv2.absdiff(gray, self.reference).mean())
+            distance = hamming(frame_hash, self.reference_hash)
+            changed = diff >= self.diff_threshold or distance > self.hash_threshold
+
+        if changed:
+            self.reference = gray
+            self.reference_hash = frame_hash
+        else:
+            self.gated += 1
+
+        elapsed = time.perf_counter() - start
+        self.checked += 1
+        self.gate_time += elapsed
+        if metrics.ENABLED:
+            metrics.STAGE_SECONDS.observe(elapsed, 'motion_gate')
+        return changed
@@ -0,0 +1,180 @@
+"""
+Near-duplicate photo detection.
+
+An exact content hash misses the same photo re-uploaded after recompression,
+resizing, a light crop or a screenshot. Each stored image report gets a
+64-bit perceptual hash (pHash: sign of the low DCT frequencies against their
+median) plus the 64-bit dHash from motion_gate.py, both taken after trimming
+flat borders such as screenshot bars. NearDuplicateIndex keeps the pHashes
+in a BK-tree, so finding every report within a Hamming radius visits a small
+part of the store. dHash confirms each candidate. When both sides have
+coordinates, a match must also lie within a given distance.
+"""
+
+import math
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from image_decode import decode_image
+from motion_gate import dhash, hamming
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+
+def phash(gray, hash_size=8, highfreq_factor=4):
+    """DCT perceptual hash (hash_size * hash_size bits) of a grayscale image, as a Python int."""
+    size = hash_size * highfreq_factor
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:hash_size, :hash_size]
+    bits = (low > np.median(low.flatten()[1:])).flatten()  # median without the DC term
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def _trim_borders(gray, tolerance=12):
+    """Crop rows/columns at the edges that are flat (bars, letterboxing), if any remain."""
+    h, w = gray.shape
+    rows = np.flatnonzero(gray.max(axis=1).astype(int) - gray.min(axis=1) > tolerance)
+    cols = np.flatnonzero(gray.max(axis=0).astype(int) - gray.min(axis=0) > tolerance)
+    if not len(rows) or not len(cols):
+        return gray
+    top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    if bottom - top < h // 4 or right - left < w // 4:
+        return gray  # mostly flat: hash the whole image rather than a sliver
+    return gray[top:bottom, left:right]
+
+
+def image_hashes(image, max_dim=256):
+    """
+    (phash, dhash) as 16-digit hex strings for a path, encoded bytes or BGR
+    array, or None if it can't be decoded. JPEGs are decoded at reduced size.
+    """
+    img = image if isinstance(image, np.ndarray) else decode_image(image, max_dim=max_dim, exact=False)
+    if img is None:
+        return None
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    gray = _trim_borders(gray)
+    return f'{phash(gray):016x}', f'{dhash(gray):016x}'
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371008.8 * math.asin(min(1.0, math.sqrt(a)))
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance."""
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """[(distance, item)] for every stored hash within max_distance, nearest first."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= max_distance:
+                found.extend((d, item) for item in node[1])
+            # Triangle inequality: only children at distance d +/- max_distance can match
+            for edge, child in node[2].items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda m: m[0])
+        return found
+
+
+class NearDuplicateIndex:
+    """
+    Perceptual hashes of stored image reports.
+
+    Args:
+        max_distance: Max pHash Hamming distance (of 64 bits) for a near-duplicate
+        dhash_distance: Max dHash distance confirming a pHash candidate
+        radius_m: Max distance between the two photos' coordinates, when both have them
+    """
+
+    def __init__(self, max_distance=12, dhash_distance=16, radius_m=50.0):
+        self.max_distance = max_distance
+        self.dhash_distance = dhash_distance
+        self.radius_m = radius_m
+        self.tree = BKTree()
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.tree.size
+
+    def add(self, report_id, hashes, lat=None, lon=None):
+        ph, dh = hashes
+        with self._lock:
+            self.tree.add(int(ph, 16), {'id': report_id, 'dhash': int(dh, 16), 'lat': lat, 'lon': lon})
+
+    def load(self, reports, data_dir):
+        """
+        Index every image report: stored phash/dhash, else hashed from its
+        original file (returns how many had to be hashed).
+        """
+        computed = 0
+        for r in reports:
+            if r.get('phash') and r.get('dhash'):
+                hashes = (r['phash'], r['dhash'])
+            else:
+                original = r.get('original_file') or ''
+                path = os.path.join(data_dir, original)
+                if not original.lower().endswith(IMAGE_EXTENSIONS) or not os.path.exists(path):
+                    continue
+                hashes = image_hashes(path)
+                if hashes is None:
+                    continue
+                computed += 1
+            self.add(r.get('id'), hashes, r.get('lat'), r.get('lon'))
+        self.loaded = True
+        return computed
+
+    def find(self, hashes, lat=None, lon=None):
+        """
+        Near-duplicates of an image: [{'report_id', 'hamming', 'distance_m'}],
+        closest hash (then closest location) first. distance_m is None when
+        either side has no coordinates.
+        """
+        ph, dh = int(hashes[0], 16), int(hashes[1], 16)
+        with self._lock:
+            candidates = self.tree.search(ph, self.max_distance)
+        matches = []
+        for d, item in candidates:
+            if hamming(dh, item['dhash']) > self.dhash_distance:
+                continue
+            meters = None
+            if None not in (lat, lon, item['lat'], item['lon']):
+                meters = distance_m(lat, lon, item['lat'], item['lon'])
+                if meters > self.radius_m:
+                    continue
+            matches.append({'report_id': item['id'], 'hamming': d,
+                            'distance_m': round(meters, 1) if meters is not None else None})
+        matches.sort(key=lambda m: (m['hamming'], m['distance_m'] if m['distance_m'] is not None else math.inf))
+        return matches
@@ -0,0 +1,254 @@
+"""
+Opt-in profiling of slow Flask requests.
+
+A request is profiled when any of these holds:
+  - PROFILE_ENABLED=1 (every request),
+  - it is picked by PROFILE_SAMPLE_RATE (fraction of requests, e.g. 0.01),
+  - PROFILE_HEADER=1 and it sends 'X-Profile: 1', if the app's authorize
+    check passes (server.py: a valid X-Admin-Token).
+Profiles of requests slower than PROFILE_THRESHOLD_MS (header-forced ones
+always) are written to PROFILE_DIR, keeping the newest PROFILE_MAX_FILES.
+pyinstrument is used when installed and PROFILER=pyinstrument, else cProfile.
+
+The request profiler only sees the request thread (cProfile on Python 3.12+
+sees every thread of the process), while detection runs on the inference
+executor. So jobs a profiled request submits are timed on the executor
+(queue wait, run time, worker), listed under 'executor' in the metadata, and
+profiled there with their own cProfile whenever the request profiler can't
+see them (process workers, pyinstrument, older Pythons); those profiles are
+written next to the request's as .jobN.prof and summarised in its .txt.
+"""
+
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import g, request
+
+import inference
+
+PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', '0') == '1'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_HEADER = os.environ.get('PROFILE_HEADER', '0') == '1'
+PROFILE_THRESHOLD_MS = float(os.environ.get('PROFILE_THRESHOLD_MS', 1000))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))
+PROFILER = os.environ.get('PROFILER', 'cprofile')
+
+# Only one profiler can hook the interpreter at a time (sys.monitoring on 3.12+),
+# so concurrent requests that lose this lock simply run unprofiled.
+_profiler_lock = threading.Lock()
+
+
+def _should_profile(authorize):
+    if (PROFILE_HEADER and request.headers.get('X-Profile', '') in ('1', 'true')
+            and authorize is not None and authorize()):
+        return 'header'
+    if PROFILE_ENABLED:
+        return 'env'
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def _start_profiler():
+    if PROFILER == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode='disabled')
+            profiler.start()
+            return profiler
+        except Exception:
+            pass
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+
+
+class _ProfiledJob:
+    """
+    An executor job of a profiled request: runs fn, returning (result, record)
+    with its timing and, if profile, its cProfile stats. Picklable for process workers.
+    """
+
+    def __init__(self, fn, profile):
+        self.fn = fn
+        self.profile = profile
+        self.pid = os.getpid()
+        self.submitted = time.time()
+
+    def __call__(self, *args, **kwargs):
+        started = time.time()
+        record = {
+            'job': getattr(self.fn, '__name__', repr(self.fn)),
+            'worker': f'{os.getpid()}/{threading.current_thread().name}',
+            'queue_ms': round((started - self.submitted) * 1000, 2),
+        }
+        profiler = None
+        if self.profile or os.getpid() != self.pid:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another job of this request holds sys.monitoring
+                profiler = None
+        try:
+            result = self.fn(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        record['run_ms'] = round((time.time() - started) * 1000, 2)
+        if profiler is not None:
+            profiler.create_stats()
+            record['stats'] = profiler.stats
+        return result, record
+
+
+def _job_hook(jobs, profile):
+    """inference.job_hook.wrap for a profiled request: collects its job records into jobs."""
+
+    def wrap(submit, fn, args, kwargs):
+        outer = Future()
+
+        def done(inner):
+            try:
+                result, record = inner.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            jobs.append(record)
+            outer.set_result(result)
+
+        submit(_ProfiledJob(fn, profile), args, kwargs).add_done_callback(done)
+        return outer
+
+    return wrap
+
+
+def _write_profile(profile_dir, profiler, meta, jobs=()):
+    os.makedirs(profile_dir, exist_ok=True)
+    endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', meta['endpoint'] or 'unknown')
+    name = f"{int(meta['timestamp'] * 1000)}_{meta['method']}_{endpoint}_{int(meta['duration_ms'])}ms"
+
+    if isinstance(profiler, cProfile.Profile):
+        profiler.dump_stats(os.path.join(profile_dir, name + '.prof'))
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(40)
+        meta['files'] = [name + '.prof', name + '.txt']
+    else:
+        with open(os.path.join(profile_dir, name + '.html'), 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+        text = io.StringIO(profiler.output_text(unicode=True, color=False))
+        meta['files'] = [name + '.html', name + '.txt']
+
+    meta['executor'] = []
+    for i, job in enumerate(jobs):
+        job = dict(job)
+        stats = job.pop('stats', None)
+        if stats is not None:
+            job['file'] = f'{name}.job{i}.prof'
+            with open(os.path.join(profile_dir, job['file']), 'wb') as f:
+                marshal.dump(stats, f)
+            meta['files'].append(job['file'])
+            text.write(f"\n--- executor job {i}: {job['job']} on {job['worker']}, "
+                       f"queued {job['queue_ms']} ms, ran {job['run_ms']} ms\n")
+            pstats.Stats(os.path.join(profile_dir, job['file']), stream=text).sort_stats('cumulative').print_stats(40)
+        meta['executor'].append(job)
+
+    with open(os.path.join(profile_dir, name + '.txt'), 'w', encoding='utf-8') as f:
+        f.write(text.getvalue())
+    with open(os.path.join(profile_dir, name + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    _rotate(profile_dir)
+
+
+def _rotate(profile_dir):
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES (counted by their .json metadata)."""
+    files = os.listdir(profile_dir)
+    metas = sorted(f for f in files if f.endswith('.json'))
+    for old in metas[:max(0, len(metas) - PROFILE_MAX_FILES)]:
+        stem = old[:-len('json')]
+        for f in files:
+            if f.startswith(stem):
+                try:
+                    os.remove(os.path.join(profile_dir, f))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles(profile_dir, limit=50):
+    """Metadata of the most recent profiles, newest first."""
+    if not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for meta_file in sorted((f for f in os.listdir(profile_dir) if f.endswith('.json')), reverse=True)[:limit]:
+        try:
+            with open(os.path.join(profile_dir, meta_file), 'r', encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except Exception:
+            continue
+    return profiles
+
+
+def init_app(app, profile_dir, authorize=None):
+    """
+    Register the profiling hooks on a Flask app. authorize() says whether the
+    current request may force a profile with X-Profile (never, if not given).
+    """
+
+    @app.before_request
+    def _start_profile():
+        reason = _should_profile(authorize)
+        if reason and _profiler_lock.acquire(blocking=False):
+            try:
+                g.profiler = _start_profiler()
+            except Exception as e:
+                _profiler_lock.release()
+                print('Profiler start error:', e)
+                return
+            g.profile_reason = reason
+            g.profile_start = time.perf_counter()
+            g.profile_jobs = []
+            # cProfile on 3.12+ already sees the executor threads; everything else profiles the job itself
+            sees_threads = isinstance(g.profiler, cProfile.Profile) and sys.version_info >= (3, 12)
+            inference.job_hook.wrap = _job_hook(g.profile_jobs, profile=not sees_threads)
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        inference.job_hook.wrap = None
+        try:
+            _stop_profiler(profiler)
+            duration_ms = (time.perf_counter() - g.profile_start) * 1000
+            reason = g.pop('profile_reason', None)
+            if duration_ms >= PROFILE_THRESHOLD_MS or reason == 'header':
+                _write_profile(profile_dir, profiler, {
+                    'timestamp': time.time(),
+                    'method': request.method,
+                    'path': request.path,
+                    'endpoint': request.endpoint,
+                    'duration_ms': round(duration_ms, 2),
+                    'reason': reason,
+                    'profiler': 'cprofile' if isinstance(profiler, cProfile.Profile) else 'pyinstrument',
+                    'error': repr(exc) if exc else None,
+                }, g.pop('profile_jobs', ()))
+        except Exception as e:
+            print('Profile write error:', e)
+        finally:
+            _profiler_lock.release()
@@ -0,0 +1,105 @@
+"""
+Change feed for reports: every created or updated report gets the next global
+sequence number (stored on the report as 'version'), and a bounded in-memory
+log of recent changes lets Server-Sent Events clients catch up from their
+last sequence number instead of refetching /reports.
+
+Older gaps than the log holds are filled from the store itself
+(reports with version > since), so catch-up works across restarts too.
+"""
+
+import json
+import threading
+from collections import deque
+
+
+def in_bbox(report, bbox):
+    """True if the report's lat/lon lies inside bbox = (min_lon, min_lat, max_lon, max_lat)."""
+    if bbox is None:
+        return True
+    lat, lon = report.get('lat'), report.get('lon')
+    if lat is None or lon is None:
+        return False
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+def parse_bbox(value):
+    """'min_lon,min_lat,max_lon,max_lat' -> tuple of floats, or None if empty. Raises ValueError."""
+    if not value:
+        return None
+    parts = [float(p) for p in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+    return tuple(parts)
+
+
+class ReportFeed:
+    """
+    Sequence-numbered log of report changes.
+
+    Args:
+        maxlen: Number of recent changes kept in memory for catch-up
+    """
+
+    def __init__(self, maxlen=2000):
+        self.seq = 0        # last version handed out
+        self.published = 0  # last version visible to streams
+        self.loaded = False
+        self._log = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._listeners = []
+
+    def load(self, reports):
+        """Resume numbering after the highest version already in the store."""
+        with self._cond:
+            self.seq = max([self.seq] + [int(r.get('version') or 0) for r in reports])
+            self.published = self.seq
+            self.loaded = True
+
+    def stamp(self, report):
+        """Give a report the next version. Call under the store lock, before writing."""
+        with self._cond:
+            self.seq += 1
+            report['version'] = self.seq
+            return self.seq
+
+    def subscribe(self, callback):
+        """Call callback(kind, reports) on every publish (keep it quick; runs under the feed lock)."""
+        self._listeners.append(callback)
+
+    def publish(self, kind, reports):
+        """
+        Record changes (kind: 'created' / 'updated') and wake waiting streams.
+        reports are the client-facing views, each carrying its 'version'.
+        """
+        with self._cond:
+            for r in reports:
+                self._log.append({'seq': r['version'], 'type': kind, 'report': r})
+                self.published = max(self.published, r['version'])
+            for callback in self._listeners:
+                try:
+                    callback(kind, reports)
+                except Exception as e:
+                    print('Report feed listener error:', e)
+            self._cond.notify_all()
+
+    def since(self, seq):
+        """Logged changes after seq, or None if the log no longer reaches back that far."""
+        with self._cond:
+            if seq >= self.published:
+                return []
+            if not self._log or self._log[0]['seq'] > seq + 1:
+                return None
+            return [e for e in self._log if e['seq'] > seq]
+
+    def wait(self, seq, timeout):
+        """Block until something newer than seq is published (or timeout). Returns the current seq."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.published > seq, timeout)
+            return self.published
+
+
+def format_event(event):
+    """One SSE message; the id lets EventSource resume with Last-Event-ID."""
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event['report'])}\n\n"
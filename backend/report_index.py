@@ -0,0 +1,77 @@
+"""
+Report ids and the id -> row index of reports.json.
+
+Stored ids are whatever the writer assigned: '<ms>_<uid>' for uploads,
+'<uid>_t<track>' for per-pothole video reports, small integers in older
+stores. The dashboard shows them as 'RPT-' plus the id zero-padded to four
+digits (display_id), and sends that form back. canonical_id maps every
+accepted spelling (stored, zero-padded, 'RPT-' prefixed) to one key, so all
+id-addressed endpoints agree on what matches.
+
+ReportIndex keeps the reports list in memory with canonical ids mapped to
+positions, so an id-addressed request finds its report without reading
+reports.json. The server loads it once at startup and updates it in the
+write paths (under store_lock); a store rewritten by another process
+(smartroad.py) is noticed from the file's size and mtime and reloaded.
+"""
+
+import threading
+
+DISPLAY_PREFIX = 'RPT-'
+
+
+def canonical_id(report_id):
+    """Lookup key for a report id in any accepted form ('42', '0042', 'RPT-0042' -> '42')."""
+    rid = str(report_id).strip()
+    if rid.startswith(DISPLAY_PREFIX):
+        rid = rid[len(DISPLAY_PREFIX):]
+    if rid.isascii() and rid.isdigit():
+        rid = str(int(rid))
+    return rid
+
+
+def display_id(report_id):
+    """Dashboard form of a stored id ('42' -> 'RPT-0042')."""
+    return f'{DISPLAY_PREFIX}{str(report_id).zfill(4)}'
+
+
+class ReportIndex:
+    """
+    The reports list held in memory, with canonical id -> position (first
+    report wins if ids repeat). signature identifies the reports.json it
+    mirrors (server.py compares it with the file before trusting the copy).
+    """
+
+    def __init__(self):
+        self.reports = []
+        self.positions = {}
+        self.signature = None
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.reports)
+
+    def load(self, reports, signature=None):
+        positions = {}
+        for pos, r in enumerate(reports):
+            positions.setdefault(canonical_id(r.get('id', '')), pos)
+        with self._lock:
+            self.reports, self.positions = reports, positions
+            self.signature, self.loaded = signature, True
+
+    def extend(self, entries):
+        """Append new reports (already persisted) and index them."""
+        with self._lock:
+            for r in entries:
+                self.positions.setdefault(canonical_id(r.get('id', '')), len(self.reports))
+                self.reports.append(r)
+
+    def find(self, report_id):
+        """Position of report_id in reports, or None."""
+        return self.positions.get(canonical_id(report_id))
+
+    def get(self, report_id):
+        """The report with this id, or None."""
+        pos = self.find(report_id)
+        return self.reports[pos] if pos is not None else None
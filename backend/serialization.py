@@ -0,0 +1,179 @@
+"""
+Response and persistence serialization.
+
+- dumps()/loads(): orjson when installed, else compact stdlib json. No
+  pretty-printing, so reports.json writes and reads stay cheap.
+  read_json()/write_json_atomic() use them for the stores on disk (server,
+  smartroad.py, severity.py).
+- FastJSONProvider: plugs dumps() into Flask, so every jsonify() response
+  uses it, and answers with msgpack instead when the client sends
+  'Accept: application/msgpack' (and msgpack is installed).
+- init_app(): compresses responses above COMPRESS_MIN_BYTES with brotli
+  (if installed) or gzip, per Accept-Encoding (fastest level above
+  COMPRESS_FAST_BYTES), and records encoded bytes and serialize/compress
+  CPU time per endpoint in /metrics.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+# Big bodies are mostly base64 images that barely compress; use the fastest levels
+COMPRESS_FAST_BYTES = int(os.environ.get('COMPRESS_FAST_BYTES', 256 * 1024))
+COMPRESSIBLE_TYPES = ('application/json', 'application/msgpack', 'text/', 'image/svg+xml')
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+RESPONSE_BYTES = metrics.histogram(
+    'smartroad_response_bytes', 'Encoded response body size by endpoint',
+    labels=('endpoint', 'format', 'encoding'),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216))
+ENCODE_CPU_SECONDS = metrics.histogram(
+    'smartroad_encode_cpu_seconds', 'CPU time spent serializing / compressing responses',
+    labels=('endpoint', 'step'))
+
+
+def _default(obj):
+    """Fallback for numpy scalars/arrays and other non-JSON types."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj):
+        """Compact JSON as UTF-8 bytes."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTS)
+
+    loads = orjson.loads
+else:
+    def dumps(obj):
+        """Compact JSON as UTF-8 bytes."""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=_default).encode('utf-8')
+
+    loads = json.loads
+
+
+def read_json(path, default):
+    """Parsed contents of a JSON file, or default if it doesn't exist."""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def write_json_atomic(path, data):
+    """Write compact JSON via a temp file + rename so concurrent readers never see a partial file."""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(data))
+    os.replace(tmp_path, path)
+
+
+def wants_msgpack():
+    if msgpack is None:
+        return False
+    accept = request.accept_mimetypes
+    best = accept.best_match(MSGPACK_TYPES + ('application/json',))
+    return best in MSGPACK_TYPES
+
+
+def _record_cpu(step, start):
+    if metrics.ENABLED:
+        ENCODE_CPU_SECONDS.observe(time.thread_time() - start, request.endpoint or 'unknown', step)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps()/loads(), with msgpack negotiation."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        start = time.thread_time()
+        if wants_msgpack():
+            body = msgpack.packb(obj, use_bin_type=True, default=_default)
+            mimetype = 'application/msgpack'
+        else:
+            body = dumps(obj)
+            mimetype = self.mimetype
+        _record_cpu('serialize', start)
+        response = self._app.response_class(body, mimetype=mimetype)
+        response.vary.add('Accept')
+        return response
+
+
+def _choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: compress large, buffered, compressible responses."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+
+    body = response.get_data()
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = _choose_encoding()
+        response.vary.add('Accept-Encoding')
+    if encoding:
+        start = time.thread_time()
+        fast = len(body) >= COMPRESS_FAST_BYTES
+        if encoding == 'br':
+            body = brotli.compress(body, quality=1 if fast else BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=1 if fast else GZIP_LEVEL)
+        _record_cpu('compress', start)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+
+    if metrics.ENABLED:
+        fmt = 'msgpack' if response.mimetype == 'application/msgpack' else response.mimetype.split('/')[-1]
+        RESPONSE_BYTES.observe(len(body), request.endpoint or 'unknown', fmt, encoding or 'identity')
+    return response
+
+
+def init_app(app):
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
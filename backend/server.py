@@ -1,51 +1,308 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g, Response, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import tempfile
-import cv2
 import base64
-import numpy as np
-import gc
 import json
 import shutil
 import time
 import uuid
+import hmac
+import math
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Memory optimization: limit threads BEFORE importing torch/ultralytics
-os.environ['OMP_NUM_THREADS'] = '1'
-os.environ['MKL_NUM_THREADS'] = '1'
-os.environ['OPENBLAS_NUM_THREADS'] = '1'
-
-from ultralytics import YOLO
-from detect_pothole import detect_pothole
+from inference import MODEL, model_ready, run_inference_sync, worker_count, warm_up, INFER_SIZE
+from content_hash import file_sha1
+from gps_track import load_track, parse_srt, extract_subtitle_track, geotag_detections
+import metrics
+from metrics import timed
+import profiling
+import serialization
+from serialization import loads, write_json_atomic
+from report_events import ReportFeed, format_event, parse_bbox, in_bbox
+from report_index import ReportIndex, display_id
+from snapshot import compact_report
+from tiles import TileCache, MAX_ZOOM
+from file_serving import send_evidence_file
+from admin_bulk import parse_changes, parse_filter, bulk_update
+from admission import AdmissionController, RateLimiter, Rejected
 
 app = Flask(__name__)
 # allow cross-origin requests (development)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True,
+     expose_headers=['X-Report-Seq', 'Retry-After'])
+
+# Behind N reverse proxies (e.g. Render), take the client address from X-Forwarded-For
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
+# Largest accepted request body; bigger uploads get 413 before anything is read
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('UPLOAD_MAX_MB', 500)) * 1024 * 1024
+
+# Where reports.json, wallets.json and the reports/ evidence folder live
+DATA_DIR = os.environ.get('SMARTROAD_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+REPORTS_PATH = os.path.join(DATA_DIR, 'reports.json')
+REPORTS_DIR = os.path.join(DATA_DIR, 'reports')
+WALLETS_PATH = os.path.join(DATA_DIR, 'wallets.json')
+
+# Sliced (tiled) inference for high-resolution photos / dashcam frames.
+# Enabled per request with form field sliced=1, or for every image upload with SLICED_INFERENCE=1.
+SLICED_INFERENCE = os.environ.get('SLICED_INFERENCE', '0') == '1'
+SLICE_TILE_SIZE = int(os.environ.get('SLICE_TILE_SIZE', INFER_SIZE))
+SLICE_OVERLAP = float(os.environ.get('SLICE_OVERLAP', 0.2))
+SLICE_BATCH_SIZE = int(os.environ.get('SLICE_BATCH_SIZE', 0)) or None  # 0 = all tiles in one call
+
+# Video: skip inference on near-identical frames, and stop after N unique potholes (0 = no budget)
+VIDEO_MOTION_GATE = os.environ.get('VIDEO_MOTION_GATE', '1') == '1'
+VIDEO_DETECTION_BUDGET = int(os.environ.get('VIDEO_DETECTION_BUDGET', 0)) or None
+
+# Streaming video mode: no frame cap, constant memory, resumable via checkpoints/.
+# VIDEO_STREAMING=0 falls back to the legacy detect_video (60 sampled frames max).
+VIDEO_STREAMING = os.environ.get('VIDEO_STREAMING', '1') == '1'
+VIDEO_FRAME_SKIP = int(os.environ.get('VIDEO_FRAME_SKIP', 5))
+VIDEO_EVIDENCE_TOP_K = int(os.environ.get('VIDEO_EVIDENCE_TOP_K', 8))
+CHECKPOINT_DIR = os.path.join(DATA_DIR, 'checkpoints')
+
+# Segmented video mode: split long clips into time ranges processed in parallel on the
+# inference workers and stitch the tracks (VIDEO_SEGMENTS=0: one segment per worker)
+VIDEO_SEGMENTED = os.environ.get('VIDEO_SEGMENTED', '0') == '1'
+VIDEO_SEGMENTS = int(os.environ.get('VIDEO_SEGMENTS', 0)) or None
+VIDEO_SEGMENT_MIN_SECONDS = float(os.environ.get('VIDEO_SEGMENT_MIN_SECONDS', 10))
+
+# Optional low-bitrate preview of just the detection windows of a video, written in the
+# background by VIDEO_PREVIEW_WORKERS threads (further uploads queue their previews)
+VIDEO_PREVIEW = os.environ.get('VIDEO_PREVIEW', '0') == '1'
+VIDEO_PREVIEW_PAD_MS = int(os.environ.get('VIDEO_PREVIEW_PAD_MS', 1500))
+VIDEO_PREVIEW_WIDTH = int(os.environ.get('VIDEO_PREVIEW_WIDTH', 480))
+VIDEO_PREVIEW_WORKERS = max(1, int(os.environ.get('VIDEO_PREVIEW_WORKERS', 1)))
+preview_executor = ThreadPoolExecutor(max_workers=VIDEO_PREVIEW_WORKERS, thread_name_prefix='preview')
+
+# Slow-request profiles (see profiling.py for PROFILE_* switches); X-Profile and the
+# /admin/profiles endpoints need a valid X-Admin-Token
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+profiling.init_app(app, PROFILE_DIR, authorize=lambda: is_admin())
+
+# Serializes read-modify-write of reports.json / wallets.json across request threads
+store_lock = threading.Lock()
+
+# reports.json in memory by id for the id-addressed admin endpoints (see report_index.py);
+# loaded at startup, kept in step by the writes below, which all hold store_lock
+report_index = ReportIndex()
+
+# Live report deltas for map clients (GET /reports/stream)
+report_feed = ReportFeed(maxlen=int(os.environ.get('REPORT_FEED_SIZE', 2000)))
+SSE_KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+SSE_MAX_SECONDS = float(os.environ.get('SSE_MAX_SECONDS', 300))  # clients reconnect with Last-Event-ID
+# Every open stream holds a request thread for up to SSE_MAX_SECONDS, so keep the cap well under
+# the server's thread pool (asgi.py lowers it to fit the WSGI pool it mounts the app on)
+SSE_MAX_CLIENTS = int(os.environ.get('SSE_MAX_CLIENTS', 8))
+SSE_POOL_SHARE = 0.25  # most streams may hold this fraction of a known request thread pool
+SSE_CLIENTS = metrics.gauge('smartroad_sse_clients', 'Open /reports/stream connections')
+
+# Packed pothole tiles for maps (GET /tiles/<z>/<x>/<y>), patched from the feed
+tile_cache = TileCache()
+report_feed.subscribe(lambda kind, reports: tile_cache.update(reports))
+
+# Upper bound on explicit ids per POST /admin/reports/bulk request
+BULK_MAX_IDS = int(os.environ.get('BULK_MAX_IDS', 10000))
+
+# Near-duplicate photos (perceptual hash + location, see near_duplicates.py) are flagged on the
+# new report; with NEAR_DUPLICATE_SKIP=1 they are answered with 409 before running the model.
+# The index is built in the background on the first image upload; until it is ready uploads
+# skip the check and say so with near_duplicate_check: 'pending'.
+NEAR_DUPLICATE_CHECK = os.environ.get('NEAR_DUPLICATE_CHECK', '1') == '1'
+NEAR_DUPLICATE_SKIP = os.environ.get('NEAR_DUPLICATE_SKIP', '0') == '1'
+NEAR_DUPLICATE_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_DISTANCE', 12))  # pHash bits of 64
+NEAR_DUPLICATE_RADIUS_M = float(os.environ.get('NEAR_DUPLICATE_RADIUS_M', 50))
+duplicate_index = None  # set by start_duplicate_index(), usable once .loaded
+duplicate_index_lock = threading.Lock()
+
+UPLOADS_IN_PROGRESS = metrics.gauge('smartroad_uploads_in_progress', 'Uploads currently being processed (queue depth)')
+
+# Admission control for /upload (see admission.py). Public and bulk clients get a token bucket
+# each; at most UPLOAD_CONCURRENCY uploads are processed at once (0 = one per inference worker),
+# and an upload whose expected queue wait exceeds its class's target is refused with 503.
+# Admin uploads (X-Admin-Token: ADMIN_UPLOAD_TOKEN, which also unlocks /admin/profiles) skip
+# the bucket and queue first; clients can mark themselves bulk (X-Upload-Priority: bulk) to queue last.
+UPLOAD_RATE_PER_MIN = float(os.environ.get('UPLOAD_RATE_PER_MIN', 10))  # 0 = no rate limit
+UPLOAD_BURST = int(os.environ.get('UPLOAD_BURST', 5))
+UPLOAD_CONCURRENCY = int(os.environ.get('UPLOAD_CONCURRENCY', 0)) or worker_count()
+UPLOAD_MAX_WAIT = {
+    'admin': float(os.environ.get('UPLOAD_MAX_WAIT_ADMIN', 120)),
+    'public': float(os.environ.get('UPLOAD_MAX_WAIT_PUBLIC', 30)),
+    'bulk': float(os.environ.get('UPLOAD_MAX_WAIT_BULK', 10)),
+}
+ADMIN_UPLOAD_TOKEN = os.environ.get('ADMIN_UPLOAD_TOKEN', '')
+upload_limiter = RateLimiter(UPLOAD_RATE_PER_MIN, UPLOAD_BURST)
+upload_admission = AdmissionController(UPLOAD_CONCURRENCY, UPLOAD_MAX_WAIT)
+UPLOADS_REJECTED = metrics.counter('smartroad_uploads_rejected_total', 'Uploads refused before processing',
+                                   labels=('reason', 'class'))
+
+# Import the detection stack and load the model in a background thread at startup, so the
+# first upload doesn't pay for it (off by default: the model is loaded on first use)
+WARM_UP = os.environ.get('WARM_UP', '0') == '1'
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _record_request_time(response):
+    start = getattr(g, 'request_start', None)
+    if metrics.ENABLED and start is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, request.endpoint or 'unknown',
+                                        request.method, response.status_code)
+    return response
+
+
+# JSON/msgpack encoding and response compression (registered after the timer so it is timed)
+serialization.init_app(app)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint (stage histograms, model load, queue depth, cache hits, RSS)."""
+    if not metrics.ENABLED:
+        return jsonify({'error': 'Metrics disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
+
+
+def load_reports():
+    """Current reports.json contents ([] if missing or unreadable)."""
+    if not os.path.exists(REPORTS_PATH):
+        return []
+    try:
+        with open(REPORTS_PATH, 'r', encoding='utf-8') as rf:
+            return loads(rf.read())
+    except Exception:
+        return []
+
+
+def store_signature():
+    """(mtime, size) of reports.json, or None if missing: changes whenever the file is replaced."""
+    try:
+        st = os.stat(REPORTS_PATH)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def sync_report_index():
+    """Reload report_index unless it mirrors reports.json (caller holds store_lock)."""
+    signature = store_signature()
+    if not report_index.loaded or report_index.signature != signature:
+        report_index.load(load_reports(), signature)
+    return report_index
+
 
-# Path to model in repo
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'pothole.pt')
+def ensure_report_index():
+    """report_index, reloaded first if reports.json was replaced by another process."""
+    if report_index.loaded and report_index.signature == store_signature():
+        return report_index
+    with store_lock:
+        return sync_report_index()
 
-# Inference image size (smaller = less RAM)
-INFER_SIZE = 416
 
-# Lazy model loading — don't block server startup
-model = None
-model_lock = threading.Lock()
+def persist_reports(reports):
+    """Write reports.json and record it as what report_index mirrors (caller holds store_lock)."""
+    try:
+        write_json_atomic(REPORTS_PATH, reports)
+    except Exception:
+        report_index.loaded = False  # memory and file may differ now
+        raise
+    report_index.signature = store_signature()
+
+
+def fit_sse_clients(pool_threads):
+    """Lower SSE_MAX_CLIENTS so open streams leave most of a pool_threads request pool free."""
+    global SSE_MAX_CLIENTS
+    cap = max(1, int(pool_threads * SSE_POOL_SHARE))
+    if SSE_MAX_CLIENTS > cap:
+        print(f'SSE_MAX_CLIENTS lowered from {SSE_MAX_CLIENTS} to {cap} ({pool_threads} request threads)')
+        SSE_MAX_CLIENTS = cap
+    return SSE_MAX_CLIENTS
+
+
+def ensure_feed_loaded(reports=None):
+    """Start the feed's numbering after the newest stored version (once per process)."""
+    if not report_feed.loaded:
+        report_feed.load(load_reports() if reports is None else reports)
 
-def get_model():
-    """Load model on first use instead of at startup (prevents Render port timeout)."""
-    global model
-    if model is None:
-        with model_lock:
-            if model is None:  # double-check inside lock
-                print('Loading YOLO model...')
-                model = YOLO(MODEL_PATH)
-                gc.collect()
-                print(f'Model loaded (imgsz={INFER_SIZE})')
-    return model
+
+def start_duplicate_index():
+    """
+    Start indexing the stored image reports' perceptual hashes in a background
+    thread (once per process). Returns the index once it is loaded, else None.
+    """
+    global duplicate_index
+    with duplicate_index_lock:
+        if duplicate_index is None:
+            from near_duplicates import NearDuplicateIndex
+            index = NearDuplicateIndex(NEAR_DUPLICATE_DISTANCE, radius_m=NEAR_DUPLICATE_RADIUS_M)
+            # Reports saved after this snapshot are added to the index by the upload that saves them
+            with store_lock:
+                reports = list(sync_report_index().reports)
+                duplicate_index = index
+            threading.Thread(target=_load_duplicate_index, args=(index, reports), daemon=True).start()
+    index = duplicate_index
+    return index if index is not None and index.loaded else None
+
+
+def _load_duplicate_index(index, reports):
+    global duplicate_index
+    try:
+        hashed = index.load(reports, DATA_DIR)
+        if hashed:
+            print(f'Near-duplicate index: hashed {hashed} stored images')
+    except Exception as e:
+        print('Near-duplicate index error:', e)
+        with duplicate_index_lock:
+            duplicate_index = None  # rebuilt on the next upload
+
+
+def _preview_done(future):
+    if future.exception() is not None:
+        print('Preview error:', future.exception())
+
+
+def public_report(r):
+    """Public map view of a report (what /reports and /reports/stream send)."""
+    sev = r.get('severity_breakdown', {})
+    return {
+        'id': r.get('id', ''),
+        'lat': r['lat'],
+        'lon': r['lon'],
+        'location': r.get('description', 'Pothole detected'),
+        'detections': r.get('total_detections', 0),
+        'severity_breakdown': {
+            'Minor': sev.get('Minor', 0),
+            'Moderate': sev.get('Moderate', 0),
+            'Major': sev.get('Major', 0)
+        },
+        'timestamp': r.get('timestamp', 0),
+        'annotated_file': r.get('annotated_file', ''),
+        'version': r.get('version', 0),
+    }
+
+
+def save_admin_changes(reports, changed):
+    """Stamp, persist and publish admin-edited reports (caller holds store_lock)."""
+    if not changed:
+        return
+    ensure_feed_loaded(reports)
+    for r in changed:
+        report_feed.stamp(r)
+    persist_reports(reports)
+    report_feed.publish('updated', [public_report(r) for r in changed if r.get('lat') and r.get('lon')])
 
 
 @app.route('/', methods=['GET'])
@@ -53,12 +310,66 @@ def health():
     return jsonify({
         'status': 'online',
         'service': 'SmartRoad AI Backend',
-        'endpoints': ['/upload', '/reports', '/admin/stats', '/admin/auth', '/admin/reports']
+        'endpoints': ['/upload', '/reports', '/admin/stats', '/admin/auth', '/admin/reports', '/admin/reports/bulk', '/metrics']
     })
 
 
+def is_admin():
+    """True if the request carries a valid X-Admin-Token (never when ADMIN_UPLOAD_TOKEN is unset)."""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_UPLOAD_TOKEN and token and hmac.compare_digest(token, ADMIN_UPLOAD_TOKEN))
+
+
+def upload_class():
+    """Priority class of this upload: admin (valid X-Admin-Token), bulk (self-declared) or public."""
+    if is_admin():
+        return 'admin'
+    if request.headers.get('X-Upload-Priority', request.args.get('priority', '')).lower() == 'bulk':
+        return 'bulk'
+    return 'public'
+
+
+def reject(status, message, retry_after=None, reason='busy', cls='public'):
+    """Refuse an upload; retry_after (seconds) is rounded up into a Retry-After header."""
+    UPLOADS_REJECTED.inc(1, reason, cls)
+    retry_after = max(1, math.ceil(retry_after)) if retry_after else None
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response, status
+
+
 @app.route('/upload', methods=['POST'])
 def upload():
+    # Everything here runs before the body is read, so refusals are cheap
+    cls = upload_class()
+    if request.content_length and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        return reject(413, 'Upload too large', reason='too_large', cls=cls)
+    if cls != 'admin':
+        wait = upload_limiter.check((cls, request.remote_addr))
+        if wait:
+            return reject(429, 'Too many uploads, slow down', wait, reason='rate_limited', cls=cls)
+    try:
+        with upload_admission.admit(cls):
+            UPLOADS_IN_PROGRESS.inc()
+            try:
+                return _upload()
+            finally:
+                UPLOADS_IN_PROGRESS.dec()
+    except Rejected as e:
+        return reject(e.status, e.message, e.retry_after, cls=cls)
+
+
+def _upload():
+    # The detection stack (cv2, and ultralytics/torch behind the model) is imported on the
+    # first upload, not at startup, so the app answers health checks as soon as it boots
+    import cv2
+    from detect_pothole import detect_pothole
+    from evidence import contact_sheet
+    from near_duplicates import image_hashes
+    from video_preview import detection_windows, write_preview
+    from video_segments import detect_video_segmented
+
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
 
@@ -66,49 +377,142 @@ def upload():
     if f.filename == '':
         return jsonify({'error': 'Empty filename'}), 400
 
+    try:
+        gps_offset = float(request.form.get('gps_offset', 0) or 0)  # track seconds at video t=0
+        if not math.isfinite(gps_offset):
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'gps_offset must be a number of seconds'}), 400
+
     filename = secure_filename(f.filename)
+    is_video = os.path.splitext(filename)[1].lower() in VIDEO_EXTENSIONS
     tmpdir = tempfile.mkdtemp(prefix='smartroad_')
     path = os.path.join(tmpdir, filename)
-    f.save(path)
+    image_bytes = None
+    with timed('upload_save'):
+        if is_video:
+            f.save(path)
+        else:
+            # Images are decoded from these bytes; the file is only kept as the original
+            image_bytes = f.read()
+            with open(path, 'wb') as out:
+                out.write(image_bytes)
 
     # read optional metadata from form
     lat = request.form.get('lat')
     lon = request.form.get('lon')
     description = request.form.get('description', '')
+    sliced = request.form.get('sliced', '1' if SLICED_INFERENCE else '0').lower() in ('1', 'true', 'yes')
+
+    # Same photo uploaded again (recompressed, resized, screenshotted) near the same spot?
+    hashes = None
+    near_duplicates = []
+    duplicate_check_pending = False
+    if image_bytes is not None and NEAR_DUPLICATE_CHECK:
+        try:
+            with timed('near_duplicate'):
+                hashes = image_hashes(image_bytes)
+                index = start_duplicate_index() if hashes else None
+                if index is not None:
+                    near_duplicates = index.find(hashes, float(lat) if lat else None,
+                                                 float(lon) if lon else None)
+                elif hashes:
+                    duplicate_check_pending = True
+        except Exception as e:
+            print('Near-duplicate check error:', e)
+        if near_duplicates and NEAR_DUPLICATE_SKIP:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            return jsonify({
+                'error': 'Near-duplicate of an existing report',
+                'duplicate_of': near_duplicates[0]['report_id'],
+                'near_duplicates': near_duplicates,
+            }), 409
 
     # Run detection using unified detector (auto-detects image/video)
-    loaded_model = get_model()
-    if loaded_model is None:
+    if not model_ready():
         return jsonify({'error': 'Model not loaded on server'}), 500
 
+    # Optional GPS track for videos: GPX/CSV/NMEA/SRT sidecar in form field 'gps',
+    # else NMEA sentences in the clip's embedded subtitle stream
+    gps_track = None
+    if is_video:
+        try:
+            gps_file = request.files.get('gps')
+            if gps_file and gps_file.filename:
+                gps_path = os.path.join(tmpdir, 'gps_' + secure_filename(gps_file.filename))
+                gps_file.save(gps_path)
+                gps_track = load_track(gps_path)
+            else:
+                srt = extract_subtitle_track(path)
+                gps_track = parse_srt(srt) if srt else None
+        except Exception as e:
+            print('GPS track error:', e)
+            gps_track = None
+    # Checkpoint long videos by content hash, so a retried upload of the same clip resumes
+    checkpoint_path = None
+    if VIDEO_STREAMING and is_video:
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{file_sha1(path)}.json")
+
     try:
-        img, detections, total, severity_breakdown, _ = detect_pothole(path, loaded_model, imgsz=INFER_SIZE)
+        result = None
+        # A detection budget needs one ordered pass, so it always runs sequentially
+        if is_video and VIDEO_STREAMING and VIDEO_SEGMENTED and not VIDEO_DETECTION_BUDGET:
+            result = detect_video_segmented(
+                path, segments=VIDEO_SEGMENTS, frame_skip=VIDEO_FRAME_SKIP, imgsz=INFER_SIZE,
+                motion_gate=VIDEO_MOTION_GATE, top_k=VIDEO_EVIDENCE_TOP_K,
+                min_seconds=VIDEO_SEGMENT_MIN_SECONDS,
+            )
+        if result is None:  # images, short clips, or segmentation off
+            result = run_inference_sync(
+                detect_pothole, path, MODEL, imgsz=INFER_SIZE, sliced=sliced,
+                tile_size=SLICE_TILE_SIZE, tile_overlap=SLICE_OVERLAP, tile_batch_size=SLICE_BATCH_SIZE,
+                motion_gate=VIDEO_MOTION_GATE, detection_budget=VIDEO_DETECTION_BUDGET,
+                stream=VIDEO_STREAMING, frame_skip=VIDEO_FRAME_SKIP,
+                evidence_top_k=VIDEO_EVIDENCE_TOP_K, checkpoint_path=checkpoint_path,
+                image_bytes=image_bytes,
+            )
+        img, detections, total, severity_breakdown, stats = result
     except Exception as e:
         print(f'Detection error: {e}')
         return jsonify({'error': f'Detection error: {e}'}), 500
 
+    # Evidence crops (JPEG bytes) are persisted with the report, not returned as JSON
+    evidence = stats.pop('evidence', []) if stats else []
+
+    # Per-detection coordinates from the GPS track (tracked detections carry timestamp_ms)
+    geotagged = bool(gps_track) and any(d.get('timestamp_ms') is not None for d in detections)
+    if geotagged:
+        geotag_detections(detections, gps_track, gps_offset)
+
     response = {
         'total_detections': total,
         'severity_breakdown': severity_breakdown,
         'detections': detections,
     }
+    if stats:
+        response['stats'] = stats
+    if near_duplicates:
+        response['near_duplicates'] = near_duplicates
+    if duplicate_check_pending:
+        response['near_duplicate_check'] = 'pending'
 
     # Award coins server-side when at least one detection found
     try:
-        wallets_path = os.path.join(os.path.dirname(__file__), 'wallets.json')
-        # load existing or initialize
-        if os.path.exists(wallets_path):
-            with open(wallets_path, 'r', encoding='utf-8') as wf:
-                wallets = json.load(wf)
-        else:
-            wallets = {}
+        wallets_path = WALLETS_PATH
+        with store_lock:
+            # load existing or initialize
+            if os.path.exists(wallets_path):
+                with open(wallets_path, 'r', encoding='utf-8') as wf:
+                    wallets = loads(wf.read())
+            else:
+                wallets = {}
 
-        # use a simple global counter key for now
-        if total > 0:
-            wallets['global_wallet'] = wallets.get('global_wallet', 0) + 10
-        # save back
-        with open(wallets_path, 'w', encoding='utf-8') as wf:
-            json.dump(wallets, wf)
+            # use a simple global counter key for now
+            if total > 0:
+                wallets['global_wallet'] = wallets.get('global_wallet', 0) + 10
+            # save back
+            write_json_atomic(wallets_path, wallets)
 
         # include wallet value in response for clients to sync
         response['wallet'] = wallets.get('global_wallet', 0)
@@ -120,8 +524,10 @@ def upload():
     buf = None
     try:
         if img is not None:
-            _, buf = cv2.imencode('.png', img)
-            b64 = base64.b64encode(buf).decode('utf-8')
+            with timed('png_encode'):
+                _, buf = cv2.imencode('.png', img)
+            with timed('base64'):
+                b64 = base64.b64encode(buf).decode('utf-8')
             annotated_data = f"data:image/png;base64,{b64}"
             response['annotated'] = annotated_data
         else:
@@ -132,11 +538,9 @@ def upload():
 
     # Persist report when detections found
     try:
-        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
+        reports_dir = REPORTS_DIR
         os.makedirs(reports_dir, exist_ok=True)
 
-        reports_path = os.path.join(os.path.dirname(__file__), 'reports.json')
-
         if total > 0:
             # unique filename
             uid = str(int(time.time() * 1000)) + '_' + uuid.uuid4().hex[:8]
@@ -160,12 +564,42 @@ def upload():
             except Exception:
                 saved_annot = None
 
+            # save video evidence crops (best frame per tracked pothole)
+            evidence_files = []
+            for n, ev in enumerate(evidence):
+                try:
+                    ev_path = os.path.join(reports_dir, f"{uid}_ev{n}_t{ev['track_id']}.jpg")
+                    with open(ev_path, 'wb') as ef:
+                        ef.write(ev['jpeg'])
+                    evidence_files.append({
+                        'file': os.path.relpath(ev_path, DATA_DIR).replace('\\', '/'),
+                        'track_id': ev['track_id'],
+                        'confidence': ev['confidence'],
+                        'severity': ev['severity'],
+                        'timestamp_ms': ev['timestamp_ms'],
+                    })
+                except Exception as e:
+                    print('Evidence save error:', e)
+
+            # one captioned sheet of every evidence crop, for a quick review
+            sheet_file = None
+            if evidence:
+                try:
+                    sheet = contact_sheet(evidence)
+                    if sheet:
+                        sheet_path = os.path.join(reports_dir, f"{uid}_sheet.jpg")
+                        with open(sheet_path, 'wb') as sf:
+                            sf.write(sheet)
+                        sheet_file = os.path.relpath(sheet_path, DATA_DIR).replace('\\', '/')
+                except Exception as e:
+                    print('Contact sheet error:', e)
+
             # build report entry
             entry = {
                 'id': uid,
                 'timestamp': int(time.time()),
-                'original_file': os.path.relpath(saved_original, os.path.dirname(__file__)).replace('\\', '/'),
-                'annotated_file': os.path.relpath(saved_annot, os.path.dirname(__file__)).replace('\\', '/') if saved_annot else None,
+                'original_file': os.path.relpath(saved_original, DATA_DIR).replace('\\', '/'),
+                'annotated_file': os.path.relpath(saved_annot, DATA_DIR).replace('\\', '/') if saved_annot else None,
                 'annotated_base64': response.get('annotated'),
                 'lat': float(lat) if lat else None,
                 'lon': float(lon) if lon else None,
@@ -173,32 +607,67 @@ def upload():
                 'total_detections': total,
                 'severity_breakdown': severity_breakdown,
                 'detections': detections,
+                # frame the bboxes are expressed in, so severities can be re-classified later
+                'frame_size': stats.get('frame_size') if stats else None,
+                'source': stats.get('source') if stats else None,
+                'evidence': evidence_files,
+                'contact_sheet': sheet_file,
             }
+            if hashes:
+                entry['phash'], entry['dhash'] = hashes
+            if near_duplicates:
+                entry['near_duplicate_of'] = [m['report_id'] for m in near_duplicates]
 
-            # append to reports.json
-            if os.path.exists(reports_path):
-                try:
-                    with open(reports_path, 'r', encoding='utf-8') as rf:
-                        reports = json.load(rf)
-                except Exception:
-                    reports = []
+            # Reviewer preview: only the seconds around tracked detections
+            if is_video and VIDEO_PREVIEW and saved_original != path:
+                windows = detection_windows(detections, pad_ms=VIDEO_PREVIEW_PAD_MS)
+                if windows:
+                    preview_path = os.path.join(reports_dir, f"{uid}_preview.mp4")
+                    entry['preview_file'] = os.path.relpath(preview_path, DATA_DIR).replace('\\', '/')
+                    entry['preview_windows'] = windows
+                    preview_executor.submit(write_preview, saved_original, preview_path, windows,
+                                            width=VIDEO_PREVIEW_WIDTH).add_done_callback(_preview_done)
+
+            # Geotagged video: one report per tracked pothole at its own coordinate
+            if geotagged:
+                entries = []
+                for d in detections:
+                    track_id = d.get('track_id')
+                    entries.append(dict(
+                        entry,
+                        id=f"{uid}_t{track_id}",
+                        parent_id=uid,
+                        track_id=track_id,
+                        lat=d.get('lat', entry['lat']),
+                        lon=d.get('lon', entry['lon']),
+                        total_detections=1,
+                        severity_breakdown={k: int(k == d['severity']) for k in ('Minor', 'Moderate', 'Major')},
+                        detections=[d],
+                        evidence=[e for e in evidence_files if e['track_id'] == track_id],
+                    ))
             else:
-                reports = []
+                entries = [entry]
 
-            reports.append(entry)
-            with open(reports_path, 'w', encoding='utf-8') as rf:
-                json.dump(reports, rf, indent=2)
+            # append to reports.json
+            with timed('json_persist'), store_lock:
+                reports = sync_report_index().reports
+                ensure_feed_loaded(reports)
+                for e in entries:
+                    report_feed.stamp(e)
+                persist_reports(reports + entries)
+                report_index.extend(entries)
+                report_feed.publish('created', [public_report(e) for e in entries if e.get('lat') and e.get('lon')])
+                if hashes and duplicate_index is not None:
+                    duplicate_index.add(entry['id'], hashes, entry['lat'], entry['lon'])
 
             response['message'] = 'Pothole detected and report saved'
+            response['report_ids'] = [e['id'] for e in entries]
         else:
             response['message'] = 'No pothole detected'
     except Exception as e:
         print('Report persistence error:', e)
         response['message'] = response.get('message', '') or 'Processed, but failed to save report'
 
-    # Free memory after each upload
-    gc.collect()
-
     return jsonify(response)
 
 
@@ -206,7 +675,7 @@ def upload():
 def admin_stats():
     """Get dashboard statistics from reports.json"""
     try:
-        reports_path = os.path.join(os.path.dirname(__file__), 'reports.json')
+        reports_path = REPORTS_PATH
         if not os.path.exists(reports_path):
             return jsonify({
                 'success': True,
@@ -222,7 +691,7 @@ def admin_stats():
             })
         
         with open(reports_path, 'r', encoding='utf-8') as rf:
-            reports = json.load(rf)
+            reports = loads(rf.read())
         
         # Calculate statistics from severity_breakdown
         total_uploads = len(reports)
@@ -248,7 +717,7 @@ def admin_stats():
             is_video = orig_file.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))
             
             formatted_reports.append({
-                'id': f"RPT-{str(report.get('id', idx)).zfill(4)}",
+                'id': display_id(report.get('id', idx)),
                 'type': 'Video' if is_video else 'Image',
                 'source': 'User',
                 'lat': report.get('lat'),
@@ -266,6 +735,7 @@ def admin_stats():
                 'status': report.get('admin_status') or ['In Progress', 'Under Review', 'Site Verification', 'Completed'][idx % 4],
                 'progress': report.get('admin_progress') if report.get('admin_progress') is not None else [25, 60, 85, 100][idx % 4],
                 'notes': report.get('admin_notes', ''),
+                'assignee': report.get('admin_assignee', ''),
                 'timestamp': report.get('timestamp', int(time.time())),
                 'image_path': f"/{report.get('original_file', '').replace(chr(92), '/')}" if report.get('original_file') else None,
                 'image_with_detections': f"/{report.get('annotated_file', '').replace(chr(92), '/')}" if report.get('annotated_file') else None
@@ -290,37 +760,20 @@ def admin_stats():
 
 @app.route('/admin/report/<report_id>/update', methods=['POST'])
 def update_report(report_id):
-    """Update report admin fields (status, progress, notes)."""
+    """Update report admin fields (status, progress, notes, assignee)."""
     try:
-        data = request.get_json()
-        reports_path = os.path.join(os.path.dirname(__file__), 'reports.json')
-        if not os.path.exists(reports_path):
-            return jsonify({'success': False, 'error': 'No reports'}), 404
+        data = request.get_json() or {}
+        try:
+            changes = parse_changes(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
-        with open(reports_path, 'r', encoding='utf-8') as rf:
-            reports = json.load(rf)
-
-        raw_id = report_id.replace('RPT-', '') if report_id.startswith('RPT-') else report_id
-
-        found = False
-        for r in reports:
-            rid = str(r.get('id', ''))
-            # match either raw id or zero-padded version
-            if rid == raw_id or rid.zfill(4) == raw_id:
-                if 'status' in data:
-                    r['admin_status'] = data['status']
-                if 'progress' in data:
-                    r['admin_progress'] = data['progress']
-                if 'notes' in data:
-                    r['admin_notes'] = data['notes']
-                found = True
-                break
-
-        if not found:
-            return jsonify({'success': False, 'error': 'Report not found'}), 404
-
-        with open(reports_path, 'w', encoding='utf-8') as wf:
-            json.dump(reports, wf, indent=2)
+        with store_lock:
+            index = sync_report_index()
+            results, changed = bulk_update(index.reports, changes, ids=[report_id], index=index)
+            if results[0]['result'] == 'not_found':
+                return jsonify({'success': False, 'error': 'Report not found'}), 404
+            save_admin_changes(index.reports, changed)
 
         return jsonify({'success': True})
     except Exception as e:
@@ -328,41 +781,87 @@ def update_report(report_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/admin/report/<report_id>/artifacts', methods=['GET'])
-def report_artifacts(report_id):
-    """Return file paths for a specific report's evidence (original, annotated, thumbs)."""
+@app.route('/admin/reports/bulk', methods=['POST'])
+def bulk_update_reports():
+    """
+    Apply admin field changes to many reports in one store transaction.
+
+    Body: {"ids": [...]} and/or {"filter": {"severity": "Major",
+    "bbox": "min_lon,min_lat,max_lon,max_lat", "status": "..."}}, plus any of
+    status, progress, notes, assignee. Requires X-Admin-Token. Returns per-id
+    results ('updated' / 'unchanged' / 'not_found').
+    """
+    if not is_admin():
+        return jsonify({'success': False, 'error': 'Admin token required'}), 403
     try:
-        reports_path = os.path.join(os.path.dirname(__file__), 'reports.json')
-        if not os.path.exists(reports_path):
-            return jsonify({'success': False, 'error': 'No reports'}), 404
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'JSON body required'}), 400
 
-        with open(reports_path, 'r', encoding='utf-8') as rf:
-            reports = json.load(rf)
+        ids = data.get('ids')
+        query = data.get('filter')
+        try:
+            changes = parse_changes(data)
+            if not changes:
+                raise ValueError('nothing to update (status, progress, notes or assignee)')
+            if ids is not None and (not isinstance(ids, list) or len(ids) > BULK_MAX_IDS):
+                raise ValueError(f'ids must be a list of at most {BULK_MAX_IDS} report ids')
+            match = parse_filter(query) if query is not None else None
+            if not ids and match is None:
+                raise ValueError('ids or filter required')
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
-        raw_id = report_id.replace('RPT-', '') if report_id.startswith('RPT-') else report_id
+        with timed('json_persist'), store_lock:
+            index = sync_report_index()
+            results, changed = bulk_update(index.reports, changes, ids=ids, match=match, index=index)
+            save_admin_changes(index.reports, changed)
 
-        found = None
-        for r in reports:
-            if str(r.get('id', '')) == raw_id:
-                found = r
-                break
+        return jsonify({
+            'success': True,
+            'updated': len(changed),
+            'not_found': sum(1 for r in results if r['result'] == 'not_found'),
+            'results': results,
+        })
+    except Exception as e:
+        print(f'Bulk update error: {e}')
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        if not found:
+
+@app.route('/admin/report/<report_id>/artifacts', methods=['GET'])
+def report_artifacts(report_id):
+    """Return file paths for a specific report's evidence (original, annotated, thumbs)."""
+    try:
+        found = ensure_report_index().get(report_id)
+        if found is None:
             return jsonify({'success': False, 'error': 'Report not found'}), 404
 
-        base_dir = os.path.dirname(__file__)
+        base_dir = DATA_DIR
         orig = found.get('original_file', '')
         annot = found.get('annotated_file', '')
+        preview = found.get('preview_file')
 
         # Check if files still exist on disk (ephemeral storage may wipe them)
         orig_exists = orig and os.path.exists(os.path.join(base_dir, orig))
         annot_exists = annot and os.path.exists(os.path.join(base_dir, annot))
+        preview_exists = preview and os.path.exists(os.path.join(base_dir, preview))
+        sheet = found.get('contact_sheet')
+        sheet_exists = sheet and os.path.exists(os.path.join(base_dir, sheet))
+
+        # Evidence crops (best frame per tracked pothole), most confident first
+        evidence = sorted(found.get('evidence') or [], key=lambda e: -(e.get('confidence') or 0))
+        thumbs = [f"/{e['file']}" for e in evidence
+                  if e.get('file') and os.path.exists(os.path.join(base_dir, e['file']))]
 
         # Build artifacts response with base64 fallback
         data = {
             'original': f"/{orig.replace(chr(92), '/')}" if orig_exists else None,
             'annotated': f"/{annot.replace(chr(92), '/')}" if annot_exists else found.get('annotated_base64'),
-            'thumbs': [],
+            'thumbs': thumbs,
+            'contact_sheet': f"/{sheet}" if sheet_exists else None,
+            # None while the background preview is still being written
+            'preview': f"/{preview}" if preview_exists else None,
+            'preview_windows': found.get('preview_windows'),
             'log': found.get('detections'),
             'type': 'Video' if orig.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')) else 'Image',
         }
@@ -377,49 +876,155 @@ def report_artifacts(report_id):
 def get_reports():
     """Get all pothole reports with location data for public map view"""
     try:
-        reports_path = os.path.join(os.path.dirname(__file__), 'reports.json')
+        reports_path = REPORTS_PATH
         if not os.path.exists(reports_path):
             return jsonify([])
         
+        # Sequence number taken before reading, so a client streaming from it
+        # may see a change twice but never misses one
+        ensure_feed_loaded()
+        seq = report_feed.published
         with open(reports_path, 'r', encoding='utf-8') as rf:
-            reports = json.load(rf)
+            reports = loads(rf.read())
         
         # Format for public map view with severity info
-        formatted_reports = []
-        for r in reports:
-            if r.get('lat') and r.get('lon'):
-                sev = r.get('severity_breakdown', {})
-                formatted_reports.append({
-                    'id': r.get('id', ''),
-                    'lat': r['lat'],
-                    'lon': r['lon'],
-                    'location': r.get('description', 'Pothole detected'),
-                    'detections': r.get('total_detections', 0),
-                    'severity_breakdown': {
-                        'Minor': sev.get('Minor', 0),
-                        'Moderate': sev.get('Moderate', 0),
-                        'Major': sev.get('Major', 0)
-                    },
-                    'timestamp': r.get('timestamp', 0),
-                    'annotated_file': r.get('annotated_file', '')
-                })
+        formatted_reports = [public_report(r) for r in reports if r.get('lat') and r.get('lon')]
         
-        return jsonify(formatted_reports)
+        response = jsonify(formatted_reports)
+        response.headers['X-Report-Seq'] = str(seq)
+        return response
     except Exception as e:
         print(f'Reports error: {e}')
         return jsonify({'error': str(e)}), 500
 
 
+def report_changes(since):
+    """
+    (events, cursor): public-view changes with version > since, and the
+    version the caller has now caught up to. Served from the feed's memory
+    log when it reaches back far enough, else replayed from reports.json.
+    """
+    events = report_feed.since(since)
+    if events is not None:
+        return events, max([since] + [e['seq'] for e in events])
+    # Older than the in-memory log (or before a restart): replay from the store
+    cursor = report_feed.published
+    stored = sorted((r for r in load_reports() if int(r.get('version') or 0) > since),
+                    key=lambda r: int(r.get('version') or 0))
+    events = [{'seq': int(r.get('version') or 0), 'type': 'updated', 'report': public_report(r)}
+              for r in stored if r.get('lat') and r.get('lon')]
+    return events, max([since, cursor] + [e['seq'] for e in events])
+
+
+@app.route('/reports/changes', methods=['GET'])
+def reports_changes():
+    """
+    Delta sync: reports created or updated after ?since=<version> (omit for
+    all). compact=1 returns geo-only rows (same shape as the offline snapshot).
+    Poll again with the returned version; more=true means call again now.
+    """
+    try:
+        since = int(request.args.get('since', -1))
+        limit = max(1, min(int(request.args.get('limit', 1000)), 10000))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    compact = request.args.get('compact', '0').lower() in ('1', 'true', 'yes')
+
+    ensure_feed_loaded()
+    events, cursor = report_changes(since)
+    more = len(events) > limit
+    if more:
+        events = events[:limit]
+        cursor = events[-1]['seq']
+
+    # Latest version of each report only
+    latest = {}
+    for e in events:
+        latest[e['report']['id']] = e['report']
+    rows = sorted(latest.values(), key=lambda r: r['version'])
+    return jsonify({
+        'version': cursor,
+        'more': more,
+        'changes': [compact_report(r) for r in rows] if compact else rows,
+    })
+
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_tile(z, x, y):
+    """Packed binary tile of pothole points/clusters (format in tiles.py)."""
+    if z > MAX_ZOOM or x >= (1 << z) or y >= (1 << z):
+        return jsonify({'error': 'Tile out of range'}), 400
+
+    if not tile_cache.loaded:
+        with store_lock:
+            if not tile_cache.loaded:
+                tile_cache.load(load_reports())
+
+    etag = f'"{z}-{x}-{y}-{tile_cache.version(z, x, y)}"'
+    if request.headers.get('If-None-Match') == etag:
+        metrics.record_cache('tiles', True)
+        return Response(status=304, headers={'ETag': etag})
+
+    data, hit = tile_cache.get(z, x, y)
+    metrics.record_cache('tiles', hit)
+    return Response(data, mimetype='application/octet-stream',
+                    headers={'ETag': etag, 'Cache-Control': 'public, max-age=30'})
+
+
+@app.route('/reports/stream', methods=['GET'])
+def stream_reports():
+    """
+    Server-Sent Events feed of created/updated reports.
+
+    Query params: since=<seq> (e.g. the X-Report-Seq of a /reports fetch; the
+    Last-Event-ID header wins on reconnect) and optional
+    bbox=min_lon,min_lat,max_lon,max_lat. Each event carries the public report
+    view and its sequence number as the event id.
+    """
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since') or -1)
+        bbox = parse_bbox(request.args.get('bbox'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if SSE_CLIENTS.values.get((), 0) >= SSE_MAX_CLIENTS:
+        return jsonify({'error': 'Too many live clients, poll /reports instead'}), 503
+
+    ensure_feed_loaded()
+    if since < 0:
+        since = report_feed.published
+
+    def visible(report):
+        return report.get('lat') and report.get('lon') and in_bbox(report, bbox)
+
+    def generate(cursor):
+        SSE_CLIENTS.inc()
+        try:
+            deadline = time.time() + SSE_MAX_SECONDS
+            yield f'retry: 3000\nevent: hello\ndata: {json.dumps({"seq": cursor})}\n\n'
+            while time.time() < deadline:
+                events, cursor = report_changes(cursor)
+                for event in events:
+                    if visible(event['report']):
+                        yield format_event(event)
+                if report_feed.wait(cursor, min(SSE_KEEPALIVE_SECONDS, max(0.0, deadline - time.time()))) <= cursor:
+                    yield ': keepalive\n\n'
+        finally:
+            SSE_CLIENTS.dec()
+
+    return Response(stream_with_context(generate(since)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/admin/reports', methods=['GET'])
 def admin_reports():
     """Get all reports/pothole data"""
     try:
-        reports_path = os.path.join(os.path.dirname(__file__), 'reports.json')
+        reports_path = REPORTS_PATH
         if not os.path.exists(reports_path):
             return jsonify([])
         
         with open(reports_path, 'r', encoding='utf-8') as rf:
-            reports = json.load(rf)
+            reports = loads(rf.read())
         
         # Format reports for frontend
         formatted_reports = []
@@ -468,17 +1073,61 @@ def admin_auth():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/admin/profiles', methods=['GET'])
+def admin_profiles():
+    """List recent slow-request profiles, newest first."""
+    if not is_admin():
+        return jsonify({'success': False, 'error': 'Admin token required'}), 403
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'success': True, 'data': profiling.list_profiles(PROFILE_DIR, limit)})
+    except Exception as e:
+        print(f'Profiles error: {e}')
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/admin/profiles/<path:filename>', methods=['GET'])
+def admin_profile_file(filename):
+    """Download one profile file (.prof for snakeviz/pstats, .txt summary, .html for pyinstrument)."""
+    if not is_admin():
+        return jsonify({'success': False, 'error': 'Admin token required'}), 403
+    try:
+        return send_from_directory(PROFILE_DIR, filename)
+    except Exception as e:
+        print(f'Profile serve error: {e}')
+        return jsonify({'error': 'File not found'}), 404
+
+
 @app.route('/reports/<path:filepath>', methods=['GET'])
 def serve_report_file(filepath):
-    """Serve report files (images/videos)"""
+    """Serve report files (images/videos) with Range / conditional request support"""
     try:
-        reports_dir = os.path.join(os.path.dirname(__file__), 'reports')
-        return send_from_directory(reports_dir, filepath)
+        response = send_evidence_file(REPORTS_DIR, filepath)
+        if response is None:
+            return jsonify({'error': 'File not found'}), 404
+        return response
     except Exception as e:
         print(f'File serve error: {e}')
         return jsonify({'error': 'File not found'}), 404
 
 
+def _warm_up():
+    start = time.perf_counter()
+    try:
+        import detect_pothole, evidence, near_duplicates, video_preview, video_segments  # noqa: F401
+        loaded = warm_up()
+        print(f'Warm-up finished in {time.perf_counter() - start:.1f}s (model loaded: {loaded})')
+    except Exception as e:
+        print('Warm-up error:', e)
+
+
+if WARM_UP:
+    threading.Thread(target=_warm_up, daemon=True).start()
+
+# Read reports.json into report_index while the first requests are already being answered
+threading.Thread(target=ensure_report_index, daemon=True).start()
+
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
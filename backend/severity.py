@@ -0,0 +1,208 @@
+"""
+Resolution-independent pothole severity classification.
+
+Severity is decided on the bbox area as a fraction of the frame it was
+detected in, so the same pothole gets the same label whether it came through
+detect_image (up to 1024 px), detect_video (480x360) or main.py (640x480).
+Thresholds live in per-source calibration tables.
+
+Run as a script to re-classify every stored report from its saved bboxes:
+    python severity.py [--reports reports.json] [--calibration table.json] [--dry-run]
+Changed reports get new versions, so map clients pick them up through
+/reports/changes and the stream. Stop the server first: it holds reports.json
+in memory and would overwrite the rewrite with its next save.
+"""
+
+import argparse
+import base64
+import json
+import os
+import struct
+
+# The original absolute thresholds (5000 / 20000 px) were tuned on 640x480 frames
+LEGACY_FRAME_SIZE = (640, 480)
+LEGACY_FRAME_AREA = LEGACY_FRAME_SIZE[0] * LEGACY_FRAME_SIZE[1]
+
+# Upper bounds of bbox_area / frame_area for Minor and Moderate; anything above is Major.
+# Sources: 'image' (photo uploads), 'video' (dashcam frames). Unknown sources use 'default'.
+DEFAULT_CALIBRATION = {
+    'default': (5000 / LEGACY_FRAME_AREA, 20000 / LEGACY_FRAME_AREA),
+    'image': (5000 / LEGACY_FRAME_AREA, 20000 / LEGACY_FRAME_AREA),
+    'video': (5000 / LEGACY_FRAME_AREA, 20000 / LEGACY_FRAME_AREA),
+}
+
+# Frame size detect_video resizes to; used for old video reports without a stored frame_size
+VIDEO_FRAME_SIZE = (480, 360)
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
+
+
+def load_calibration(path=None):
+    """
+    Load calibration tables, overlaying a JSON file on the defaults.
+    The file maps source -> [minor_max_ratio, moderate_max_ratio].
+    Path defaults to the SEVERITY_CALIBRATION env var.
+    """
+    table = dict(DEFAULT_CALIBRATION)
+    path = path or os.environ.get('SEVERITY_CALIBRATION')
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for source, bounds in json.load(f).items():
+                minor_max, moderate_max = float(bounds[0]), float(bounds[1])
+                if not 0 < minor_max <= moderate_max:
+                    raise ValueError(f'Invalid severity calibration for {source!r}: {bounds}')
+                table[source] = (minor_max, moderate_max)
+    return table
+
+
+CALIBRATION = load_calibration()
+
+
+def area_ratio(area, frame_size):
+    """bbox area as a fraction of the frame area (frame_size = (w, h))."""
+    frame_area = frame_size[0] * frame_size[1] if frame_size else 0
+    if frame_area <= 0:
+        return area / LEGACY_FRAME_AREA
+    return area / frame_area
+
+
+def classify_severity(area, frame_size=None, source='image', calibration=None):
+    """
+    Classify pothole severity from bbox area normalized to the frame size.
+    Without a frame_size the area is assumed to come from a 640x480 frame,
+    which reproduces the original absolute pixel thresholds.
+    """
+    table = calibration or CALIBRATION
+    minor_max, moderate_max = table.get(source) or table['default']
+    ratio = area_ratio(area, frame_size)
+    if ratio < minor_max:
+        return 'Minor'
+    elif ratio < moderate_max:
+        return 'Moderate'
+    else:
+        return 'Major'
+
+
+def _png_size(data):
+    """(w, h) from PNG header bytes, or None."""
+    if len(data) >= 24 and data[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', data[16:24])
+    return None
+
+
+def stored_frame_size(report, base_dir):
+    """
+    Best-effort frame size the report's bboxes are expressed in, without decoding images.
+    Uses the stored frame_size, else the annotated PNG header (it is drawn at detection
+    resolution), else the fixed detect_video size for videos.
+    """
+    if report.get('frame_size'):
+        return tuple(report['frame_size'])
+
+    annot = report.get('annotated_file')
+    if annot:
+        path = os.path.join(base_dir, annot.replace('\\', '/'))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                size = _png_size(f.read(24))
+            if size:
+                return size
+
+    b64 = report.get('annotated_base64')
+    if b64 and ',' in b64:
+        # 32 base64 chars decode to the 24 header bytes we need
+        size = _png_size(base64.b64decode(b64.split(',', 1)[1][:32]))
+        if size:
+            return size
+
+    if str(report.get('original_file', '')).lower().endswith(VIDEO_EXTENSIONS):
+        return VIDEO_FRAME_SIZE
+    return None
+
+
+def report_source(report):
+    """Calibration source type for a stored report."""
+    if report.get('source'):
+        return report['source']
+    return 'video' if str(report.get('original_file', '')).lower().endswith(VIDEO_EXTENSIONS) else 'image'
+
+
+def reclassify_report(report, base_dir, calibration=None):
+    """Recompute severities of one report from its stored bboxes. Returns True if anything changed."""
+    detections = report.get('detections')
+    if not isinstance(detections, list):
+        return False
+
+    frame_size = stored_frame_size(report, base_dir)
+    source = report_source(report)
+    breakdown = {'Minor': 0, 'Moderate': 0, 'Major': 0}
+    changed = False
+
+    for d in detections:
+        bbox = d.get('bbox')
+        if not bbox or len(bbox) != 4:
+            continue
+        x1, y1, x2, y2 = bbox
+        area = (x2 - x1) * (y2 - y1)
+        severity = classify_severity(area, frame_size, source, calibration)
+        ratio = round(area_ratio(area, frame_size), 6)
+        if d.get('severity') != severity or d.get('area_ratio') != ratio:
+            changed = True
+        d['area'] = area
+        d['area_ratio'] = ratio
+        d['severity'] = severity
+        breakdown[severity] += 1
+
+    if report.get('severity_breakdown') != breakdown:
+        changed = True
+    report['severity_breakdown'] = breakdown
+    if frame_size and not report.get('frame_size'):
+        report['frame_size'] = list(frame_size)
+        changed = True
+    return changed
+
+
+def reclassify_reports(reports_path, calibration=None, dry_run=False):
+    """
+    Batch re-classification job: recompute severities for every stored report
+    using its saved bboxes (no inference). Changed reports are stamped with
+    the next versions after the store's highest. Run with the server stopped.
+    Returns (total_reports, changed_reports).
+    """
+    from serialization import read_json, write_json_atomic
+
+    reports = read_json(reports_path, None)
+    if reports is None:
+        return 0, 0
+
+    base_dir = os.path.dirname(os.path.abspath(reports_path))
+    version = max([0] + [int(r.get('version') or 0) for r in reports])
+    changed = [r for r in reports if reclassify_report(r, base_dir, calibration)]
+
+    if changed and not dry_run:
+        for r in changed:
+            version += 1
+            r['version'] = version
+        write_json_atomic(reports_path, reports)
+
+    return len(reports), len(changed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-classify stored report severities from saved bboxes '
+                                                 '(stop the server first)')
+    parser.add_argument('--reports', default=os.path.join(os.path.dirname(__file__), 'reports.json'))
+    parser.add_argument('--calibration', default=None, help='JSON calibration table (source -> [minor, moderate])')
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without writing')
+    args = parser.parse_args(argv)
+
+    calibration = load_calibration(args.calibration) if args.calibration else None
+    total, changed = reclassify_reports(args.reports, calibration, args.dry_run)
+    action = 'would change' if args.dry_run else 'updated'
+    print(f'Re-classified {total} reports, {action} {changed}')
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""
+SmartRoad command line tools.
+
+    python smartroad.py ingest /media/sdcard [--workers 4] [--batch-size 50]
+
+ingest walks a drive archive (photos and dashcam video), runs detect_pothole
+headless across inference worker processes (one model, thread budget and
+core set each; see inference.py), and appends reports to reports.json in
+batches. Photos are located from their EXIF GPS; videos from a
+GPX/CSV/NMEA/SRT sidecar with the same name, else the clip's embedded NMEA
+subtitles, giving one report per tracked pothole like /upload.
+
+Every processed file's content hash goes into ingest_manifest.json next to
+reports.json (and onto its reports as content_hash), so an interrupted or
+repeated run skips what is already done. Run it while the server is stopped,
+or against a separate --data-dir: the server keeps its own in-process lock.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from content_hash import file_sha1
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
+GPS_SIDECARS = ('.gpx', '.srt', '.csv', '.nmea', '.log')
+MANIFEST_NAME = 'ingest_manifest.json'
+
+
+def iter_media(root):
+    """Image and video paths under root, in a stable order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith('.'):
+                continue
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS + VIDEO_EXTENSIONS:
+                yield os.path.join(dirpath, name)
+
+
+def find_sidecar(video_path):
+    stem = os.path.splitext(video_path)[0]
+    for ext in GPS_SIDECARS:
+        for candidate in (stem + ext, stem + ext.upper()):
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+def _relpath(path, data_dir):
+    return os.path.relpath(path, data_dir).replace('\\', '/')
+
+
+def process_file(path, content_hash, options, model):
+    """
+    Detect potholes in one file (runs in an inference worker) and save its evidence.
+
+    Returns {'path', 'hash', 'total', 'entries', 'error'}; entries are the
+    report dicts to append (empty when nothing was found).
+    """
+    import cv2
+    from detect_pothole import detect_pothole
+    from evidence import contact_sheet
+    from near_duplicates import image_hashes
+    from gps_track import exif_gps, extract_subtitle_track, geotag_detections, load_track, parse_srt
+    from inference import INFER_SIZE
+
+    result = {'path': path, 'hash': content_hash, 'total': 0, 'entries': [], 'error': None}
+    is_video = os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+    data_dir = options['data_dir']
+    reports_dir = os.path.join(data_dir, 'reports')
+    try:
+        checkpoint_path = None
+        if is_video:
+            checkpoint_dir = os.path.join(data_dir, 'checkpoints')
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            checkpoint_path = os.path.join(checkpoint_dir, f'{content_hash}.json')
+        img, detections, total, severity_breakdown, stats = detect_pothole(
+            path, model, imgsz=INFER_SIZE, sliced=options['sliced'] and not is_video,
+            stream=True, frame_skip=options['frame_skip'], checkpoint_path=checkpoint_path,
+        )
+        if stats is None:
+            result['error'] = 'could not read file'
+            return result
+        result['total'] = total
+        if total == 0:
+            return result
+
+        lat = lon = None
+        gps_track = None
+        if is_video:
+            sidecar = find_sidecar(path)
+            if sidecar:
+                gps_track = load_track(sidecar)
+            else:
+                srt = extract_subtitle_track(path)
+                gps_track = parse_srt(srt) if srt else None
+        else:
+            lat, lon = exif_gps(path) or (None, None)
+        geotagged = bool(gps_track) and any(d.get('timestamp_ms') is not None for d in detections)
+        if geotagged:
+            geotag_detections(detections, gps_track)
+
+        os.makedirs(reports_dir, exist_ok=True)
+        uid = str(int(time.time() * 1000)) + '_' + uuid.uuid4().hex[:8]
+        saved_original = os.path.join(reports_dir, f'{uid}_orig_{os.path.basename(path)}')
+        shutil.copy(path, saved_original)
+        saved_annot = None
+        if img is not None:
+            saved_annot = os.path.join(reports_dir, f'{uid}_annot.png')
+            cv2.imwrite(saved_annot, img)
+
+        evidence = stats.pop('evidence', [])
+        evidence_files = []
+        for n, ev in enumerate(evidence):
+            ev_path = os.path.join(reports_dir, f"{uid}_ev{n}_t{ev['track_id']}.jpg")
+            with open(ev_path, 'wb') as ef:
+                ef.write(ev['jpeg'])
+            evidence_files.append({
+                'file': _relpath(ev_path, data_dir),
+                'track_id': ev['track_id'],
+                'confidence': ev['confidence'],
+                'severity': ev['severity'],
+                'timestamp_ms': ev['timestamp_ms'],
+            })
+        sheet_file = None
+        sheet = contact_sheet(evidence)
+        if sheet:
+            sheet_path = os.path.join(reports_dir, f'{uid}_sheet.jpg')
+            with open(sheet_path, 'wb') as sf:
+                sf.write(sheet)
+            sheet_file = _relpath(sheet_path, data_dir)
+
+        entry = {
+            'id': uid,
+            'timestamp': int(os.path.getmtime(path)),
+            'original_file': _relpath(saved_original, data_dir),
+            'annotated_file': _relpath(saved_annot, data_dir) if saved_annot else None,
+            'annotated_base64': None,
+            'lat': lat,
+            'lon': lon,
+            'description': options['description'] or os.path.basename(path),
+            'total_detections': total,
+            'severity_breakdown': severity_breakdown,
+            'detections': detections,
+            'frame_size': stats.get('frame_size'),
+            'source': stats.get('source'),
+            'evidence': evidence_files,
+            'contact_sheet': sheet_file,
+            'content_hash': content_hash,
+            'ingest_path': os.path.abspath(path),
+        }
+
+        hashes = None if is_video else image_hashes(path)
+        if hashes:
+            entry['phash'], entry['dhash'] = hashes
+
+        if geotagged:
+            for d in detections:
+                track_id = d.get('track_id')
+                result['entries'].append(dict(
+                    entry,
+                    id=f'{uid}_t{track_id}',
+                    parent_id=uid,
+                    track_id=track_id,
+                    lat=d.get('lat'),
+                    lon=d.get('lon'),
+                    total_detections=1,
+                    severity_breakdown={k: int(k == d['severity']) for k in ('Minor', 'Moderate', 'Major')},
+                    detections=[d],
+                    evidence=[e for e in evidence_files if e['track_id'] == track_id],
+                ))
+        else:
+            result['entries'].append(entry)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+class Ingest:
+    """Main-process side of an ingest run: manifest, batching and reports.json writes."""
+
+    def __init__(self, data_dir, batch_size=50):
+        from serialization import read_json
+        self.reports_path = os.path.join(data_dir, 'reports.json')
+        self.manifest_path = os.path.join(data_dir, MANIFEST_NAME)
+        self.batch_size = batch_size
+        self.manifest = read_json(self.manifest_path, {})
+        # Reports written just before a crash (manifest not yet saved) count as done too
+        self.done = set(self.manifest)
+        self.done.update(r['content_hash'] for r in read_json(self.reports_path, []) if r.get('content_hash'))
+        self.pending = []
+        self.pending_files = {}
+        self.reports_written = 0
+
+    def add(self, result):
+        self.pending.extend(result['entries'])
+        self.pending_files[result['hash']] = {
+            'path': os.path.abspath(result['path']),
+            'detections': result['total'],
+            'report_ids': [e['id'] for e in result['entries']],
+            'processed_at': int(time.time()),
+        }
+        self.done.add(result['hash'])
+        if len(self.pending_files) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """One reports.json rewrite for the whole batch, then the manifest."""
+        from serialization import read_json, write_json_atomic
+        if not self.pending_files:
+            return
+        if self.pending:
+            reports = read_json(self.reports_path, [])
+            version = max([0] + [int(r.get('version') or 0) for r in reports])
+            for entry in self.pending:
+                version += 1
+                entry['version'] = version
+            reports.extend(self.pending)
+            write_json_atomic(self.reports_path, reports)
+            self.reports_written += len(self.pending)
+        self.manifest.update(self.pending_files)
+        write_json_atomic(self.manifest_path, self.manifest)
+        self.pending = []
+        self.pending_files = {}
+
+
+def ingest(root, data_dir, workers=1, threads=None, batch_size=50, sliced=False, frame_skip=5, description=''):
+    """Ingest every new image/video under root. Returns a summary dict."""
+    import inference
+
+    start = time.perf_counter()
+    run = Ingest(data_dir, batch_size)
+    options = {'data_dir': data_dir, 'sliced': sliced, 'frame_skip': frame_skip, 'description': description}
+    summary = {'files': 0, 'skipped': 0, 'failed': 0, 'with_potholes': 0, 'reports': 0}
+
+    # Worker processes with their own model, threads and cores (see inference.py)
+    inference.configure(workers=workers, threads=threads)
+    try:
+        in_flight = set()
+        queued = set()
+
+        def collect(done_futures):
+            for future in done_futures:
+                result = future.result()
+                summary['files'] += 1
+                if result['error']:
+                    summary['failed'] += 1
+                    print(f"  failed  {result['path']}: {result['error']}")
+                    continue
+                if result['total']:
+                    summary['with_potholes'] += 1
+                print(f"  {result['total']:3d} potholes  {result['path']}")
+                run.add(result)
+
+        for path in iter_media(root):
+            content_hash = file_sha1(path)
+            if content_hash in run.done or content_hash in queued:
+                summary['skipped'] += 1
+                continue
+            queued.add(content_hash)
+            # Bounded submission: hashing the next files overlaps with detection
+            if len(in_flight) >= workers * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+            in_flight.add(inference.submit(process_file, path, content_hash, options, inference.MODEL))
+        collect(wait(in_flight)[0])
+    finally:
+        run.flush()
+        inference.shutdown()
+
+    summary['reports'] = run.reports_written
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def main(argv=None):
+    data_dir_default = os.environ.get('SMARTROAD_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(prog='smartroad', description='SmartRoad AI command line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('ingest', help='Detect potholes in a directory of photos / dashcam video')
+    p.add_argument('dir', help='Directory to scan (recursively)')
+    p.add_argument('--data-dir', default=data_dir_default,
+                   help='Where reports.json and reports/ live (default: SMARTROAD_DATA_DIR or backend/)')
+    p.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                   help='Worker processes, each with its own model (default: half the CPUs)')
+    p.add_argument('--threads', type=int, default=None,
+                   help='torch threads per worker (default: INFERENCE_THREADS or CPUs / workers)')
+    p.add_argument('--batch-size', type=int, default=50, help='Files per reports.json write')
+    p.add_argument('--sliced', action='store_true', help='Tiled inference for high-resolution photos')
+    p.add_argument('--frame-skip', type=int, default=5, help='Process every Nth video frame')
+    p.add_argument('--description', default='', help='Description for every report (default: file name)')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.dir):
+        parser.error(f'not a directory: {args.dir}')
+    os.makedirs(args.data_dir, exist_ok=True)
+    print(f'Ingesting {args.dir} with {args.workers} worker(s) into {args.data_dir}')
+    summary = ingest(args.dir, args.data_dir, workers=max(1, args.workers), threads=args.threads, batch_size=max(1, args.batch_size),
+                     sliced=args.sliced, frame_skip=max(1, args.frame_skip), description=args.description)
+    print(f"Done in {summary['seconds']}s: {summary['files']} processed, {summary['skipped']} already ingested, "
+          f"{summary['failed']} failed, {summary['with_potholes']} with potholes, {summary['reports']} reports added")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
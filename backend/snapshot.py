@@ -0,0 +1,93 @@
+"""
+Compact, geo-only report snapshots for offline map fallbacks.
+
+Each row is {id, lat, lon, severity, timestamp, version}: no annotations,
+detections or admin fields. The snapshot is written minified next to
+pre-compressed .gz and (when the brotli package is installed) .br copies, so
+static hosts can serve the smallest encoding. Clients holding a snapshot catch
+up with GET /reports/changes?since=<max version>.
+
+    python snapshot.py --reports reports.json --out ../frontend/public
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SEVERITY_ORDER = ('Major', 'Moderate', 'Minor')
+
+
+def worst_severity(breakdown):
+    """Highest severity with a non-zero count ('Minor' if none)."""
+    breakdown = breakdown or {}
+    return next((s for s in SEVERITY_ORDER if breakdown.get(s, 0) > 0), 'Minor')
+
+
+def compact_report(r):
+    """Geo-only view of a stored or public report."""
+    return {
+        'id': r.get('id', ''),
+        'lat': round(float(r['lat']), 6),
+        'lon': round(float(r['lon']), 6),
+        'severity': worst_severity(r.get('severity_breakdown')),
+        'timestamp': r.get('timestamp', 0),
+        'version': r.get('version', 0),
+    }
+
+
+def build_snapshot(reports):
+    """Compact rows for every report with coordinates, oldest first."""
+    return [compact_report(r) for r in reports if r.get('lat') and r.get('lon')]
+
+
+def encode(rows):
+    return json.dumps(rows, separators=(',', ':')).encode('utf-8')
+
+
+def export_snapshot(reports, out_dir, name='reports.json'):
+    """
+    Write name, name.gz and name.br (if brotli is available) into out_dir.
+    Returns {filename: size_in_bytes}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    data = encode(build_snapshot(reports))
+    outputs = {name: data, name + '.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        outputs[name + '.br'] = brotli.compress(data, quality=11)
+    elif os.path.exists(os.path.join(out_dir, name + '.br')):
+        os.remove(os.path.join(out_dir, name + '.br'))  # don't leave a stale encoding behind
+
+    sizes = {}
+    for filename, payload in outputs.items():
+        path = os.path.join(out_dir, filename)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        sizes[filename] = len(payload)
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a compact geo-only reports snapshot')
+    parser.add_argument('--reports', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports.json'))
+    parser.add_argument('--out', required=True, help='Output directory')
+    parser.add_argument('--name', default='reports.json')
+    args = parser.parse_args(argv)
+
+    with open(args.reports, 'r', encoding='utf-8') as f:
+        reports = json.load(f)
+    for filename, size in export_snapshot(reports, args.out, args.name).items():
+        print(f'{filename}: {size / 1024:.2f} KB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
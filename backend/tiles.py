@@ -0,0 +1,231 @@
+"""
+Packed binary map tiles of pothole points and clusters (GET /tiles/<z>/<x>/<y>).
+
+Reports are bucketed into Web Mercator tiles, and within a tile into a
+GRID x GRID cell grid; each non-empty cell becomes one record. From
+CLUSTER_MAX_ZOOM up the grid is the full tile extent, so records are
+individual potholes (points on the same pixel still merge). Payloads stay
+bounded by the grid size whatever the zoom or store size.
+
+Tile layout (little-endian):
+    header  4s magic b'SRPT', u8 format version (1), u8 zoom,
+            u16 extent (4096), u32 record count                 12 bytes
+    record  u16 x, u16 y (tile-local, 0..extent-1, origin top-left),
+            u32 count, u8 worst severity (0 Minor, 1 Moderate, 2 Major)
+                                                                 9 bytes each
+
+Built tiles are cached per zoom; when a report is created, updated or
+moved only the tiles containing its old and new position are dropped.
+"""
+
+import math
+import struct
+import threading
+
+import numpy as np
+
+EXTENT = 4096
+GRID = 64
+CLUSTER_MAX_ZOOM = 16
+MAX_ZOOM = 22
+MAX_LAT = 85.0511287798
+
+HEADER = struct.Struct('<4sBBHI')
+RECORD = struct.Struct('<HHIB')
+MAGIC = b'SRPT'
+FORMAT_VERSION = 1
+
+SEVERITY_CODES = {'Minor': 0, 'Moderate': 1, 'Major': 2}
+
+
+def _severity_code(report):
+    if isinstance(report.get('severity'), str):
+        return SEVERITY_CODES.get(report['severity'], 0)
+    sev = report.get('severity_breakdown') or {}
+    return 2 if sev.get('Major', 0) > 0 else 1 if sev.get('Moderate', 0) > 0 else 0
+
+
+def world_xy(lat, lon):
+    """Web Mercator position in [0, 1) x [0, 1) (origin top-left)."""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = (lon + 180.0) / 360.0
+    s = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+def tile_key(wx, wy, z):
+    n = 1 << z
+    return int(wx * n), int(wy * n)
+
+
+def empty_tile(z):
+    return HEADER.pack(MAGIC, FORMAT_VERSION, z, EXTENT, 0)
+
+
+class ZoomIndex:
+    """
+    Report ids of one zoom level grouped by tile: a sorted array of tile keys
+    from one vectorised pass, plus a small overlay of ids added to / removed
+    from tiles since, so changes patch the index without a rebuild.
+    """
+
+    def __init__(self, z, ids, xy):
+        self.n = 1 << z
+        keys = (xy[:, 0] * self.n).astype(np.int64) * self.n + (xy[:, 1] * self.n).astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.ids = [ids[i] for i in order.tolist()]
+        self.added = {}      # tile key -> set(ids)
+        self.removed = set()
+
+    def key(self, x, y):
+        return x * self.n + y
+
+    def lookup(self, key):
+        lo, hi = np.searchsorted(self.keys, [key, key + 1])
+        ids = [i for i in self.ids[lo:hi] if i not in self.removed]
+        return ids + list(self.added.get(key, ()))
+
+    def move(self, rid, old_key, new_key):
+        if old_key is not None:
+            self.removed.add(rid)
+            self.added.get(old_key, set()).discard(rid)
+        if new_key is not None:
+            self.added.setdefault(new_key, set()).add(rid)
+
+    def overlay_size(self):
+        return len(self.removed)
+
+
+class TileCache:
+    """
+    Points by report id plus, per requested zoom, a tile -> ids index and
+    the encoded tiles. Zoom indexes are built on first use with one pass
+    over all points; later changes patch them in place.
+    """
+
+    def __init__(self, grid=GRID, cluster_max_zoom=CLUSTER_MAX_ZOOM, max_overlay=5000):
+        self.grid = grid
+        self.cluster_max_zoom = cluster_max_zoom
+        self.max_overlay = max_overlay
+        self.loaded = False
+        self.points = {}    # id -> (world_x, world_y, severity code)
+        self.indexes = {}   # z -> ZoomIndex
+        self.tiles = {}     # (z, x, y) -> bytes
+        self.versions = {}  # (z, x, y) -> generation, bumped on invalidation (ETags)
+        self.lock = threading.Lock()
+        self._arrays = None  # (ids, xy) snapshot of points for index builds
+
+    def load(self, reports):
+        with self.lock:
+            self.points = {}
+            for r in reports:
+                point = self._point(r)
+                if point:
+                    self.points[str(r.get('id', ''))] = point
+            self.indexes.clear()
+            self.tiles.clear()
+            self._arrays = None
+            self.loaded = True
+
+    @staticmethod
+    def _point(report):
+        lat, lon = report.get('lat'), report.get('lon')
+        if not lat or not lon:
+            return None
+        wx, wy = world_xy(float(lat), float(lon))
+        return wx, wy, _severity_code(report)
+
+    def _zoom_index(self, z):
+        index = self.indexes.get(z)
+        if index is None:
+            # Grid-bucketed pass over every point for this zoom
+            if self._arrays is None:
+                ids = list(self.points)
+                xy = np.array([self.points[i][:2] for i in ids], dtype=np.float64).reshape(-1, 2)
+                self._arrays = (ids, xy)
+            index = self.indexes[z] = ZoomIndex(z, *self._arrays)
+        return index
+
+    def _invalidate(self, z, key):
+        self.tiles.pop((z,) + key, None)
+        self.versions[(z,) + key] = self.versions.get((z,) + key, 0) + 1
+
+    def update(self, reports):
+        """Apply created/updated reports, dropping only the tiles they leave or enter."""
+        if not self.loaded:
+            return
+        with self.lock:
+            for r in reports:
+                rid = str(r.get('id', ''))
+                old = self.points.get(rid)
+                new = self._point(r)
+                if old == new:
+                    continue
+                if new:
+                    self.points[rid] = new
+                else:
+                    self.points.pop(rid, None)
+                self._arrays = None
+                for z, index in list(self.indexes.items()):
+                    old_tile = tile_key(old[0], old[1], z) if old else None
+                    new_tile = tile_key(new[0], new[1], z) if new else None
+                    index.move(rid, index.key(*old_tile) if old_tile else None,
+                               index.key(*new_tile) if new_tile else None)
+                    for tile in {old_tile, new_tile} - {None}:
+                        self._invalidate(z, tile)
+                    if index.overlay_size() > self.max_overlay:
+                        self._drop_zoom(z)
+
+    def _drop_zoom(self, z):
+        """
+        Forget zoom z's index (rebuilt on next miss) and its cached tiles: without
+        an index, later updates can no longer tell which of them to invalidate.
+        """
+        del self.indexes[z]
+        for key in [k for k in self.tiles if k[0] == z]:
+            self._invalidate(z, key[1:])
+
+    def version(self, z, x, y):
+        return self.versions.get((z, x, y), 0)
+
+    def get(self, z, x, y):
+        """(tile bytes, cache hit)."""
+        with self.lock:
+            data = self.tiles.get((z, x, y))
+            if data is not None:
+                return data, True
+            index = self._zoom_index(z)
+            ids = index.lookup(index.key(x, y))
+            data = self._encode(z, x, y, [self.points[i] for i in ids]) if ids else empty_tile(z)
+            self.tiles[(z, x, y)] = data
+            return data, False
+
+    def _encode(self, z, x, y, points):
+        n = 1 << z
+        arr = np.asarray(points, dtype=np.float64)
+        px = np.clip(((arr[:, 0] * n - x) * EXTENT).astype(np.int64), 0, EXTENT - 1)
+        py = np.clip(((arr[:, 1] * n - y) * EXTENT).astype(np.int64), 0, EXTENT - 1)
+        sev = arr[:, 2].astype(np.int64)
+
+        grid = EXTENT if z >= self.cluster_max_zoom else self.grid
+        cell = (py * grid // EXTENT) * grid + (px * grid // EXTENT)
+        cells, inverse, counts = np.unique(cell, return_inverse=True, return_counts=True)
+        cx = np.bincount(inverse, weights=px) / counts
+        cy = np.bincount(inverse, weights=py) / counts
+        worst = np.zeros(len(cells), dtype=np.int64)
+        np.maximum.at(worst, inverse, sev)
+
+        out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, z, EXTENT, len(cells)))
+        for i in range(len(cells)):
+            out += RECORD.pack(int(cx[i]), int(cy[i]), int(counts[i]), int(worst[i]))
+        return bytes(out)
+
+
+def decode_tile(data):
+    """Inverse of the tile encoding, for tooling and debugging: (zoom, [(x, y, count, severity)])."""
+    magic, version, z, extent, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError('not a SmartRoad tile')
+    return z, [RECORD.unpack_from(data, HEADER.size + i * RECORD.size) for i in range(count)]
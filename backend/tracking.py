@@ -0,0 +1,140 @@
+"""
+Lightweight IoU tracker for potholes across sampled video frames.
+
+Unlike the list-wide IoU deduplication in detect_video, tracks expire after a
+few sampled frames without a match, so a pothole that appears later in the
+clip at the same screen position is counted as a new one. Only per-track
+summaries are kept, which keeps memory bounded by the number of potholes.
+"""
+
+from detect_pothole import calculate_iou
+
+
+class PotholeTracker:
+    """
+    Greedy IoU tracker.
+
+    Args:
+        iou_threshold: Minimum IoU between a detection and a track's last bbox to match
+        max_missed: Sampled frames a track may go unmatched before it is closed
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=3):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.active = []
+        self.finished = []
+        self.next_id = 1
+
+    def update(self, detections, timestamp_ms, frame_index):
+        """
+        Associate one frame's detections with tracks.
+        Returns [(track, detection, improved)] where improved is True when this
+        detection became the track's best (highest-confidence) observation.
+        """
+        candidates = []
+        for ti, track in enumerate(self.active):
+            for di, det in enumerate(detections):
+                iou = calculate_iou(track['bbox'], det['bbox'])
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, ti, di))
+        candidates.sort(reverse=True)
+
+        matched_tracks, matched_dets, updates = set(), set(), []
+        for iou, ti, di in candidates:
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track, det = self.active[ti], detections[di]
+            track['bbox'] = det['bbox']
+            track['last_seen_ms'] = timestamp_ms
+            track['last_frame'] = frame_index
+            track['hits'] += 1
+            track['missed'] = 0
+            improved = det['confidence'] > track['confidence']
+            if improved:
+                self._set_best(track, det, timestamp_ms, frame_index)
+            updates.append((track, det, improved))
+
+        existing = len(self.active)
+        for di, det in enumerate(detections):
+            if di in matched_dets:
+                continue
+            track = {
+                'track_id': self.next_id,
+                'bbox': det['bbox'],
+                'first_bbox': det['bbox'],
+                'first_seen_ms': timestamp_ms,
+                'last_seen_ms': timestamp_ms,
+                'first_frame': frame_index,
+                'last_frame': frame_index,
+                'hits': 1,
+                'missed': 0,
+                'confidence': -1.0,
+            }
+            self.next_id += 1
+            self._set_best(track, det, timestamp_ms, frame_index)
+            self.active.append(track)
+            updates.append((track, det, True))
+
+        # Age unmatched tracks and close the stale ones
+        still_active = []
+        for ti, track in enumerate(self.active):
+            if ti < existing and ti not in matched_tracks:
+                track['missed'] += 1
+            if track['missed'] > self.max_missed:
+                self.finished.append(track)
+            else:
+                still_active.append(track)
+        self.active = still_active
+
+        return updates
+
+    @staticmethod
+    def _set_best(track, det, timestamp_ms, frame_index):
+        track['confidence'] = det['confidence']
+        track['best_bbox'] = det['bbox']
+        track['area'] = det['area']
+        track['area_ratio'] = det.get('area_ratio')
+        track['severity'] = det['severity']
+        track['best_ms'] = timestamp_ms
+        track['best_frame'] = frame_index
+
+    def __len__(self):
+        return len(self.active) + len(self.finished)
+
+    def detections(self):
+        """One detection dict per track (best observation), in track order."""
+        tracks = sorted(self.finished + self.active, key=lambda t: t['track_id'])
+        return [{
+            'bbox': t['best_bbox'],
+            'confidence': t['confidence'],
+            'area': t['area'],
+            'area_ratio': t['area_ratio'],
+            'severity': t['severity'],
+            'track_id': t['track_id'],
+            'timestamp_ms': t['best_ms'],
+            'frame': t['best_frame'],
+            'first_seen_ms': t['first_seen_ms'],
+            'last_seen_ms': t['last_seen_ms'],
+            'hits': t['hits'],
+        } for t in tracks]
+
+    def state(self):
+        """JSON-serializable tracker state for checkpoints."""
+        return {
+            'iou_threshold': self.iou_threshold,
+            'max_missed': self.max_missed,
+            'active': self.active,
+            'finished': self.finished,
+            'next_id': self.next_id,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        tracker = cls(state['iou_threshold'], state['max_missed'])
+        tracker.active = state['active']
+        tracker.finished = state['finished']
+        tracker.next_id = state['next_id']
+        return tracker
@@ -0,0 +1,101 @@
+"""
+Low-bitrate preview clips of uploaded videos, limited to the time windows
+around tracked detections, so reviewers download seconds instead of the
+whole dashcam clip.
+
+ffmpeg (H.264, CRF, faststart; plays in browsers) is used when on PATH,
+otherwise OpenCV's mp4v writer at reduced size and frame rate.
+"""
+
+import os
+import shutil
+import subprocess
+
+import cv2
+
+
+def detection_windows(detections, pad_ms=1500, merge_gap_ms=1000):
+    """
+    Sorted, merged [start_ms, end_ms] windows covering each detection's
+    first..last sighting (or its timestamp) plus pad_ms on both sides.
+    """
+    spans = []
+    for d in detections:
+        first = d.get('first_seen_ms', d.get('timestamp_ms'))
+        last = d.get('last_seen_ms', d.get('timestamp_ms'))
+        if first is None:
+            continue
+        spans.append([max(0, int(first) - pad_ms), int(last if last is not None else first) + pad_ms])
+    spans.sort()
+
+    windows = []
+    for start, end in spans:
+        if windows and start <= windows[-1][1] + merge_gap_ms:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+    return windows
+
+
+def _ffmpeg_preview(ffmpeg, src, dst, windows, width, fps, crf, timeout):
+    select = '+'.join(f'between(t,{s / 1000:.3f},{e / 1000:.3f})' for s, e in windows)
+    vf = f"select='{select}',setpts=N/FRAME_RATE/TB,fps={fps},scale={width}:-2"
+    cmd = [ffmpeg, '-v', 'error', '-y', '-i', src, '-vf', vf, '-an',
+           '-c:v', 'libx264', '-preset', 'veryfast', '-crf', str(crf),
+           '-pix_fmt', 'yuv420p', '-movflags', '+faststart', '-f', 'mp4', dst]
+    out = subprocess.run(cmd, capture_output=True, timeout=timeout, check=False)
+    return out.returncode == 0 and os.path.exists(dst) and os.path.getsize(dst) > 0
+
+
+def _opencv_preview(src, dst, windows, width, fps):
+    cap = cv2.VideoCapture(src)
+    if not cap.isOpened():
+        return False
+    src_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, int(round(src_fps / fps)))
+    writer = None
+    try:
+        for start_ms, end_ms in windows:
+            cap.set(cv2.CAP_PROP_POS_MSEC, start_ms)
+            index = 0
+            while cap.get(cv2.CAP_PROP_POS_MSEC) <= end_ms:
+                if not cap.grab():
+                    break
+                index += 1
+                if (index - 1) % step:
+                    continue
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                h, w = frame.shape[:2]
+                size = (width, max(2, int(h * width / w) // 2 * 2))
+                if writer is None:
+                    writer = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*'mp4v'), src_fps / step, size)
+                writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    return writer is not None and os.path.exists(dst)
+
+
+def write_preview(src, dst, windows, width=480, fps=10, crf=32, timeout=300):
+    """Write the preview clip for windows to dst (atomically). Returns True on success."""
+    if not windows:
+        return False
+    tmp = dst + '.tmp.mp4'
+    ffmpeg = shutil.which('ffmpeg')
+    try:
+        if ffmpeg:
+            ok = _ffmpeg_preview(ffmpeg, src, tmp, windows, width, fps, crf, timeout)
+        else:
+            ok = _opencv_preview(src, tmp, windows, width, fps)
+        if ok:
+            os.replace(tmp, dst)
+        return ok
+    except (OSError, subprocess.TimeoutExpired, cv2.error) as e:
+        print('Preview error:', e)
+        return False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,227 @@
+"""
+Segmented video detection: one long clip, processed in parallel.
+
+The clip's frames are split into contiguous ranges, and each range runs
+detect_video_stream on the inference executor (see inference.py), seeking
+straight to its first frame. The per-segment tracks are then stitched at
+each boundary by replaying the previous segment's still-open tracks through
+the first inferred frames of the next (see stitch_tracks), and renumbered in
+order of first appearance, so the result matches a sequential pass. It
+can still differ when, right after a boundary window, two tracks compete
+for the same pothole (rare with segments of min_seconds or more), and each
+segment's motion gate starts fresh, so its first sampled frame is always
+inferred.
+
+Call this from request threads, not from inside the inference executor:
+it waits for the segment jobs it submits.
+"""
+
+import time
+
+import cv2
+
+import inference
+from tracking import PotholeTracker
+from video_stream import detect_video_stream
+
+
+def plan_segments(frame_count, fps, segments, frame_skip=5, min_seconds=10.0):
+    """
+    [(start_frame, end_frame)] covering frames 1..frame_count, at most
+    `segments` ranges of at least min_seconds each (the last runs to the end
+    of the clip, so an inaccurate frame count loses nothing).
+    """
+    if frame_count <= 0 or segments <= 1:
+        return [(0, None)]
+    min_frames = max(frame_skip, int(min_seconds * fps)) if fps > 0 else frame_skip
+    segments = max(1, min(segments, frame_count // min_frames))
+    # Boundaries on frame_skip multiples keep each segment's sampling phase identical to a full pass
+    size = -(-frame_count // segments // frame_skip) * frame_skip
+    bounds = [i * size for i in range(segments) if i * size < frame_count]
+    return [(start, bounds[i + 1] if i + 1 < len(bounds) else None) for i, start in enumerate(bounds)]
+
+
+def _continue(track, local, window_hits, window_end):
+    """Extend a stitched track with the part of a segment-local track after the boundary window."""
+    post_hits = local['hits'] - window_hits
+    if post_hits <= 0:
+        return
+    track['bbox'] = local['bbox']
+    track['last_seen_ms'] = local['last_seen_ms']
+    track['last_frame'] = local['last_frame']
+    track['hits'] += post_hits
+    track['missed'] = local['missed']
+    if local['best_frame'] > window_end and local['confidence'] > track['confidence']:
+        for key in ('confidence', 'best_bbox', 'area', 'area_ratio', 'severity', 'best_ms', 'best_frame'):
+            track[key] = local.get(key)
+
+
+def stitch_tracks(segments, iou_threshold=0.3, max_missed=3):
+    """
+    Join per-segment results into one track list.
+
+    segments: per segment, in clip order, {'tracker': tracker state,
+    'boundary': first inferred frames (see detect_video_stream),
+    'frames_inferred': int}.
+
+    At each boundary the tracks still open at the end of the previous segment
+    are replayed through the segment's first max_missed + 1 inferred frames,
+    exactly as the sequential tracker would see them. Each local track is then
+    continued by the track that claimed its last detection in that window
+    (or kept as a new track if it starts later).
+
+    Returns (tracks, origin, stitched): tracks renumbered 1..n by first
+    appearance, origin mapping (segment index, local track id) -> track, and
+    the number of local tracks joined to an earlier segment's track.
+    """
+    tracks = []
+    known = set()
+    origin = {}
+    open_tracks = []  # tracks still active at the end of the previous segment
+    stitched = 0
+
+    def add(track):
+        if id(track) not in known:
+            known.add(id(track))
+            tracks.append(track)
+
+    for seg, part in enumerate(segments):
+        state = part['tracker']
+        local = sorted(state['active'] + state['finished'], key=lambda t: t['track_id'])
+        active_ids = {t['track_id'] for t in state['active']}
+        next_open = []
+
+        if not open_tracks:
+            for lt in local:
+                track = dict(lt)
+                add(track)
+                origin[(seg, lt['track_id'])] = track
+                if lt['track_id'] in active_ids:
+                    next_open.append(track)
+            open_tracks = next_open
+            continue
+
+        # Replay the boundary window with the open tracks the segment never saw
+        replay = PotholeTracker(iou_threshold, max_missed)
+        replay.active = list(open_tracks)
+        carried = {id(t) for t in open_tracks}
+        owner = {}
+        window_hits = {}
+        last_in_window = {}
+        boundary = part.get('boundary') or []
+        for frame in boundary:
+            for track, det, _ in replay.update(frame['detections'], frame['ms'], frame['frame']):
+                owner[(frame['frame'], tuple(det['bbox']))] = track
+                add(track)
+            for det, lid in zip(frame['detections'], frame['track_ids']):
+                window_hits[lid] = window_hits.get(lid, 0) + 1
+                last_in_window[lid] = (frame['frame'], tuple(det['bbox']))
+        window_end = boundary[-1]['frame'] if boundary else -1
+
+        for lt in local:
+            key = last_in_window.get(lt['track_id'])
+            if key is None:
+                track = dict(lt)
+                add(track)
+            else:
+                track = owner[key]
+                _continue(track, lt, window_hits[lt['track_id']], window_end)
+                if id(track) in carried:
+                    stitched += 1
+            origin[(seg, lt['track_id'])] = track
+            if lt['track_id'] in active_ids and all(track is not t for t in next_open):
+                next_open.append(track)
+
+        if part['frames_inferred'] <= len(boundary):
+            # The whole segment was replayed, so the replay state is the sequential one
+            next_open = list(replay.active)
+        open_tracks = next_open
+
+    tracks.sort(key=lambda t: t['first_frame'])  # stable: creation order within a frame
+    for n, track in enumerate(tracks, 1):
+        track['track_id'] = n
+    return tracks, origin, stitched
+
+
+def detect_video_segmented(video_path, segments=None, frame_skip=5, imgsz=416, iou_threshold=0.3,
+                           max_missed=3, motion_gate=True, top_k=8, min_seconds=10.0):
+    """
+    detect_video_stream over parallel segments of the clip.
+
+    Args:
+        segments: Number of ranges (default: one per inference worker)
+        min_seconds: Shortest segment worth its seek and start-up cost
+        Other arguments as for detect_video_stream.
+
+    Returns:
+        The detect_video_stream result tuple, or None when the clip is too
+        short (or its length unknown) to split; run it sequentially then.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.release()
+
+    plan = plan_segments(frame_count, fps, segments or inference.worker_count(), frame_skip, min_seconds)
+    if len(plan) < 2:
+        return None
+
+    start = time.perf_counter()
+    futures = [inference.submit(detect_video_stream, video_path, inference.MODEL, frame_skip=frame_skip,
+                                imgsz=imgsz, iou_threshold=iou_threshold, max_missed=max_missed,
+                                motion_gate=motion_gate, top_k=top_k, start_frame=s, end_frame=e)
+               for s, e in plan]
+    parts = [f.result() for f in futures]
+    if any(p[4] is None for p in parts):
+        return None
+
+    seg_stats = [p[4] for p in parts]
+    tracks, origin, stitched = stitch_tracks(
+        [{'tracker': st.pop('tracker'), 'boundary': st.pop('boundary', []),
+          'frames_inferred': st['frames_inferred']} for st in seg_stats],
+        iou_threshold, max_missed)
+    tracker = PotholeTracker(iou_threshold, max_missed)
+    tracker.finished = tracks
+    detections = tracker.detections()
+    severity_breakdown = {'Minor': 0, 'Moderate': 0, 'Major': 0}
+    for d in detections:
+        severity_breakdown[d['severity']] += 1
+
+    # Best crop per stitched track, then the top_k overall
+    best = {}
+    for seg, st in enumerate(seg_stats):
+        for ev in st.pop('evidence', []):
+            track = origin.get((seg, ev['track_id']))
+            if track is not None and ev['confidence'] > best.get(track['track_id'], {}).get('confidence', -1.0):
+                best[track['track_id']] = dict(ev, track_id=track['track_id'])
+    evidence = sorted(best.values(), key=lambda e: -e['confidence'])[:top_k]
+
+    # Annotated frame from the segment holding the most confident detection
+    best_frame = max(parts, key=lambda p: max((d['confidence'] for d in p[1]), default=-1.0))[0]
+
+    def total(key):
+        return sum(st.get(key) or 0 for st in seg_stats)
+
+    stats = {
+        'mode': 'segmented',
+        'source': 'video',
+        'frame_size': seg_stats[0]['frame_size'],
+        'fps': fps,
+        'segments': [{'start_frame': s, 'end_frame': e, 'total_ms': st['total_ms'],
+                      'tracks': len(p[1])} for (s, e), st, p in zip(plan, seg_stats, parts)],
+        'tracks_stitched': stitched,
+        'frames_read': max(st['frames_read'] for st in seg_stats),
+        'frames_sampled': total('frames_sampled'),
+        'frames_inferred': total('frames_inferred'),
+        'frames_gated': total('frames_gated'),
+        'gate_ms': round(total('gate_ms'), 2),
+        'cpu_saved_ms': round(total('cpu_saved_ms'), 2),
+        'early_exit': False,
+        'detection_budget': None,
+        'processed_until_ms': seg_stats[-1]['processed_until_ms'],
+        'total_ms': round((time.perf_counter() - start) * 1000, 2),
+        'evidence': evidence,
+    }
+    return best_frame, detections, len(detections), severity_breakdown, stats
@@ -0,0 +1,240 @@
+"""
+Streaming, bounded-memory video detection.
+
+detect_video_stream processes clips of any length: frames are read one at a
+time and never collected, skipped frames are only grabbed (not decoded into
+BGR), and the only state carried between frames is the pothole tracker, the
+best evidence crop per track (top-K overall) and one annotated frame.
+Progress is checkpointed to JSON so a restarted job resumes where it stopped.
+"""
+
+import base64
+import json
+import os
+import tempfile
+import time
+
+import cv2
+
+from detect_pothole import build_detections, draw_detections
+from evidence import EvidenceBuffer, decode_jpeg, encode_jpeg
+from frame_buffers import FrameRing
+from motion_gate import MotionGate
+from severity import VIDEO_FRAME_SIZE
+from tracking import PotholeTracker
+from metrics import timed
+
+
+def _video_identity(video_path):
+    st = os.stat(video_path)
+    return {'name': os.path.basename(video_path), 'size': st.st_size}
+
+
+def _write_checkpoint(path, data):
+    # Per-write temp file: concurrent uploads of the same clip share the checkpoint path
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(path) or '.',
+                                     prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False) as f:
+        tmp_path = f.name
+        try:
+            json.dump(data, f)
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, path)
+
+
+def _load_checkpoint(path, identity, frame_skip):
+    """Checkpoint dict if it exists and belongs to this video/settings, else None."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if data.get('video') != identity or data.get('frame_skip') != frame_skip:
+        return None
+    return data
+
+
+def detect_video_stream(video_path, model, frame_skip=5, imgsz=416, iou_threshold=0.3, max_missed=3,
+                        motion_gate=True, detection_budget=None, top_k=8,
+                        checkpoint_path=None, checkpoint_every=50, start_frame=0, end_frame=None):
+    """
+    Detect potholes in an arbitrarily long video in constant memory.
+
+    Args:
+        video_path: Path to video file
+        model: YOLO model
+        frame_skip: Run detection on every Nth frame
+        imgsz: Inference image size
+        iou_threshold, max_missed: Tracker settings (see PotholeTracker)
+        motion_gate: MotionGate instance, True for defaults, or False
+        detection_budget: Stop early once this many unique potholes are tracked
+        top_k: Max evidence crops kept (best one per track)
+        checkpoint_path: JSON file to checkpoint progress to and resume from
+        checkpoint_every: Sampled frames between checkpoints
+        start_frame, end_frame: Only process frames start_frame+1..end_frame
+            (1-based, end_frame None = to the end), seeking to the start; used
+            by video_segments.py. stats then also holds the raw tracks
+            ('tracker') and, after a seek, the first max_missed + 1 inferred
+            frames' detections and track ids ('boundary') for stitching.
+
+    Returns:
+        (annotated_best_frame, detections, total, severity_breakdown, stats)
+        One detection per tracked pothole; stats['evidence'] holds the
+        JPEG-encoded evidence crops.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None, [], 0, {'Minor': 0, 'Moderate': 0, 'Major': 0}, None
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    identity = _video_identity(video_path)
+
+    tracker = PotholeTracker(iou_threshold, max_missed)
+    evidence = EvidenceBuffer(top_k)
+    gate = MotionGate() if motion_gate is True else (motion_gate or None)
+    counters = {'sampled': 0, 'inferred': 0, 'gated': 0, 'infer_cpu': 0.0, 'gate_time': 0.0}
+    best_frame, best_frame_dets, best_conf = None, [], -1.0
+    frame_count = 0
+    position_ms = 0.0
+    resumed_from_ms = None
+    boundary = [] if start_frame else None
+    if start_frame:
+        frame_count = start_frame
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    checkpoint = _load_checkpoint(checkpoint_path, identity, frame_skip)
+    if checkpoint:
+        tracker = PotholeTracker.from_state(checkpoint['tracker'])
+        evidence.load_state(checkpoint['evidence'])
+        counters.update(checkpoint['counters'])
+        if checkpoint.get('best_frame'):
+            best_frame = decode_jpeg(base64.b64decode(checkpoint['best_frame']))
+            best_frame_dets = checkpoint['best_frame_detections']
+            best_conf = checkpoint['best_conf']
+        frame_count = checkpoint['frame_index']
+        position_ms = resumed_from_ms = checkpoint['position_ms']
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+
+    def save_checkpoint(frame_index, processed_ms):
+        _write_checkpoint(checkpoint_path, {
+            'video': identity,
+            'frame_skip': frame_skip,
+            'frame_index': frame_index,
+            'position_ms': round(processed_ms),
+            'tracker': tracker.state(),
+            'evidence': evidence.state(),
+            'counters': dict(counters, gated=counters['gated'] + (gate.gated if gate else 0),
+                             gate_time=counters['gate_time'] + (gate.gate_time if gate else 0.0)),
+            'best_frame': base64.b64encode(encode_jpeg(best_frame)).decode('ascii') if best_frame is not None else None,
+            'best_frame_detections': best_frame_dets,
+            'best_conf': best_conf,
+        })
+
+    start = time.perf_counter()
+    early_exit = False
+    checkpoints_written = 0
+    since_checkpoint = 0
+    frame = None
+    ring = FrameRing(VIDEO_FRAME_SIZE)
+
+    while end_frame is None or frame_count < end_frame:
+        # grab() skips the BGR conversion; only sampled frames are retrieved
+        if not cap.grab():
+            break
+        frame_count += 1
+        if frame_count % frame_skip != 0:
+            continue
+
+        with timed('decode'):
+            ret, frame = cap.retrieve(frame)  # reuses the previous frame's array
+        if not ret:
+            break
+
+        # Everything before this frame is fully accounted for in the tracker
+        if checkpoint_path and since_checkpoint >= checkpoint_every:
+            save_checkpoint(frame_count - 1, position_ms)
+            checkpoints_written += 1
+            since_checkpoint = 0
+
+        position_ms = (frame_count - 1) * 1000.0 / fps if fps > 0 else cap.get(cv2.CAP_PROP_POS_MSEC)
+
+        if detection_budget and len(tracker) >= detection_budget:
+            early_exit = True
+            break
+
+        counters['sampled'] += 1
+        since_checkpoint += 1
+
+        if gate is not None and not gate.should_infer(frame):
+            continue
+
+        with timed('resize'):
+            frame_resized = ring.resize(frame)
+        cpu_start = time.process_time()
+        with timed('inference'):
+            results = model(frame_resized, imgsz=imgsz, verbose=False)
+        counters['infer_cpu'] += time.process_time() - cpu_start
+        counters['inferred'] += 1
+
+        frame_detections = build_detections(results, VIDEO_FRAME_SIZE, 'video')
+        updates = tracker.update(frame_detections, round(position_ms), frame_count)
+        for track, det, improved in updates:
+            if improved:
+                evidence.offer(frame_resized, det, track['track_id'], round(position_ms))
+        if boundary is not None and len(boundary) <= max_missed:
+            owners = {id(det): track['track_id'] for track, det, _ in updates}
+            boundary.append({'frame': frame_count, 'ms': round(position_ms), 'detections': frame_detections,
+                             'track_ids': [owners[id(d)] for d in frame_detections]})
+
+        # Keep a single annotated frame: the one holding the most confident detection
+        frame_best = max((d['confidence'] for d in frame_detections), default=-1.0)
+        if frame_best > best_conf:
+            best_conf = frame_best
+            best_frame = ring.keep()
+            best_frame_dets = frame_detections
+
+    cap.release()
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    detections = tracker.detections()
+    severity_breakdown = {'Minor': 0, 'Moderate': 0, 'Major': 0}
+    for d in detections:
+        severity_breakdown[d['severity']] += 1
+
+    if best_frame is not None:
+        draw_detections(best_frame, best_frame_dets)
+
+    gated = counters['gated'] + (gate.gated if gate else 0)
+    gate_ms = (counters['gate_time'] + (gate.gate_time if gate else 0.0)) * 1000
+    avg_infer_ms = counters['infer_cpu'] * 1000 / counters['inferred'] if counters['inferred'] else 0.0
+    stats = {
+        'mode': 'stream',
+        'source': 'video',
+        'frame_size': list(VIDEO_FRAME_SIZE),
+        'fps': fps,
+        'frames_read': frame_count,
+        'frames_sampled': counters['sampled'],
+        'frames_inferred': counters['inferred'],
+        'frames_gated': gated,
+        'gate_ms': round(gate_ms, 2),
+        'avg_inference_cpu_ms': round(avg_infer_ms, 2),
+        'cpu_saved_ms': round(max(0.0, gated * avg_infer_ms - gate_ms), 2),
+        'early_exit': early_exit,
+        'detection_budget': detection_budget,
+        'processed_until_ms': round(position_ms),
+        'resumed_from_ms': resumed_from_ms,
+        'checkpoints_written': checkpoints_written,
+        'total_ms': round((time.perf_counter() - start) * 1000, 2),
+        'evidence': evidence.ranked(),
+    }
+    if start_frame or end_frame is not None:
+        stats['tracker'] = tracker.state()
+        stats['boundary'] = boundary or []
+
+    return best_frame, detections, len(detections), severity_breakdown, stats
@@ -1,12 +1,18 @@
 """
-Copy reports.json from backend to frontend public folder
+Export a compact reports snapshot from backend to frontend public folder
 This allows the frontend to access reports even when backend is offline
+
+Only id, lat, lon, severity, timestamp and version are shipped (see
+backend/snapshot.py), with pre-compressed .gz/.br copies alongside.
 """
 
-import os
-import shutil
+import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+from snapshot import export_snapshot
+
 def main():
     # Get paths
     script_dir = Path(__file__).parent
@@ -15,7 +21,7 @@ def main():
     frontend_reports = frontend_public / 'reports.json'
     
     print("=" * 60)
-    print("📋 Copying reports.json to frontend public folder")
+    print("📋 Exporting reports snapshot to frontend public folder")
     print("=" * 60)
     print()
     
@@ -25,30 +31,24 @@ def main():
         print("   Make sure you have reports in the backend folder")
         return 1
     
-    # Create public folder if it doesn't exist
-    frontend_public.mkdir(exist_ok=True)
-    print(f"✅ Public folder: {frontend_public}")
-    
-    # Copy the file
     try:
-        shutil.copy2(backend_reports, frontend_reports)
-        print(f"✅ Copied: {backend_reports}")
-        print(f"   To: {frontend_reports}")
+        with open(backend_reports, 'r', encoding='utf-8') as f:
+            reports = json.load(f)
         
-        # Get file size
-        size_bytes = os.path.getsize(frontend_reports)
-        size_kb = size_bytes / 1024
-        print(f"   Size: {size_kb:.2f} KB")
+        sizes = export_snapshot(reports, frontend_public, frontend_reports.name)
+        print(f"✅ Exported: {backend_reports}")
+        print(f"   To: {frontend_reports}")
         
-        # Count reports
-        import json
-        with open(frontend_reports, 'r', encoding='utf-8') as f:
-            reports = json.load(f)
+        # Compare against shipping the full file
+        source_kb = backend_reports.stat().st_size / 1024
+        print(f"   Source size: {source_kb:.2f} KB")
+        for name, size in sizes.items():
+            print(f"   {name}: {size / 1024:.2f} KB")
         
         with_location = sum(1 for r in reports if r.get('lat') and r.get('lon'))
         
         print(f"   Total reports: {len(reports)}")
-        print(f"   With GPS: {with_location}")
+        print(f"   With GPS (exported): {with_location}")
         
         print()
         print("✅ Success! Frontend can now access reports offline")
@@ -58,9 +58,8 @@ def main():
         
         return 0
     except Exception as e:
-        print(f"❌ Error copying file: {e}")
+        print(f"❌ Error exporting snapshot: {e}")
         return 1
 
 if __name__ == '__main__':
-    import sys
     sys.exit(main())
@@ -43,15 +43,22 @@ export default function NavigatePage() {
     alertsShown: 0
   })
 
-  // Fetch pothole reports from backend
+  // Fetch pothole reports from backend, then follow live changes over SSE
   useEffect(() => {
+    const BACKEND_URL = (process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:5000').replace(/\/+$/, '')
+    let source = null
+    let interval = null
+    let cancelled = false
+
+    // Returns the feed sequence number of the snapshot, or null if it came from the local fallback
     const fetchReports = async () => {
       setLoading(true)
       try {
-        const BACKEND_URL = (process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:5000').replace(/\/+$/, '')
         const response = await axios.get(`${BACKEND_URL}/reports`)
         setReports(response.data || [])
         setError(null)
+        const seq = parseInt(response.headers['x-report-seq'], 10)
+        return Number.isNaN(seq) ? null : seq
       } catch (err) {
         // If backend is not available, try to load from local file
         try {
@@ -67,15 +74,55 @@ export default function NavigatePage() {
           setError('Could not connect to backend')
           console.error('Error fetching reports:', err, localErr)
         }
+        return null
       } finally {
         setLoading(false)
       }
     }
 
-    fetchReports()
-    // Refresh every 30 seconds
-    const interval = setInterval(fetchReports, 30000)
-    return () => clearInterval(interval)
+    // Insert or replace one report from a stream event
+    const applyChange = (event) => {
+      const report = JSON.parse(event.data)
+      setReports(prev => {
+        const index = prev.findIndex(r => r.id === report.id)
+        if (index === -1) return [...prev, report]
+        const next = prev.slice()
+        next[index] = report
+        return next
+      })
+    }
+
+    const startPolling = () => {
+      if (!interval) {
+        // Refresh every 30 seconds
+        interval = setInterval(fetchReports, 30000)
+      }
+    }
+
+    const start = async () => {
+      const seq = await fetchReports()
+      if (cancelled) return
+      if (seq === null || typeof EventSource === 'undefined') {
+        startPolling()
+        return
+      }
+      // EventSource reconnects by itself and resumes from the last event id
+      source = new EventSource(`${BACKEND_URL}/reports/stream?since=${seq}`)
+      source.addEventListener('created', applyChange)
+      source.addEventListener('updated', applyChange)
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          startPolling()
+        }
+      }
+    }
+
+    start()
+    return () => {
+      cancelled = true
+      if (source) source.close()
+      if (interval) clearInterval(interval)
+    }
   }, [])
 
   // Play alert sound
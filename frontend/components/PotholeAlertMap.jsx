@@ -166,7 +166,9 @@ export default function PotholeAlertMap({ userLocation, reports = EMPTY_REPORTS,
           alertLevel = 'high'
         }
 
-        const severity = report.severity_breakdown 
+        const severity = typeof report.severity === 'string'
+          ? report.severity
+          : report.severity_breakdown 
           ? (report.severity_breakdown.Major > 0 ? 'Major' : 
              report.severity_breakdown.Moderate > 0 ? 'Moderate' : 'Minor')
           : 'Unknown'
@@ -191,6 +193,8 @@ export default function PotholeAlertMap({ userLocation, reports = EMPTY_REPORTS,
 
   // Get severity for a report
   const getReportSeverity = (report) => {
+    // Compact offline snapshots carry the severity directly
+    if (typeof report.severity === 'string') return report.severity
     if (!report.severity_breakdown) return 'Minor'
     if (report.severity_breakdown.Major > 0) return 'Major'
     if (report.severity_breakdown.Moderate > 0) return 'Moderate'
@@ -373,6 +373,8 @@ export default function RouteMap({ startLocation, endLocation, reports = [], sho
   }
 
   const getReportSeverity = (report) => {
+    // Compact offline snapshots carry the severity directly
+    if (typeof report.severity === 'string') return report.severity
     if (!report.severity_breakdown) return 'Minor'
     if (report.severity_breakdown.Major > 0) return 'Major'
     if (report.severity_breakdown.Moderate > 0) return 'Moderate'